@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import csv
+import functools
 import json
 import logging
 import os
@@ -22,9 +22,9 @@ import typing
 
 import numpy as np
 import pandas as pd
-import requests
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery, storage
+from pdp_transform import fetch, parallel
 
 
 def main(
@@ -48,6 +48,8 @@ def main(
     rename_mappings_list: dict,
     input_csv_headers: typing.List[str],
     output_csv_headers: typing.List[str],
+    max_concurrent_requests: str,
+    transform_workers: str,
 ) -> None:
     logging.info("Creating 'files' folder")
     pathlib.Path("./files").mkdir(parents=True, exist_ok=True)
@@ -72,6 +74,8 @@ def main(
         dataset_id=dataset_id,
         destination_table=table_id,
         schema_path=schema_path,
+        max_concurrent_requests=int(max_concurrent_requests),
+        transform_workers=int(transform_workers),
     )
     logging.info(f"{pipeline_name} --> ETL process completed")
 
@@ -96,6 +100,8 @@ def execute_pipeline(
     dataset_id: str,
     destination_table: str,
     schema_path: str,
+    max_concurrent_requests: int = 8,
+    transform_workers: int = 1,
 ) -> None:
     json_obj_group_id = open("group_ids.json")
     group_id = json.load(json_obj_group_id)
@@ -104,7 +110,12 @@ def execute_pipeline(
     logging.info("Extracting the data from API and loading into dataframe...")
     if report_level == "national_level":
         df = extract_data_and_convert_to_df_national_level(
-            group_id, year_report, api_naming_convention, source_url, destination_table
+            group_id,
+            year_report,
+            api_naming_convention,
+            source_url,
+            destination_table,
+            max_concurrent_requests,
         )
     elif report_level == "state_level":
         df = extract_data_and_convert_to_df_state_level(
@@ -114,9 +125,10 @@ def execute_pipeline(
             api_naming_convention,
             source_url,
             destination_table,
+            max_concurrent_requests,
         )
     save_to_new_file(df, source_file, sep=",")
-    process_source_file(
+    output_headers = process_source_file(
         source_file=source_file,
         target_file=target_file,
         chunksize=chunksize,
@@ -129,6 +141,7 @@ def execute_pipeline(
         output_csv_headers=output_csv_headers,
         group_id=group_id,
         state_code=state_code,
+        transform_workers=transform_workers,
     )
     if os.path.exists(target_file):
         upload_file_to_gcs(
@@ -143,6 +156,7 @@ def execute_pipeline(
             table_id=destination_table,
             schema_filepath=schema_path,
             bucket_name=target_gcs_bucket,
+            columns=output_headers,
             drop_table="N",
         )
         if table_exists:
@@ -176,133 +190,103 @@ def process_source_file(
     output_csv_headers: typing.List[str],
     group_id: str,
     state_code: str,
-) -> None:
+    transform_workers: int = 1,
+) -> typing.List[str]:
     logging.info(f"Opening source file {source_file}")
-    csv.field_size_limit(512 << 10)
-    csv.register_dialect("TabDialect", quotechar='"', delimiter=",", strict=True)
-    with open(source_file) as reader:
-        data = []
-        chunk_number = 1
-        for index, line in enumerate(csv.reader(reader, "TabDialect"), 0):
-            data.append(line)
-            if index % int(chunksize) == 0 and index > 0:
-                process_dataframe_chunk(
-                    data=data,
-                    input_headers=input_headers,
-                    target_file=target_file,
-                    chunk_number=chunk_number,
-                    data_dtypes=data_dtypes,
-                    geography=geography,
-                    rename_mappings_list=rename_mappings_list,
-                    concat_col_list=concat_col_list,
-                    input_csv_headers=input_csv_headers,
-                    output_csv_headers=output_csv_headers,
-                    group_id=group_id,
-                    state_code=state_code,
-                )
-                data = []
-                chunk_number += 1
-        if index % int(chunksize) != 0 and index > 0:
-            process_dataframe_chunk(
-                data=data,
-                input_headers=input_headers,
-                target_file=target_file,
-                chunk_number=chunk_number,
-                data_dtypes=data_dtypes,
-                geography=geography,
-                rename_mappings_list=rename_mappings_list,
-                concat_col_list=concat_col_list,
-                input_csv_headers=input_csv_headers,
-                output_csv_headers=output_csv_headers,
-                group_id=group_id,
-                state_code=state_code,
-            )
-    dfcolumns = list(target_df.columns)
-    i = 0
-    while i < (len(output_csv_headers)):
-        if output_csv_headers[i] not in dfcolumns:
-            output_csv_headers.pop(i)
-            i -= 1
-        i += 1
+    pivot = KpiPivot(kpi_names=list(group_id.values()), initial_rows=int(chunksize))
+    with pd.read_csv(
+        source_file,
+        header=0,
+        names=input_headers,
+        dtype=str,
+        keep_default_na=False,
+        chunksize=int(chunksize),
+    ) as reader:
+        transform_chunk = functools.partial(
+            process_chunk,
+            geography=geography,
+            rename_mappings_list=rename_mappings_list,
+            concat_col_list=concat_col_list,
+            group_id=group_id,
+        )
+        for chunk_number, df in enumerate(
+            parallel.map_ordered(transform_chunk, reader, workers=transform_workers),
+            1,
+        ):
+            logging.info(f"Pivoting batch #{chunk_number} of {source_file}")
+            pivot.add(df["geo_id"], df["KPI_Name"], df["KPI_Value"])
+    target_df = pivot.to_dataframe()
     logging.info("Reordering headers...")
-    final_df = target_df[output_csv_headers]
-    save_to_new_file(final_df, target_file, sep="|")
-    print("final df -->")
-    print(final_df)
-    print("Opening final file  -->")
-    print(pd.read_csv(target_file, sep="|"))
-
-
-def process_dataframe_chunk(
-    data: typing.List[str],
-    input_headers: typing.List[str],
-    target_file: str,
-    chunk_number: int,
-    data_dtypes: dict,
-    geography: str,
-    rename_mappings_list: dict,
-    concat_col_list: typing.List[str],
-    input_csv_headers: typing.List[str],
-    output_csv_headers: typing.List[str],
-    group_id: str,
-    state_code: str,
-) -> None:
-    df = pd.DataFrame(data, columns=input_headers)
-    target_file_batch = str(target_file).replace(
-        ".csv", "-" + str(chunk_number) + ".csv"
-    )
-    process_chunk(
-        df=df,
-        chunk_number=chunk_number,
-        target_file_batch=target_file_batch,
-        target_file=target_file,
-        skip_header=0,
-        geography=geography,
-        rename_mappings_list=rename_mappings_list,
-        concat_col_list=concat_col_list,
-        input_csv_headers=input_csv_headers,
-        output_csv_headers=output_csv_headers,
-        group_id=group_id,
-        state_code=state_code,
-    )
-
-
-def set_df_datatypes(df: pd.DataFrame, data_dtypes: dict) -> pd.DataFrame:
-    logging.info("Setting data types")
-    for key, item in data_dtypes.items():
-        df[key] = df[key].astype(item)
-    return df
+    output_headers = [col for col in output_csv_headers if col in target_df.columns]
+    save_to_new_file(target_df[output_headers], target_file, sep="|")
+    return output_headers
 
 
 def process_chunk(
     df: pd.DataFrame,
-    chunk_number: int,
-    target_file_batch: str,
-    target_file: str,
-    skip_header: bool,
     geography: str,
     rename_mappings_list: dict,
     concat_col_list: typing.List[str],
-    input_csv_headers: typing.List[str],
-    output_csv_headers: typing.List[str],
     group_id: str,
-    state_code: str,
-) -> None:
-    logging.info(f"Processing batch file {target_file_batch}")
+) -> pd.DataFrame:
     logging.info("Replacing values...")
     df = df.replace(to_replace={"KPI_Name": group_id})
     rename_headers(df, rename_mappings_list)
     if geography == "censustract" or geography == "blockgroup":
-        df["tract"] = df["tract"].apply(pad_zeroes_to_the_left, args=(6,))
-        df["state"] = df["state"].apply(pad_zeroes_to_the_left, args=(2,))
-        df["county"] = df["county"].apply(pad_zeroes_to_the_left, args=(3,))
+        df["tract"] = df["tract"].str.zfill(6)
+        df["state"] = df["state"].str.zfill(2)
+        df["county"] = df["county"].str.zfill(3)
     df = create_geo_id(df, concat_col_list)
-    df = pivot_dataframe(df)
-    save_to_new_file(df, file_path=str(target_file_batch), sep="|")
-    df = append_batch_file(
-        df, chunk_number, target_file_batch, target_file, skip_header, not (skip_header)
-    )
-    logging.info(f"Processing batch file {target_file_batch} completed")
+    return df
+
+
+class KpiPivot:
+    """Pivots long `(geo_id, KPI_Name, KPI_Value)` rows into one wide table.
+
+    Values are written straight into a float matrix through a geo_id -> row
+    and KPI name -> column map, so each input row is handled once however
+    many chunks it arrives in. Values of the same geo_id and KPI are summed,
+    like `pivot_table(aggfunc=np.sum)`, and a cell stays empty only if none
+    of its values is numeric. The matrix starts at `initial_rows` rows and
+    doubles when it fills up.
+    """
+
+    def __init__(self, kpi_names: typing.List[str], initial_rows: int = 1024):
+        self.rows = {}
+        self.columns = {}
+        self.values = np.full((max(initial_rows, 1), 0), np.nan)
+        self._add_keys(self.columns, kpi_names)
+
+    def _add_keys(self, keys: dict, new_keys: typing.Iterable[str]) -> None:
+        for key in new_keys:
+            keys.setdefault(key, len(keys))
+        n_rows, n_cols = self.values.shape
+        if len(self.rows) <= n_rows and len(self.columns) <= n_cols:
+            return
+        while n_rows < len(self.rows):
+            n_rows *= 2
+        grown = np.full((n_rows, len(self.columns)), np.nan)
+        grown[: self.values.shape[0], : self.values.shape[1]] = self.values
+        self.values = grown
+
+    def add(
+        self, geo_ids: pd.Series, kpi_names: pd.Series, kpi_values: pd.Series
+    ) -> None:
+        self._add_keys(self.rows, pd.unique(geo_ids))
+        self._add_keys(self.columns, pd.unique(kpi_names))
+        values = pd.to_numeric(kpi_values, errors="coerce").to_numpy(dtype=float)
+        is_numeric = ~np.isnan(values)
+        rows = geo_ids.map(self.rows).to_numpy()[is_numeric]
+        cols = kpi_names.map(self.columns).to_numpy()[is_numeric]
+        self.values[rows, cols] = np.nan_to_num(self.values[rows, cols])
+        np.add.at(self.values, (rows, cols), values[is_numeric])
+
+    def to_dataframe(self) -> pd.DataFrame:
+        df = pd.DataFrame(
+            self.values[: len(self.rows)], columns=list(self.columns.keys())
+        )
+        df.insert(0, "geo_id", list(self.rows.keys()))
+        return df.sort_values("geo_id", ignore_index=True)
 
 
 def load_data_to_bq(
@@ -341,6 +325,7 @@ def create_dest_table(
     table_id: str,
     schema_filepath: list,
     bucket_name: str,
+    columns: typing.List[str],
     drop_table: bool = False,
 ) -> bool:
     table_ref = f"{project_id}.{dataset_id}.{table_id}"
@@ -364,7 +349,7 @@ def create_dest_table(
             )
         )
         if check_gcs_file_exists(schema_filepath, bucket_name):
-            schema = create_table_schema([], bucket_name, schema_filepath)
+            schema = create_table_schema([], columns, bucket_name, schema_filepath)
             table = bigquery.Table(table_ref, schema=schema)
             client.create_table(table)
             print(f"Table {table_ref} was created".format(table_id))
@@ -390,6 +375,7 @@ def check_gcs_file_exists(file_path: str, bucket_name: str) -> bool:
 
 def create_table_schema(
     schema_structure: list,
+    columns: typing.List[str],
     bucket_name: str = "",
     schema_filepath: str = "",
 ) -> list:
@@ -402,13 +388,7 @@ def create_table_schema(
         bucket = storage_client.get_bucket(bucket_name)
         blob = bucket.blob(schema_filepath)
         schema_struct = json.loads(blob.download_as_string(client=None))
-    i = 0
-    dfcolumns = list(target_df.columns)
-    while i < len(schema_struct):
-        if schema_struct[i].get("name") not in dfcolumns:
-            schema_struct.pop(i)
-            i -= 1
-        i += 1
+    schema_struct = [fld for fld in schema_struct if fld.get("name") in columns]
     for schema_field in schema_struct:
         fld_name = schema_field["name"]
         fld_type = schema_field["type"]
@@ -425,15 +405,6 @@ def create_table_schema(
     return schema
 
 
-def pivot_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    logging.info("Pivoting the dataframe...")
-    df = df[["geo_id", "KPI_Name", "KPI_Value"]]
-    df = df.pivot_table(
-        index="geo_id", columns="KPI_Name", values="KPI_Value", aggfunc=np.sum
-    ).reset_index()
-    return df
-
-
 def string_replace(source_url, replace: dict) -> str:
     for k, v in replace.items():
         source_url_new = source_url.replace(k, v)
@@ -446,37 +417,18 @@ def extract_data_and_convert_to_df_national_level(
     api_naming_convention: str,
     source_url: str,
     destination_table: str,
+    max_concurrent_requests: int = 8,
 ) -> pd.DataFrame:
-    list_temp = []
-    flag = 0
+    kpi_urls = []
     for key in group_id:
-        logging.info(f"reading data from API for KPI {key}...")
         str1 = source_url.replace("~year_report~", year_report)
         str2 = str1.replace("~group_id~", key[0:-3])
         str3 = str2.replace("~row_position~", key[-3:])
         source_url_new = str3.replace("~api_naming_convention~", api_naming_convention)
-        try:
-            r = requests.get(source_url_new, stream=True, verify=False, timeout=200)
-            if r.status_code == 200:
-                logging.info("Data source valid for at least one entity")
-                flag = 1
-                text = r.json()
-                frame = load_nested_list_into_df_without_headers(text)
-                frame["KPI_Name"] = key
-                list_temp.append(frame)
-            elif 400 >= r.status_code <= 499:
-                logging.info(r.status_code)
-            else:
-                logging.info(f"Source url : {source_url_new}")
-                logging.info(f"status code : {r.status_code}")
-        except OSError as e:
-            logging.info(f"error : {e}")
-    if flag == 0:
-        logging.info(f"Data not available for {destination_table} yet")
-        sys.exit(0)
-    logging.info("creating the dataframe...")
-    df = pd.concat(list_temp)
-    return df
+        kpi_urls.append((key, source_url_new))
+    return extract_kpi_data_and_convert_to_df(
+        kpi_urls, destination_table, max_concurrent_requests
+    )
 
 
 def load_nested_list_into_df_without_headers(text: typing.List) -> pd.DataFrame:
@@ -492,35 +444,53 @@ def extract_data_and_convert_to_df_state_level(
     api_naming_convention: str,
     source_url: str,
     destination_table: str,
+    max_concurrent_requests: int = 8,
 ) -> pd.DataFrame:
-    list_temp = []
-    flag = 0
+    kpi_urls = []
     for key in group_id:
         for sc in state_code:
-            logging.info(f"reading data from API for KPI {key}...")
-            logging.info(f"reading data from API for KPI {sc}...")
             str1 = source_url.replace("~year_report~", year_report)
             str2 = str1.replace("~group_id~", key[0:-3])
             str3 = str2.replace("~row_position~", key[-3:])
             str4 = str3.replace("~api_naming_convention~", api_naming_convention)
             source_url_new = str4.replace("~state_code~", sc)
-            try:
-                r = requests.get(source_url_new, stream=True, verify=False, timeout=200)
-                if r.status_code == 200:
-                    logging.info("Data source valid for at least one entity")
-                    flag = 1
-                    text = r.json()
-                    frame = load_nested_list_into_df_without_headers(text)
-                    frame["KPI_Name"] = key
-                    list_temp.append(frame)
-                elif 400 >= r.status_code <= 499:
-                    logging.info(r.status_code)
-                else:
-                    logging.info(f"Source url : {source_url_new}")
-                    logging.info(f"status code : {r.status_code}")
-
-            except OSError as e:
-                logging.info(f"error : {e}")
+            kpi_urls.append((key, source_url_new))
+    return extract_kpi_data_and_convert_to_df(
+        kpi_urls, destination_table, max_concurrent_requests
+    )
+
+
+def extract_kpi_data_and_convert_to_df(
+    kpi_urls: typing.List[typing.Tuple[str, str]],
+    destination_table: str,
+    max_concurrent_requests: int,
+) -> pd.DataFrame:
+    logging.info(
+        f"reading data from API for {len(kpi_urls)} requests, {max_concurrent_requests} at a time..."
+    )
+    list_temp = []
+    flag = 0
+    responses = fetch.get_many(
+        [source_url_new for _, source_url_new in kpi_urls],
+        max_workers=max_concurrent_requests,
+        verify=False,
+        timeout=200,
+    )
+    for (key, _), (source_url_new, r) in zip(kpi_urls, responses):
+        if isinstance(r, OSError):
+            logging.info(f"error : {r}")
+        elif r.status_code == 200:
+            logging.info(f"Data source valid for KPI {key}")
+            flag = 1
+            text = r.json()
+            frame = load_nested_list_into_df_without_headers(text)
+            frame["KPI_Name"] = key
+            list_temp.append(frame)
+        elif 400 >= r.status_code <= 499:
+            logging.info(r.status_code)
+        else:
+            logging.info(f"Source url : {source_url_new}")
+            logging.info(f"status code : {r.status_code}")
     if flag == 0:
         logging.info(f"Data not available for {destination_table} yet")
         sys.exit(0)
@@ -531,20 +501,12 @@ def extract_data_and_convert_to_df_state_level(
 
 def create_geo_id(df: pd.DataFrame, concat_col: str) -> pd.DataFrame:
     logging.info("Creating column geo_id...")
-    df = df.drop(0, axis=0)
     df["geo_id"] = ""
     for col in concat_col:
         df["geo_id"] = df["geo_id"] + df[col]
     return df
 
 
-def pad_zeroes_to_the_left(val: str, length: int) -> str:
-    if len(str(val)) < length:
-        return ("0" * (length - len(str(val)))) + str(val)
-    else:
-        return str(val)
-
-
 def rename_headers(df: pd.DataFrame, rename_mappings: dict) -> None:
     logging.info("Renaming headers...")
     df.rename(columns=rename_mappings, inplace=True)
@@ -555,46 +517,6 @@ def save_to_new_file(df: pd.DataFrame, file_path: str, sep: str = ",") -> None:
     df.to_csv(file_path, index=False, sep=sep)
 
 
-def append_batch_file(
-    df: pd.DataFrame,
-    chunk_number: int,
-    batch_file_path: str,
-    target_file_path: str,
-    skip_header: bool,
-    truncate_file: bool,
-) -> pd.DataFrame:
-    global target_df
-    truncate_file = True
-    with open(batch_file_path, "r") as data_file:
-        if truncate_file:
-            open(target_file_path, "w+").close()
-        with open(target_file_path, "w"):
-            if skip_header:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path} with skip header"
-                )
-                next(data_file)
-            else:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path}"
-                )
-            batch_df = pd.read_csv(data_file, sep="|")
-            logging.info("Making batch df -- >")
-            if chunk_number == 1:
-                target_df = batch_df
-                target_df.to_csv(target_file_path, index=False, sep="|")
-            else:
-                batchdfcols = list(batch_df.columns)
-                targetdfcols = dict.fromkeys(list(target_df.columns))
-                logging.info(f"Removing common columns from batch : {chunk_number}")
-                for columns in batchdfcols:
-                    if columns in targetdfcols:
-                        batch_df.drop(columns, axis=1, inplace=True)
-                target_df = pd.concat([target_df, batch_df], axis=1, ignore_index=False)
-                target_df.to_csv(target_file_path, index=False, sep="|")
-        return target_df
-
-
 def upload_file_to_gcs(
     file_path: pathlib.Path,
     target_gcs_bucket: str,
@@ -638,4 +560,6 @@ if __name__ == "__main__":
         rename_mappings_list=json.loads(os.environ.get("RENAME_MAPPINGS_LIST", r"{}")),
         input_csv_headers=json.loads(os.environ.get("INPUT_CSV_HEADERS", r"[]")),
         output_csv_headers=json.loads(os.environ.get("OUTPUT_CSV_HEADERS", r"[]")),
+        max_concurrent_requests=os.environ.get("MAX_CONCURRENT_REQUESTS", "8"),
+        transform_workers=os.environ.get("TRANSFORM_WORKERS", "1"),
     )
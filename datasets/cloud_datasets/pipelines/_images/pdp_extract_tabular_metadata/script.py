@@ -12,19 +12,24 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import concurrent.futures
 import dataclasses
 import datetime
 import logging
 import os
-import threading
 import time
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
 import pandas as pd
+from google.api_core import exceptions
 from google.cloud import bigquery
 
 NUM_THREADS = 5
+# Attempts per table before it is reported as failed and left out
+MAX_ATTEMPTS = 3
+# Log progress every this many tables
+PROGRESS_INTERVAL = 500
 
 # Update these three column variables if the schema in pipeline.yaml changes.
 TABULAR_DATASETS_COLUMNS = [
@@ -166,61 +171,210 @@ class DatasetInfo:
         return f"{self.project_id}.{self.dataset_id}"
 
 
+def _millis(timestamp: Any) -> Optional[int]:
+    """Milliseconds since the epoch, the precision of BQ table timestamps."""
+    if timestamp is None or pd.isnull(timestamp):
+        return None
+    return pd.Timestamp(timestamp).value // 1_000_000
+
+
+@dataclasses.dataclass
+class MetadataSnapshot:
+    """The tables and fields rows written by the last extraction of a project."""
+
+    tables: Dict[Tuple[str, str, str], Dict[str, Any]] = dataclasses.field(
+        default_factory=dict
+    )
+    fields: Dict[Tuple[str, str, str], List[Dict[str, Any]]] = dataclasses.field(
+        default_factory=dict
+    )
+
+    def is_current(self, key: Tuple[str, str, str], last_modified: int) -> bool:
+        """Return True if the snapshot holds the complete metadata of the table
+        as last modified at `last_modified`."""
+        table = self.tables.get(key)
+        return (
+            table is not None
+            and _millis(table["modified_at"]) == last_modified
+            and len(self.fields.get(key, [])) == table["num_columns"]
+        )
+
+
 class DatasetsTablesInfoExtractor:
     """Extracts BQ datasets and tables metadata and stores them in BQ."""
 
     def __init__(self, project_id: str, target_project_id: str, target_dataset: str):
         self.client = bigquery.Client(project_id)
+        self.project_id = project_id
         self.target_project_id = target_project_id
         self.target_dataset = target_dataset
         self.datasets = []
         self.tables = []
         self.tables_fields = []
-
-    def _read_tables_and_schema(self, full_table_ids: List[str]):
-        """Read the tables metadata and the schema of each table."""
-        for full_table_id in full_table_ids:
-            table_object = self.client.get_table(full_table_id)
-            table = TableInfo(table_object)
-            self.tables.append(table)
-            for sch in table_object.schema:
-                field_info = FieldInfo(sch)
-                field_info.project_id = table.project_id
-                field_info.dataset_id = table.dataset_id
-                field_info.table_id = table.table_id
-                self.tables_fields.append(field_info)
+        # Rows carried over unchanged from the last snapshot in incremental mode
+        self.reused_tables = []
+        self.reused_tables_fields = []
+
+    def _read_table_and_schema(
+        self, full_table_id: str
+    ) -> Optional[Tuple[TableInfo, List[FieldInfo]]]:
+        """Read the metadata and the schema of a table, retrying with backoff.
+
+        Returns None if the table was deleted after it was listed.
+        """
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            try:
+                table_object = self.client.get_table(full_table_id)
+                break
+            except exceptions.NotFound:
+                logging.warning("Table %s no longer exists", full_table_id)
+                return None
+            except exceptions.GoogleAPICallError as e:
+                if attempt == MAX_ATTEMPTS:
+                    raise
+                logging.info("Retrying table %s after: %s", full_table_id, e)
+                time.sleep(2**attempt)
+        table = TableInfo(table_object)
+        fields = []
+        for sch in table_object.schema:
+            field_info = FieldInfo(sch)
+            field_info.project_id = table.project_id
+            field_info.dataset_id = table.dataset_id
+            field_info.table_id = table.table_id
+            fields.append(field_info)
+        return table, fields
 
     def parallel_read_tables(self, full_table_ids: List[str]):
-        """Read tables metadata in parallel."""
+        """Read tables metadata on a pool of NUM_THREADS workers.
+
+        Every worker takes the next table as soon as it finishes one, so slow
+        tables do not hold up the rest. Results are collected on this thread
+        only. Tables that still fail after MAX_ATTEMPTS are logged and left
+        out.
+        """
         num_tables = len(full_table_ids)
-        potential_interval_size = num_tables // NUM_THREADS
-        residual = num_tables % NUM_THREADS
-        index = 0
-        threads = []
-        while index < num_tables:
-            actual_interval_size = potential_interval_size
-            if residual > 0:
-                actual_interval_size += 1
-                residual -= 1
-            tables_ids = full_table_ids[index : index + actual_interval_size]
-            tr = threading.Thread(
-                target=self._read_tables_and_schema, args=(tables_ids,)
+        failed = 0
+        st = time.time()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=NUM_THREADS) as executor:
+            futures = {
+                executor.submit(self._read_table_and_schema, full_table_id): (
+                    full_table_id
+                )
+                for full_table_id in full_table_ids
+            }
+            for done, future in enumerate(concurrent.futures.as_completed(futures), 1):
+                try:
+                    result = future.result()
+                except exceptions.GoogleAPICallError as e:
+                    failed += 1
+                    logging.error("Failed to read table %s: %s", futures[future], e)
+                    result = None
+                if result is not None:
+                    table, fields = result
+                    self.tables.append(table)
+                    self.tables_fields.extend(fields)
+                if done % PROGRESS_INTERVAL == 0 or done == num_tables:
+                    logging.info(
+                        "Read %s of %s tables (%.1f tables/s, %s failed)",
+                        done,
+                        num_tables,
+                        done / max(time.time() - st, 1e-6),
+                        failed,
+                    )
+
+    def load_snapshot(
+        self, tables_table_name: str, tables_fields_table_name: str
+    ) -> MetadataSnapshot:
+        """Read the rows written by the last extraction of this project."""
+        target = f"{self.target_project_id}.{self.target_dataset}"
+        job_config = bigquery.QueryJobConfig(
+            query_parameters=[
+                bigquery.ScalarQueryParameter("project_id", "STRING", self.project_id)
+            ]
+        )
+        tables_query = f"""
+            SELECT * EXCEPT (extracted_at)
+            FROM `{target}.{tables_table_name}`
+            WHERE project_id = @project_id AND extracted_at = (
+                SELECT MAX(extracted_at)
+                FROM `{target}.{tables_table_name}`
+                WHERE project_id = @project_id
+            )
+        """
+        fields_query = f"""
+            SELECT * EXCEPT (extracted_at)
+            FROM `{target}.{tables_fields_table_name}`
+            WHERE project_id = @project_id
+        """
+        snapshot = MetadataSnapshot()
+        try:
+            for row in self.client.query(tables_query, job_config=job_config):
+                row = dict(row.items())
+                key = (row["project_id"], row["dataset_id"], row["table_id"])
+                snapshot.tables[key] = row
+            for row in self.client.query(fields_query, job_config=job_config):
+                row = dict(row.items())
+                key = (row["project_id"], row["dataset_id"], row["table_id"])
+                snapshot.fields.setdefault(key, []).append(row)
+        except exceptions.NotFound:
+            logging.info("No metadata snapshot found in %s", target)
+        logging.info("Snapshot holds %s tables", len(snapshot.tables))
+        return snapshot
+
+    def _tables_last_modified(
+        self, dataset_reference: bigquery.DatasetReference
+    ) -> Dict[str, int]:
+        """Last modification time of each table in a dataset, in milliseconds,
+        read with one query instead of one `get_table` per table."""
+        query = (
+            "SELECT table_id, last_modified_time FROM "
+            f"`{dataset_reference.project}.{dataset_reference.dataset_id}.__TABLES__`"
+        )
+        try:
+            return {
+                row["table_id"]: row["last_modified_time"]
+                for row in self.client.query(query)
+            }
+        except exceptions.GoogleAPICallError as e:
+            logging.warning(
+                "Unable to list modification times in %s, reading all its tables: %s",
+                dataset_reference.dataset_id,
+                e,
             )
-            threads.append(tr)
-            index += actual_interval_size
-        for tr in threads:
-            tr.start()
-        for tr in threads:
-            tr.join()
+            return {}
+
+    def _changed_tables(
+        self,
+        dataset_reference: bigquery.DatasetReference,
+        full_table_ids: List[str],
+        snapshot: MetadataSnapshot,
+    ) -> List[str]:
+        """Return the tables modified since the snapshot, carrying the
+        snapshot rows of the other tables over."""
+        last_modified = self._tables_last_modified(dataset_reference)
+        changed = []
+        for full_table_id in full_table_ids:
+            table_id = full_table_id.split(".")[-1]
+            key = (dataset_reference.project, dataset_reference.dataset_id, table_id)
+            if table_id in last_modified and snapshot.is_current(
+                key, last_modified[table_id]
+            ):
+                self.reused_tables.append(snapshot.tables[key])
+                self.reused_tables_fields.extend(snapshot.fields[key])
+            else:
+                changed.append(full_table_id)
+        return changed
 
     def get_datasets_as_dict(self) -> Dict[str, Any]:
         return [dataclasses.asdict(d) for d in self.datasets]
 
     def get_tables_as_dict(self) -> Dict[str, Any]:
-        return [dataclasses.asdict(t) for t in self.tables]
+        return [dataclasses.asdict(t) for t in self.tables] + self.reused_tables
 
     def get_tables_fields_as_dict(self) -> Dict[str, Any]:
-        return [dataclasses.asdict(t) for t in self.tables_fields]
+        return [
+            dataclasses.asdict(t) for t in self.tables_fields
+        ] + self.reused_tables_fields
 
     def get_datasets_as_dataframe(self) -> pd.DataFrame:
         return pd.DataFrame(self.get_datasets_as_dict())
@@ -231,8 +385,12 @@ class DatasetsTablesInfoExtractor:
     def get_tables_fields_as_dataframe(self) -> pd.DataFrame:
         return pd.DataFrame(self.get_tables_fields_as_dict())
 
-    def read_datasets(self):
-        """Read the datasets and tables metadata."""
+    def read_datasets(self, snapshot: Optional[MetadataSnapshot] = None):
+        """Read the datasets and tables metadata.
+
+        Given a `snapshot`, only the tables modified since it was taken are
+        read again.
+        """
         datasets_list = list(self.client.list_datasets())
         full_table_ids = []
         logging.info("Enlisted Datasets: %s", len(datasets_list))
@@ -243,14 +401,18 @@ class DatasetsTablesInfoExtractor:
             dataset = DatasetInfo(dataset_item, dataset_reference)
             table_ids = list(self.client.list_tables(dataset_reference))
             dataset.num_tables = len(table_ids)
-            full_table_ids.extend(
-                [t.full_table_id.replace(":", ".") for t in table_ids]
-            )
+            dataset_table_ids = [t.full_table_id.replace(":", ".") for t in table_ids]
+            if snapshot is not None:
+                dataset_table_ids = self._changed_tables(
+                    dataset_reference, dataset_table_ids, snapshot
+                )
+            full_table_ids.extend(dataset_table_ids)
 
             self.datasets.append(dataset)
 
         self.parallel_read_tables(full_table_ids)
         logging.info("Extracted Datasets: %s", len(self.datasets))
+        logging.info("Unchanged Tables: %s", len(self.reused_tables))
         logging.info("Extracted Tables: %s", len(self.tables))
         logging.info("Extracted Fields: %s", len(self.tables_fields))
 
@@ -298,9 +460,10 @@ class DatasetsTablesInfoExtractor:
         logging.debug("write_tables_to_bq is done")
 
     def write_tables_fields_to_bq(
-        self, table_name: str, extracted_time: datetime.datetime
+        self, table_name: str, extracted_time: datetime.datetime, truncate: bool = True
     ):
-        """Write tables_fields to BQ."""
+        """Write tables_fields to BQ, replacing the rows of earlier runs unless
+        `truncate` is False."""
         dataset_ref = bigquery.DatasetReference(
             self.target_project_id, self.target_dataset
         )
@@ -310,7 +473,9 @@ class DatasetsTablesInfoExtractor:
         job_config = bigquery.job.LoadJobConfig(
             autodetect=False,
             max_bad_records=5,
-            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE,
+            write_disposition=bigquery.WriteDisposition.WRITE_TRUNCATE
+            if truncate
+            else bigquery.WriteDisposition.WRITE_APPEND,
         )
 
         tables_fields_dataframe = self.get_tables_fields_as_dataframe()
@@ -332,19 +497,31 @@ def main(
     tabular_dataset_table_name: str,
     tables_table_name: str,
     tables_fields_table_name: str,
+    incremental: bool = False,
 ):
     """Entry point for this cloud function."""
     st = time.time()
-    for project_id in source_projects_ids.split(","):
-        extractor = DatasetsTablesInfoExtractor(
-            project_id, target_project_id, target_dataset
-        )
-        extractor.read_datasets()
+    extractors = [
+        DatasetsTablesInfoExtractor(project_id, target_project_id, target_dataset)
+        for project_id in source_projects_ids.split(",")
+    ]
+    # The fields table only holds the last run, so every snapshot is read
+    # before the first project overwrites it.
+    snapshots = [
+        extractor.load_snapshot(tables_table_name, tables_fields_table_name)
+        if incremental
+        else None
+        for extractor in extractors
+    ]
+    for index, (extractor, snapshot) in enumerate(zip(extractors, snapshots)):
+        extractor.read_datasets(snapshot)
         extracted = datetime.datetime.now()
         extractor.write_datasets_to_bq(tabular_dataset_table_name, extracted)
         extractor.write_tables_to_bq(tables_table_name, extracted)
-        extractor.write_tables_fields_to_bq(tables_fields_table_name, extracted)
-    logging.info("Total time to run this function: ", time.time() - st)
+        extractor.write_tables_fields_to_bq(
+            tables_fields_table_name, extracted, truncate=index == 0
+        )
+    logging.info("Total time to run this function: %.1fs", time.time() - st)
 
 
 if __name__ == "__main__":
@@ -357,4 +534,5 @@ if __name__ == "__main__":
         tabular_dataset_table_name=os.environ["TABULAR_DATASET_TABLE_NAME"],
         tables_table_name=os.environ["TABLES_TABLE_NAME"],
         tables_fields_table_name=os.environ["TABLES_FIELDS_TABLE_NAME"],
+        incremental=os.environ.get("INCREMENTAL", "false").lower() == "true",
     )
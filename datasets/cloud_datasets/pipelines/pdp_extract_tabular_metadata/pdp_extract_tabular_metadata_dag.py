@@ -47,6 +47,7 @@ with DAG(
             "TABULAR_DATASET_TABLE_NAME": "{{ var.json.cloud_datasets.pdp_extract_tabular_metadata.tabular_dataset_table_name }}",
             "TABLES_TABLE_NAME": "{{ var.json.cloud_datasets.pdp_extract_tabular_metadata.tables_table_name }}",
             "TABLES_FIELDS_TABLE_NAME": "{{ var.json.cloud_datasets.pdp_extract_tabular_metadata.tables_fields_table_name }}",
+            "INCREMENTAL": "true",
         },
         resources={"request_memory": "128M", "request_cpu": "200m"},
     )
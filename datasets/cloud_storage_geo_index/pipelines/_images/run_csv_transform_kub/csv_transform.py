@@ -13,7 +13,6 @@
 # limitations under the License.
 
 import datetime
-import gzip
 import json
 import logging
 import os
@@ -108,10 +107,9 @@ def execute_pipeline(
     table_partition_field_type: str,
 ) -> None:
     download_file(source_url, source_zipfile)
-    gz_decompress(infile=source_zipfile, tofile=source_file, delete_zipfile=True)
     process_source_file(
         source_url=source_url,
-        source_file=source_file,
+        source_file=source_zipfile,
         target_file=target_file,
         chunksize=chunksize,
         input_headers=input_csv_headers,
@@ -149,7 +147,7 @@ def execute_pipeline(
                 field_delimiter="|",
             )
             if remove_source_file == "Y":
-                os.remove(source_file)
+                os.remove(source_zipfile)
             else:
                 pass
             if delete_target_file == "Y":
@@ -165,15 +163,6 @@ def execute_pipeline(
         )
 
 
-def gz_decompress(infile: str, tofile: str, delete_zipfile: bool = False) -> None:
-    logging.info(f"Decompressing {infile}")
-    with open(infile, "rb") as inf, open(tofile, "w", encoding="utf8") as tof:
-        decom_str = gzip.decompress(inf.read()).decode("utf-8")
-        tof.write(decom_str)
-    if delete_zipfile:
-        os.remove(infile)
-
-
 def process_source_file(
     source_url: str,
     source_file: str,
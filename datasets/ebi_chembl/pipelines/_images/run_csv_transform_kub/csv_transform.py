@@ -12,17 +12,28 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import concurrent.futures
 import csv
 import datetime
 import json
 import logging
+import multiprocessing
 import os
 import pathlib
+import re
 import typing
 
 from google.cloud import storage
+from pdp_transform import gcs
 from pgdumplib import dump, load
 
+# Column list of the COPY statement of a table data entry
+COPY_COLUMNS_PATTERN = re.compile(r"COPY [^(]+\((?P<columns>[^)]*)\) FROM stdin")
+WRITE_BUFFER_SIZE = 1 << 20
+
+# The loaded dump, inherited by the forked table writers
+_dump_data: typing.Optional[dump.Dump] = None
+
 
 def main(
     output_folder: pathlib.Path,
@@ -32,6 +43,7 @@ def main(
     tables: typing.List[str],
     target_gcs_bucket: str,
     target_gcs_folder: str,
+    transform_workers: int = 1,
 ) -> None:
     logging.info(
         f"EMBL EBI ChEMBL Dataset pipeline process started for table(s) -  {tables} at "
@@ -42,11 +54,15 @@ def main(
     download_blob(source_gcs_bucket, source_gcs_object, source_file)
     logging.info(f"Reading {source_file}")
     dump_data = load(source_file)
-    write_table_to_csv(dump_data, tables, output_folder)
-    for file in os.listdir(output_folder):
-        full_path = f"{output_folder}/{file}"
-        target_gcs_path = f"{target_gcs_folder}/{file}"
-        upload_file_to_gcs(full_path, target_gcs_bucket, target_gcs_path)
+    write_tables(
+        dump_data,
+        source_file,
+        tables,
+        output_folder,
+        target_gcs_bucket,
+        target_gcs_folder,
+        transform_workers,
+    )
     logging.info(
         f"EMBL EBI ChEMBL Dataset pipeline process completed for table(s) -  {tables} at "
         + str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
@@ -67,33 +83,99 @@ def download_blob(
     logging.info("Downloading Completed.")
 
 
-def write_table_to_csv(
-    dump_data: dump.Dump, tables: typing.List[str], output_folder: pathlib.Path
+def table_data_sizes(
+    dump_data: dump.Dump, source_file: pathlib.Path
+) -> typing.Dict[str, int]:
+    """Size in the dump of the data of every public table, from the TOC offsets."""
+    entries = sorted(
+        (entry for entry in dump_data.entries if entry.offset),
+        key=lambda entry: entry.offset,
+    )
+    ends = [entry.offset for entry in entries[1:]] + [os.path.getsize(source_file)]
+    return {
+        entry.tag: end - entry.offset
+        for entry, end in zip(entries, ends)
+        if entry.desc == "TABLE DATA" and entry.namespace == "public"
+    }
+
+
+def write_tables(
+    dump_data: dump.Dump,
+    source_file: pathlib.Path,
+    tables: typing.List[str],
+    output_folder: pathlib.Path,
+    target_gcs_bucket: str,
+    target_gcs_folder: str,
+    transform_workers: int,
 ) -> None:
-    length = len(tables)
-    for idx, table in enumerate(tables):
-        output_file = f"{output_folder}/{table}_data_output.csv"
-        logging.info(f"\t\t\t{idx+1} out of {length} tables.")
-        logging.info(f"Writing {table} - table to {output_file} file")
-        with open(output_file, "w") as fb:
-            writer = csv.writer(
-                fb, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL
-            )
-            for line in dump_data.table_data("public", table):
-                writer.writerow(line)
-
-
-def upload_file_to_gcs(
-    source_file: str, target_gcs_bucket: str, target_gcs_path: str
+    """Writes every table to its own file on a pool of forked workers,
+    uploading each file as soon as it is complete.
+
+    Tables are handed out largest first, so a worker that draws a small
+    table moves on to the next one instead of leaving the big ones to the
+    end.
+    """
+    global _dump_data
+    _dump_data = dump_data
+    sizes = table_data_sizes(dump_data, source_file)
+    tables = sorted(tables, key=lambda table: sizes.get(table, 0), reverse=True)
+    logging.info(f"Writing {len(tables)} tables with {transform_workers} workers")
+    # Forking shares the loaded dump with the workers without pickling it.
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=transform_workers, mp_context=multiprocessing.get_context("fork")
+    ) as writers:
+        futures = [
+            writers.submit(write_table_to_csv, table, output_folder) for table in tables
+        ]
+        with concurrent.futures.ThreadPoolExecutor(max_workers=4) as uploaders:
+            uploads = [
+                uploaders.submit(
+                    upload_output_file,
+                    future.result(),
+                    target_gcs_bucket,
+                    target_gcs_folder,
+                )
+                for future in concurrent.futures.as_completed(futures)
+            ]
+    for upload in uploads:
+        upload.result()
+
+
+def write_table_to_csv(table: str, output_folder: pathlib.Path) -> str:
+    """Writes one table of the dump, headed by its column names."""
+    output_file = f"{output_folder}/{table}_data_output.csv"
+    logging.info(f"Writing {table} - table to {output_file} file")
+    with open(output_file, "w", newline="", buffering=WRITE_BUFFER_SIZE) as fb:
+        writer = csv.writer(fb, delimiter=",", quotechar='"', quoting=csv.QUOTE_MINIMAL)
+        writer.writerow(table_columns(_dump_data, table))
+        writer.writerows(_dump_data.table_data("public", table))
+    logging.info(f"Finished writing {table} - table")
+    return output_file
+
+
+def table_columns(dump_data: dump.Dump, table: str) -> typing.List[str]:
+    """Column names of a table, from the COPY statement of its data entry."""
+    for entry in dump_data.entries:
+        if (
+            entry.desc == "TABLE DATA"
+            and entry.namespace == "public"
+            and entry.tag == table
+        ):
+            match = COPY_COLUMNS_PATTERN.match(entry.copy_stmt or "")
+            if match:
+                return [
+                    column.strip().strip('"') for column in match["columns"].split(",")
+                ]
+    raise ValueError(f"No column list found for table {table}")
+
+
+def upload_output_file(
+    output_file: str, target_gcs_bucket: str, target_gcs_folder: str
 ) -> None:
-    logging.info(
-        f"Uploading output file {source_file} to gs://{target_gcs_bucket}/{target_gcs_path}"
-    )
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(target_gcs_bucket)
-    blob = bucket.blob(target_gcs_path)
-    blob.upload_from_filename(source_file)
-    logging.info("Successfully uploaded file to gcs bucket.")
+    """Uploads a finished table file and removes the local copy."""
+    target_gcs_path = f"{target_gcs_folder}/{os.path.basename(output_file)}"
+    gcs.upload_file_to_gcs(output_file, target_gcs_bucket, target_gcs_path)
+    os.remove(output_file)
 
 
 if __name__ == "__main__":
@@ -106,4 +188,5 @@ if __name__ == "__main__":
         tables=json.loads(os.environ.get("TABLES", "[]")),
         target_gcs_bucket=os.environ.get("TARGET_GCS_BUCKET", ""),
         target_gcs_folder=os.environ.get("TARGET_GCS_FOLDER", ""),
+        transform_workers=int(os.environ.get("TRANSFORM_WORKERS", "1")),
     )
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import datetime
+import functools
 import json
 import logging
 import os
@@ -24,6 +25,7 @@ import pandas as pd
 import requests
 from google.cloud import bigquery, storage
 from google.cloud.exceptions import NotFound
+from pdp_transform import bq, files, gcs, parallel, transforms
 
 
 def main(
@@ -44,6 +46,8 @@ def main(
     data_dtypes: dict,
     output_headers: typing.List[str],
     drop_dest_table: str,
+    transform_workers: str,
+    period_concurrency: str,
 ) -> None:
     logging.info(f"{pipeline_name} process started")
     pathlib.Path("./files").mkdir(parents=True, exist_ok=True)
@@ -66,6 +70,8 @@ def main(
         chunksize=chunksize,
         field_delimiter="|",
         drop_dest_table=drop_dest_table,
+        transform_workers=int(transform_workers),
+        period_concurrency=int(period_concurrency),
     )
     logging.info(f"{pipeline_name} process completed")
 
@@ -88,6 +94,8 @@ def execute_pipeline(
     chunksize: str,
     field_delimiter: str,
     drop_dest_table: str = "N",
+    transform_workers: int = 1,
+    period_concurrency: int = 1,
 ) -> None:
     create_dest_table(
         project_id=project_id,
@@ -97,209 +105,179 @@ def execute_pipeline(
         bucket_name=target_gcs_bucket,
         drop_table=(drop_dest_table == "Y"),
     )
+    # Files for the last two years may not be published yet, so errors
+    # downloading them are not fatal.
     end_year = datetime.datetime.today().year - 2
-    for yr in range(start_year, end_year + 1, 1):
-        process_year_data(
-            project_id=project_id,
-            dataset_id=dataset_id,
-            table_name=table_name,
-            year_field_name=year_field_name,
-            year_field_type=year_field_type,
-            year=yr,
-            continue_on_error=False,
-            source_url=source_url,
-            dest_path=dest_path,
-            input_headers=input_headers,
-            output_headers=output_headers,
-            data_dtypes=data_dtypes,
-            chunksize=chunksize,
-            field_delimiter=field_delimiter,
-            target_gcs_bucket=target_gcs_bucket,
-            target_gcs_path=target_gcs_path,
-        )
+    years = [(yr, False) for yr in range(start_year, end_year + 1, 1)]
     st_year = datetime.datetime.today().year - 1
     end_year = datetime.datetime.today().year
-    for yr in range(st_year, end_year + 1, 1):
-        process_year_data(
-            project_id=project_id,
-            dataset_id=dataset_id,
-            table_name=table_name,
-            year_field_name=year_field_name,
-            year_field_type=year_field_type,
-            year=yr,
-            continue_on_error=True,
-            source_url=source_url,
-            dest_path=dest_path,
-            input_headers=input_headers,
-            output_headers=output_headers,
-            data_dtypes=data_dtypes,
-            chunksize=chunksize,
-            field_delimiter=field_delimiter,
-            target_gcs_bucket=target_gcs_bucket,
-            target_gcs_path=target_gcs_path,
-        )
+    years += [(yr, True) for yr in range(st_year, end_year + 1, 1)]
+    loaded_years = years_with_data(
+        project_id, dataset_id, table_name, year_field_name, year_field_type
+    )
+    parallel.run_pipelined(
+        years,
+        [
+            functools.partial(
+                download_year_data,
+                project_id=project_id,
+                dataset_id=dataset_id,
+                table_name=table_name,
+                loaded_years=loaded_years,
+                source_url=source_url,
+                dest_path=dest_path,
+            ),
+            functools.partial(
+                transform_year_data,
+                dest_path=dest_path,
+                input_headers=input_headers,
+                output_headers=output_headers,
+                data_dtypes=data_dtypes,
+                chunksize=chunksize,
+                field_delimiter=field_delimiter,
+                transform_workers=transform_workers,
+            ),
+            functools.partial(
+                load_year_data,
+                project_id=project_id,
+                dataset_id=dataset_id,
+                table_name=table_name,
+                field_delimiter=field_delimiter,
+                target_gcs_bucket=target_gcs_bucket,
+                target_gcs_path=target_gcs_path,
+            ),
+        ],
+        max_in_flight=period_concurrency,
+    )
 
 
-def process_year_data(
+def download_year_data(
+    year_to_process: typing.Tuple[int, bool],
     project_id: str,
     dataset_id: str,
     table_name: str,
-    year_field_name: str,
-    year_field_type: str,
-    year: str,
-    continue_on_error: bool,
+    loaded_years: typing.Optional[typing.Set[int]],
     source_url: str,
     dest_path: str,
+) -> typing.Optional[dict]:
+    year, continue_on_error = year_to_process
+    logging.info(f"Processing year {year} data.")
+    if loaded_years is None or year in loaded_years:
+        logging.info(
+            f"Table {project_id}.{dataset_id}.{table_name} has data.  Skipping load process for year {year}"
+        )
+        logging.info(f"Processing year {year} data completed.")
+        return None
+    src_url = source_url.replace("YEAR_ITERATOR", str(year))
+    url_file = os.path.split(src_url)[1]
+    url_file_csv = url_file.replace(".zip", ".csv")
+    year_files = {
+        "year": year,
+        "source_file": f"{dest_path}/source_{url_file}".lower(),
+        "source_csv_file": f"{dest_path}/{url_file_csv}".lower(),
+        "target_file": f"{dest_path}/target_{url_file_csv}".lower(),
+    }
+    file_exists = download_file_http(
+        source_url=src_url,
+        source_file=year_files["source_file"],
+        continue_on_error=continue_on_error,
+    )
+    if not file_exists:
+        logging.info(f"Processing year {year} data completed.")
+        return None
+    return year_files
+
+
+def transform_year_data(
+    year_files: dict,
+    dest_path: str,
     input_headers: typing.List[str],
     output_headers: typing.List[str],
     data_dtypes: dict,
     chunksize: str,
     field_delimiter: str,
+    transform_workers: int = 1,
+) -> dict:
+    extracted_files = unpack_file(
+        infile=year_files["source_file"], dest_path=dest_path, compression_type="zip"
+    )
+    # Other years are downloaded and loaded alongside this one in `dest_path`,
+    # so only this year's own files are touched
+    rename_files_lowercase(dir=dest_path, files=extracted_files)
+    process_source_file(
+        source_file=year_files["source_file"],
+        target_file=year_files["target_file"],
+        input_headers=input_headers,
+        output_headers=output_headers,
+        dtypes=data_dtypes,
+        chunksize=chunksize,
+        field_delimiter=field_delimiter,
+        transform_workers=transform_workers,
+    )
+    return year_files
+
+
+def load_year_data(
+    year_files: dict,
+    project_id: str,
+    dataset_id: str,
+    table_name: str,
+    field_delimiter: str,
     target_gcs_bucket: str,
     target_gcs_path: str,
     remove_file: bool = True,
-):
-    logging.info(f"Processing year {year} data.")
-    table_has_data = table_has_year_data(
-        project_id, dataset_id, table_name, year_field_name, year_field_type, year
+) -> dict:
+    target_file = year_files["target_file"]
+    load_data_to_bq(
+        project_id=project_id,
+        dataset_id=dataset_id,
+        table_id=table_name,
+        file_path=target_file,
+        field_delimiter=field_delimiter,
+        truncate_table=False,
     )
-    if table_has_data or table_has_data is None:
-        logging.info(
-            f"Table {project_id}.{dataset_id}.{table_name} has data.  Skipping load process for year {year}"
-        )
-    else:
-        src_url = source_url.replace("YEAR_ITERATOR", str(year))
-        url_file = os.path.split(src_url)[1]
-        url_file_csv = url_file.replace(".zip", ".csv")
-        source_file = f"{dest_path}/source_{url_file}"
-        source_file = source_file.lower()
-        source_csv_file = f"{dest_path}/{url_file_csv}"
-        source_csv_file = source_csv_file.lower()
-        target_file = f"{dest_path}/target_{url_file_csv}"
-        target_file = target_file.lower()
-        file_exists = download_file_http(
-            source_url=src_url,
-            source_file=source_file,
-            continue_on_error=continue_on_error,
+    if os.path.exists(target_file):
+        gcs.upload_file_to_gcs(
+            file_path=target_file,
+            target_gcs_bucket=target_gcs_bucket,
+            target_gcs_path=target_gcs_path,
         )
-        if file_exists:
-            unpack_file(infile=source_file, dest_path=dest_path, compression_type="zip")
-            rename_files_lowercase(dir=dest_path)
-            process_source_file(
-                source_file=source_file,
-                target_file=target_file,
-                input_headers=input_headers,
-                output_headers=output_headers,
-                dtypes=data_dtypes,
-                chunksize=chunksize,
-                field_delimiter=field_delimiter,
-            )
-            load_data_to_bq(
-                project_id=project_id,
-                dataset_id=dataset_id,
-                table_id=table_name,
-                file_path=target_file,
-                field_delimiter=field_delimiter,
-                truncate_table=False,
-            )
-            if os.path.exists(target_file):
-                upload_file_to_gcs(
-                    file_path=target_file,
-                    target_gcs_bucket=target_gcs_bucket,
-                    target_gcs_path=target_gcs_path,
-                )
-            if remove_file:
-                os.remove(source_file)
-                os.remove(source_csv_file)
-                os.remove(target_file)
-            else:
-                pass
-        else:
-            pass
-    logging.info(f"Processing year {year} data completed.")
+    if remove_file:
+        os.remove(year_files["source_file"])
+        os.remove(year_files["source_csv_file"])
+        os.remove(target_file)
+    logging.info(f"Processing year {year_files['year']} data completed.")
+    return year_files
 
 
-def rename_files_lowercase(dir: str = "files") -> None:
-    for file in os.listdir(dir):
+def rename_files_lowercase(dir: str, files: typing.List[str]) -> None:
+    for file in files:
         new_filename = file.lower()
         logging.info(f"{dir}  {file}  {new_filename}")
         os.rename(f"{dir}/{file}", f"{dir}/{new_filename}")
 
 
-def table_has_year_data(
+def years_with_data(
     project_id: str,
     dataset_id: str,
     table_name: str,
     year_field_name: str,
     year_field_type: str,
-    year: str,
-) -> bool:
-    number_rows = number_rows_in_table(
-        project_id, dataset_id, table_name, year_field_name, year_field_type, year
-    )
-    if number_rows > 0:
-        return True
-    elif number_rows == -1:
-        return None
-    else:
-        return False
-
-
-def table_exists(project_id: str, dataset_id: str, table_name: str) -> bool:
-    client = bigquery.Client(project=project_id)
-    tables = client.list_tables(dataset_id)
-    found_table = False
-    for tbl in tables:
-        if tbl.table_id == table_name:
-            found_table = True
-    return found_table
+) -> typing.Optional[typing.Set[int]]:
+    """Returns the years that already have rows in the table.
 
-
-def field_exists(
-    project_id: str, dataset_id: str, table_name: str, field_name: str
-) -> bool:
-    if table_exists(project_id, dataset_id, table_name):
-        client = bigquery.Client(project=project_id)
-        table_ref = f"{dataset_id}.{table_name}"
-        tbl_schema = client.get_table(table_ref).schema
-        found_field = False
-        for field in tbl_schema:
-            if field.name == field_name:
-                found_field = True
-        return found_field
-    else:
-        return False
-
-
-def number_rows_in_table(
-    project_id: str,
-    dataset_id: str,
-    table_name: str,
-    year_field_name: str,
-    year_field_type: str,
-    year: str,
-) -> int:
-    check_field_exists = field_exists(
-        project_id, dataset_id, table_name, year_field_name
-    )
-    if check_field_exists:
-        client = bigquery.Client(project=project_id)
-        query = f"""
-            SELECT count(1) AS number_of_rows
-            FROM {dataset_id}.{table_name}
-            WHERE
-        """
-        if year_field_type == "DATE":
-            query = query + f" FORMAT_DATE('%Y', {year_field_name}) = '{year}'"
-        else:
-            query = query + f" {year_field_name} = {year}"
-        job_config = bigquery.QueryJobConfig()
-        query_job = client.query(query, job_config=job_config)
-        for row in query_job.result():
-            count_rows = row.number_of_rows
-        return int(count_rows)
+    Returns None when the table or its year field does not exist.
+    """
+    if not bq.table_metadata(project_id).field_exists(
+        dataset_id, table_name, year_field_name
+    ):
+        return None
+    if year_field_type == "DATE":
+        year_expr = f"FORMAT_DATE('%Y', {year_field_name})"
     else:
-        return -1
+        year_expr = year_field_name
+    counts = bq.count_rows_by_period(project_id, dataset_id, [table_name], [year_expr])
+    return {int(year) for (_, year), number_rows in counts.items() if number_rows > 0}
 
 
 def process_source_file(
@@ -310,8 +288,10 @@ def process_source_file(
     dtypes: dict,
     chunksize: str,
     field_delimiter: str,
+    transform_workers: int = 1,
 ) -> None:
     logging.info(f"Opening batch file {source_file}")
+    writer = files.ChunkWriter(target_file, sep=field_delimiter)
     with pd.read_csv(
         source_file,  # path to main source file to load in batches
         engine="python",
@@ -324,22 +304,15 @@ def process_source_file(
         dtype=dtypes,
         keep_default_na=True,
         na_values=[" "],
-    ) as reader:
-        for chunk_number, chunk in enumerate(reader):
-            target_file_batch = str(target_file).replace(
-                ".csv", "-" + str(chunk_number) + ".csv"
-            )
-            df = pd.DataFrame()
-            df = pd.concat([df, chunk])
-            process_chunk(
-                df=df,
-                target_file_batch=target_file_batch,
-                target_file=target_file,
-                include_header=(chunk_number == 0),
-                truncate_file=(chunk_number == 0),
-                field_delimiter=field_delimiter,
-                output_headers=output_headers,
-            )
+    ) as reader, writer:
+        transform_chunk = functools.partial(
+            process_chunk, output_headers=output_headers
+        )
+        for chunk_number, df in enumerate(
+            parallel.map_ordered(transform_chunk, reader, workers=transform_workers)
+        ):
+            logging.info(f"Writing batch #{chunk_number} of {source_file}")
+            writer.write(df)
 
 
 def download_file_http(
@@ -374,19 +347,24 @@ def download_file_http(
         return False
 
 
-def unpack_file(infile: str, dest_path: str, compression_type: str = "zip") -> None:
+def unpack_file(
+    infile: str, dest_path: str, compression_type: str = "zip"
+) -> typing.List[str]:
+    """Unpacks `infile` into `dest_path` and returns the names of the files
+    extracted"""
     if os.path.exists(infile):
         if compression_type == "zip":
             logging.info(f"Unpacking {infile} to {dest_path}")
             with zip.ZipFile(infile, mode="r") as zipf:
                 zipf.extractall(dest_path)
-                zipf.close()
+                return [name for name in zipf.namelist() if not name.endswith("/")]
         else:
             logging.info(
                 f"{infile} ignored as it is not compressed or is of unknown compression"
             )
     else:
         logging.info(f"{infile} not unpacked because it does not exist.")
+    return []
 
 
 def load_data_to_bq(
@@ -400,7 +378,7 @@ def load_data_to_bq(
     logging.info(
         f"Loading data from {file_path} into {project_id}.{dataset_id}.{table_id} started"
     )
-    client = bigquery.Client(project=project_id)
+    client = bq.bigquery_client(project_id)
     table_ref = client.dataset(dataset_id).table(table_id)
     job_config = bigquery.LoadJobConfig()
     job_config.source_format = bigquery.SourceFormat.CSV
@@ -433,7 +411,7 @@ def create_dest_table(
 ) -> bool:
     table_ref = f"{project_id}.{dataset_id}.{table_id}"
     logging.info(f"Attempting to create table {table_ref} if it doesn't already exist")
-    client = bigquery.Client()
+    client = bq.bigquery_client(project_id)
     table_exists = False
     try:
         table = client.get_table(table_ref)
@@ -442,6 +420,7 @@ def create_dest_table(
         if drop_table:
             logging.info("Dropping existing table")
             client.delete_table(table)
+            bq.table_metadata(project_id).invalidate(dataset_id, table_id)
             table = None
     except NotFound:
         table = None
@@ -467,6 +446,7 @@ def create_dest_table(
                 table.partitioning_type = table_partition_field_type
                 table.time_partitioning.field = table_partition_field
             client.create_table(table)
+            bq.table_metadata(project_id).invalidate(dataset_id, table_id)
             print(f"Table {table_ref} was created".format(table_id))
             table_exists = True
         else:
@@ -518,34 +498,25 @@ def create_table_schema(
 
 def process_chunk(
     df: pd.DataFrame,
-    target_file_batch: str,
-    target_file: str,
-    include_header: bool,
-    truncate_file: bool,
-    field_delimiter: str,
     output_headers: typing.List[str],
-) -> None:
-    date_fields = ["date_local", "date_of_last_change"]
-    df = resolve_date_format(df, date_fields, "%Y-%m-%d %H:%M:%S")
-    df = truncate_date_field(df, date_fields, "%Y-%m-%d %H:%M:%S")
-    date_fields = [
+) -> pd.DataFrame:
+    for fld in ["date_local", "date_of_last_change"]:
+        df[fld] = transforms.normalize_datetime(
+            df[fld], ["%Y-%m-%d", "%Y-%m-%d %H:%M"], "%Y-%m-%d"
+        )
+    for fld in [
         "first_max_datetime",
         "second_max_datetime",
         "third_max_datetime",
         "fourth_max_datetime",
         "first_no_max_datetime",
         "second_no_max_datetime",
-    ]
-    df = resolve_date_format(df, date_fields, "%Y-%m-%d %H:%M")
+    ]:
+        df[fld] = transforms.normalize_datetime(
+            df[fld], ["%Y-%m-%d %H:%M", "%Y-%m-%d", "%Y-%m-%d %H:%M:%S"]
+        )
     df = reorder_headers(df, output_headers)
-    save_to_new_file(df=df, file_path=str(target_file_batch), sep=field_delimiter)
-    append_batch_file(
-        batch_file_path=target_file_batch,
-        target_file_path=target_file,
-        include_header=include_header,
-        truncate_target_file=truncate_file,
-    )
-    logging.info(f"Processing Batch {target_file_batch} completed")
+    return df
 
 
 def reorder_headers(df: pd.DataFrame, output_headers: typing.List[str]) -> pd.DataFrame:
@@ -554,120 +525,6 @@ def reorder_headers(df: pd.DataFrame, output_headers: typing.List[str]) -> pd.Da
     return df
 
 
-def resolve_date_format(
-    df: pd.DataFrame, date_fields: typing.List[str], from_format: str
-) -> pd.DataFrame:
-    for col in df.columns:
-        if df[col].name in date_fields:
-            logging.info(f"Resolving datetime on {col}")
-            df[col] = df[col].apply(
-                lambda x: convert_dt_format(dt_str=str(x), from_format=from_format)
-            )
-        else:
-            pass
-    return df
-
-
-def truncate_date_field(
-    df: pd.DataFrame, truncate_date_fields: typing.List[str], from_format: str
-) -> pd.DataFrame:
-    for col in df.columns:
-        if df[col].name in truncate_date_fields:
-            logging.info(f"Formatting Date value in {col}")
-            df[col] = df[col].apply(
-                lambda x: ""
-                if x == "" or x.lower() == "nan" or x.lower() == "nat"
-                else datetime.datetime.strptime(x, from_format).strftime("%Y-%m-%d")
-            )
-    return df
-
-
-def convert_dt_format(dt_str: str, from_format: str, include_time: bool = True) -> str:
-    if not dt_str or str(dt_str).lower() == "nan" or str(dt_str).lower() == "nat":
-        rtnval = ""
-    elif len(dt_str.strip()) == 10:
-        if include_time:
-            # if there is no time value
-            rtnval = dt_str + " 00:00:00"
-        else:
-            # exclude time value
-            rtnval = dt_str
-    elif len(dt_str.strip()) == 16:
-        if include_time:
-            # if there is no time value
-            rtnval = dt_str + ":00"
-        else:
-            # exclude time value
-            rtnval = dt_str
-    elif len(dt_str.strip().split(" ")[1]) == 8:
-        # if format of time portion is 00:00:00 then use 00:00 format
-        dt_str = dt_str[:-3]
-        rtnval = datetime.datetime.strptime(dt_str, from_format).strftime(
-            "%Y-%m-%d %H:%M:%S"
-        )
-    elif (len(dt_str.strip().split("-")[0]) == 4) and (
-        len(from_format.strip().split("/")[0]) == 2
-    ):
-        # if the format of the date portion of the data is in YYYY-MM-DD format
-        # and from_format is in MM-DD-YYYY then resolve this by modifying the from_format
-        # to use the YYYY-MM-DD.  This resolves mixed date formats in files
-        from_format = "%Y-%m-%d " + from_format.strip().split(" ")[1]
-    else:
-        dt_str = ""
-    return rtnval
-
-
-def save_to_new_file(df: pd.DataFrame, file_path: str, sep: str = "|") -> None:
-    logging.info(f"Saving to file {file_path} separator='{sep}'")
-    df.to_csv(file_path, sep=sep, index=False)
-
-
-def append_batch_file(
-    batch_file_path: str,
-    target_file_path: str,
-    include_header: bool,
-    truncate_target_file: bool,
-) -> None:
-    logging.info(
-        f"Appending file {batch_file_path} to file {target_file_path} with include_header={include_header} and truncate_target_file={truncate_target_file}"
-    )
-    with open(batch_file_path, "r") as data_file:
-        if truncate_target_file:
-            target_file = open(target_file_path, "w+").close()
-        with open(target_file_path, "a+") as target_file:
-            if not include_header:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path} without header"
-                )
-                next(data_file)
-            else:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path} with header"
-                )
-            target_file.write(data_file.read())
-            data_file.close()
-            target_file.close()
-            if os.path.exists(batch_file_path):
-                os.remove(batch_file_path)
-
-
-def upload_file_to_gcs(
-    file_path: pathlib.Path, target_gcs_bucket: str, target_gcs_path: str
-) -> None:
-    if os.path.exists(file_path):
-        logging.info(
-            f"Uploading output file {file_path} to gs://{target_gcs_bucket}/{target_gcs_path}"
-        )
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(target_gcs_bucket)
-        blob = bucket.blob(target_gcs_path)
-        blob.upload_from_filename(file_path)
-    else:
-        logging.info(
-            f"Cannot upload file to gs://{target_gcs_bucket}/{target_gcs_path} as it does not exist."
-        )
-
-
 if __name__ == "__main__":
     logging.getLogger().setLevel(logging.INFO)
 
@@ -689,4 +546,6 @@ if __name__ == "__main__":
         data_dtypes=json.loads(os.environ.get("DATA_DTYPES", r"{}")),
         output_headers=json.loads(os.environ.get("OUTPUT_CSV_HEADERS", r"[]")),
         drop_dest_table=os.environ.get("DROP_DEST_TABLE", "N"),
+        transform_workers=os.environ.get("TRANSFORM_WORKERS", "1"),
+        period_concurrency=os.environ.get("PERIOD_CONCURRENCY", "1"),
     )
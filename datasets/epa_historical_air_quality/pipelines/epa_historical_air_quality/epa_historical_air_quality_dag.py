@@ -71,6 +71,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "INT",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_annual_summaries_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/annual_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - annual_summaries",
@@ -104,6 +106,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_co_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/co_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - co_daily_summary",
@@ -137,6 +141,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_co_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/co_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - co_hourly_summaries",
@@ -170,6 +176,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_hap_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/hap_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - hap_daily_summary",
@@ -203,6 +211,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_hap_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/hap_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - hap_hourly_summaries",
@@ -236,6 +246,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_lead_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/lead_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - lead_daily_summaries",
@@ -269,6 +281,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_no2_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/no2_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - no2_daily_summaries",
@@ -302,6 +316,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_no2_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/no2_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - no2_hourly",
@@ -335,6 +351,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_nonoxnoy_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/nonoxnoy_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - nonoxnoy_daily",
@@ -368,6 +386,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_nonoxnoy_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/nonoxnoy_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - nonoxnoy_hourly",
@@ -401,6 +421,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_ozone_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/ozone_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - ozone_daily_summary",
@@ -434,6 +456,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_ozone_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/ozone_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - ozone_hourly_summary",
@@ -467,6 +491,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_pm10_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/pm10_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - pm10_daily_summaries",
@@ -500,6 +526,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_pm10_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/pm10_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - pm10_hourly_summaries",
@@ -533,6 +561,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_pm25_frm_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/pm25_frm_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - pm25_frm_hourly_summaries",
@@ -566,6 +596,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_pm25_nonfrm_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/pm25_nonfrm_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - pm25_nonfrm_daily_summaries",
@@ -599,6 +631,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_pm25_nonfrm_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/pm25_nonfrm_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - pm25_nonfrm_hourly_summaries",
@@ -632,6 +666,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_pm25_speciation_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/pm25_speciation_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - pm25_speciation_daily_summaries",
@@ -665,6 +701,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_pm25_speciation_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/pm25_speciation_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - pm25_speciation_hourly_summary",
@@ -698,6 +736,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_pressure_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/pressure_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - pressure_daily_summaries",
@@ -731,6 +771,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_pressure_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/pressure_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - pressure_hourly_summary",
@@ -764,6 +806,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_rh_and_dp_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/rh_and_dp_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - rh_and_dp_daily_summaries",
@@ -797,6 +841,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_rh_and_dp_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/rh_and_dp_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - rh_and_dp_hourly_summary",
@@ -830,6 +876,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_so2_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/so2_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - so2_daily_summary",
@@ -863,6 +911,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_so2_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/so2_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - so2_hourly_summary",
@@ -896,6 +946,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_temperature_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/temperature_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - temperature_daily_summary",
@@ -929,6 +981,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_temperature_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/temperature_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - temperature_hourly_summary",
@@ -962,6 +1016,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_voc_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/voc_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - voc_daily_summary",
@@ -995,6 +1051,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_voc_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/voc_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - voc_hourly_summary",
@@ -1028,6 +1086,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_wind_daily_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/wind_daily_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - wind_daily_summaries",
@@ -1061,6 +1121,8 @@ with DAG(
             "YEAR_FIELD_TYPE": "DATE",
             "SCHEMA_PATH": "data/epa_historical_air_quality/schemas/epa_wind_hourly_summary_schema.json",
             "CHUNKSIZE": "1500000",
+            "TRANSFORM_WORKERS": "2",
+            "PERIOD_CONCURRENCY": "2",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/epa_historical_air_quality/wind_hourly_summary/data_output.csv",
             "PIPELINE_NAME": "epa_historical_air_quality - wind_hourly_summary",
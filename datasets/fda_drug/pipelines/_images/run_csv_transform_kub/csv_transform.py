@@ -23,6 +23,7 @@ from zipfile import ZipFile
 import pandas as pd
 import requests
 from google.cloud import storage
+from pdp_transform import json_records
 
 
 def main(
@@ -52,35 +53,41 @@ def main(
         dest_path + "/" + os.path.basename(source_url).replace(".zip", "")
     )
     os.unlink(source_file_zipped)
-    convert_json_file_to_csv(source_file_unzipped, source_file)
-
-    logging.info(f"Opening batch file {source_file}")
-    with pd.read_csv(
-        source_file,  # path to main source file to load in batches
-        engine="python",
-        encoding="utf-8",
-        quotechar='"',  # string separator, typically double-quotes
-        chunksize=int(chunksize),  # size of batch data, in no. of records
-        sep=",",  # data column separator, typically ","
-    ) as reader:
-        for chunk_number, chunk in enumerate(reader):
-            target_file_batch = str(target_file).replace(
-                ".csv", "-" + str(chunk_number) + ".csv"
-            )
-            df = pd.DataFrame()
-            df = pd.concat([df, chunk])
-            process_chunk(
-                df,
-                target_file_batch,
-                target_file,
-                (not chunk_number == 0),
-                transform_list=transform_list,
-                rename_headers_list=rename_headers_list,
-                regex_list=regex_list,
-                date_format_list=date_format_list,
-                new_column_list=new_column_list,
-                reorder_headers_list=reorder_headers_list,
-            )
+
+    # Nested openfda fields are read from "openfda.<field>" into the
+    # "openfda_<field>" columns the pipeline expects.
+    json_columns = {
+        column: column.replace("openfda_", "openfda.", 1)
+        if column.startswith("openfda_")
+        else column
+        for column in reorder_headers_list
+    }
+    logging.info(f"Streaming records from {source_file_unzipped}")
+    for chunk_number, df in enumerate(
+        json_records.read_json_chunks(
+            source_file_unzipped,
+            columns=list(json_columns.values()),
+            chunksize=int(chunksize),
+            stringify_nested=True,
+            na_values=json_records.CSV_NA_VALUES,
+        )
+    ):
+        target_file_batch = str(target_file).replace(
+            ".csv", "-" + str(chunk_number) + ".csv"
+        )
+        df.columns = list(json_columns.keys())
+        process_chunk(
+            df,
+            target_file_batch,
+            target_file,
+            (not chunk_number == 0),
+            transform_list=transform_list,
+            rename_headers_list=rename_headers_list,
+            regex_list=regex_list,
+            date_format_list=date_format_list,
+            new_column_list=new_column_list,
+            reorder_headers_list=reorder_headers_list,
+        )
 
     upload_file_to_gcs(target_file, target_gcs_bucket, target_gcs_path)
 
@@ -100,26 +107,6 @@ def zip_decompress(infile: str, destpath: str = "./files") -> None:
         zip.extractall(path=destpath)
 
 
-def convert_json_file_to_csv(json_file: str, csv_dest_file: str):
-    logging.info(f"Converting JSON file {json_file} to CSV format {csv_dest_file}")
-    file_ref = open(
-        json_file.strip(),
-    )
-    json_data = json.load(file_ref)
-    df = pd.DataFrame(json_data["results"])
-    df = normalize_column_data(df, "openfda")
-    df.to_csv(csv_dest_file, index=False)
-
-
-def normalize_column_data(df: pd.DataFrame, flatten_column: str) -> pd.DataFrame:
-    df_norm = pd.json_normalize(df[flatten_column])
-    for col in df_norm.columns:
-        new_col_name = f"{flatten_column}_{col}"
-        df_norm.columns = df_norm.columns.str.replace(col, new_col_name)
-    df = df.merge(df_norm, how="left", left_index=True, right_index=True)
-    return df
-
-
 def process_chunk(
     df: pd.DataFrame,
     target_file_batch: str,
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import datetime
 import json
 import logging
 import os
@@ -24,6 +23,7 @@ import numpy as np
 import pandas as pd
 import requests
 from google.cloud import storage
+from pdp_transform import json_records, transforms
 
 
 def main(
@@ -39,7 +39,6 @@ def main(
     rename_mappings: dict,
     reorder_headers_list: typing.List[str],
     record_path: str,
-    meta: typing.List[str],
 ) -> None:
 
     logging.info("Food and Drug Administration (FDA) - Food Events process started")
@@ -51,19 +50,17 @@ def main(
 
     download_file_http(source_url, source_zip_file, False)
     unpack_file(source_zip_file, dest_path, "zip")
-    convert_json_to_csv(
-        source_json_file, source_file, record_path=record_path, meta=meta, separator="|"
-    )
 
     process_source_file(
         pipeline,
-        source_file,
+        source_json_file,
         target_file,
         data_names,
         data_dtypes,
         int(chunksize),
         rename_mappings,
         reorder_headers_list,
+        record_path,
     )
 
     upload_file_to_gcs(target_file, target_gcs_bucket, target_gcs_path)
@@ -80,37 +77,32 @@ def process_source_file(
     chunksize: int,
     rename_mappings: dict,
     reorder_headers_list: list,
+    record_path: str = "",
 ) -> None:
-    logging.info(f"Opening batch file {source_file}")
-    with pd.read_csv(
-        source_file,  # path to main source file to load in batches
-        engine="python",
-        encoding="utf-8",
-        quotechar='"',  # string separator, typically double-quotes
-        chunksize=chunksize,  # size of batch data, in no. of records
-        sep="|",  # data column separator, typically ","
-        header=None,  # use when the data file does not contain a header
-        names=names,
-        skiprows=1,
-        dtype=dtypes,
-        keep_default_na=True,
-        na_values=[" "],
-    ) as reader:
-        for chunk_number, chunk in enumerate(reader):
-            target_file_batch = str(target_file).replace(
-                ".csv", "-" + str(chunk_number) + ".csv"
-            )
-            df = pd.DataFrame()
-            df = pd.concat([df, chunk])
-            process_chunk(
-                df=df,
-                target_file_batch=target_file_batch,
-                target_file=target_file,
-                rename_mappings=rename_mappings,
-                reorder_headers_list=reorder_headers_list,
-                pipeline=pipeline,
-                skip_header=(not chunk_number == 0),
-            )
+    logging.info(f"Streaming records from {source_file}")
+    for chunk_number, df in enumerate(
+        json_records.read_json_chunks(
+            source_file,
+            columns=names,
+            chunksize=chunksize,
+            record_path=record_path or None,
+            stringify_nested=True,
+            na_values=json_records.CSV_NA_VALUES + [" "],
+        )
+    ):
+        target_file_batch = str(target_file).replace(
+            ".csv", "-" + str(chunk_number) + ".csv"
+        )
+        df = df.astype({col: dtype for col, dtype in dtypes.items() if dtype != "str"})
+        process_chunk(
+            df=df,
+            target_file_batch=target_file_batch,
+            target_file=target_file,
+            rename_mappings=rename_mappings,
+            reorder_headers_list=reorder_headers_list,
+            pipeline=pipeline,
+            skip_header=(not chunk_number == 0),
+        )
 
 
 def process_chunk(
@@ -149,7 +141,7 @@ def process_food_events(
     ]
     df = replace_nulls(df, col_list)
     date_col_list = ["date_started", "date_created"]
-    df = resolve_date_format(df, date_col_list, "%Y%m%d", "%Y-%m-%d", True)
+    df = resolve_date_format(df, date_col_list, ["%Y%m%d", "%Y-%m-%d"], "%Y-%m-%d")
 
     return df
 
@@ -162,7 +154,7 @@ def process_food_enforcement(df: pd.DataFrame, reorder_headers_list: list) -> No
         "termination_date",
         "recall_initiation_date",
     ]
-    df = resolve_date_format(df, date_col_list, "%Y%m%d", "%Y-%m-%d", True)
+    df = resolve_date_format(df, date_col_list, ["%Y%m%d", "%Y-%m-%d"], "%Y-%m-%d")
     df = reorder_headers(df, reorder_headers_list)
 
     return df
@@ -196,53 +188,17 @@ def replace_nulls(df: pd.DataFrame, col_list: list) -> pd.DataFrame:
 def resolve_date_format(
     df: pd.DataFrame,
     date_col_list: list,
-    from_format: str,
+    from_formats: typing.List[str],
     to_format: str = "%Y-%m-%d %H:%M:%S",
-    is_date: bool = False,
 ) -> pd.DataFrame:
     logging.info("Resolving Date Format")
     for col in date_col_list:
         logging.info(f"Resolving datetime on {col}")
-        df[col] = df[col].apply(
-            lambda x: convert_dt_format(str(x), from_format, to_format, is_date)
-        )
+        df[col] = transforms.normalize_datetime(df[col], from_formats, to_format)
 
     return df
 
 
-def convert_dt_format(
-    dt_str: str, from_format: str, to_format: str, is_date: bool
-) -> str:
-    rtnval = "<initial_value>"
-    if not dt_str or str(dt_str).lower() == "nan" or str(dt_str).lower() == "nat":
-        rtnval = ""
-    elif len(dt_str.strip()) == 10:
-        # if there is no time format
-        rtnval = dt_str + " 00:00:00"
-    elif (
-        is_date
-    ):  # and from_format == "%Y%m%d" and to_format == "%Y-%m-%d") or (len(dt_str.strip()) == 8):
-        # if there is only a date in YYYYMMDD format then add dashes
-        rtnval = (
-            dt_str.strip()[:4] + "-" + dt_str.strip()[4:6] + "-" + dt_str.strip()[6:8]
-        )
-    elif len(dt_str.strip().split(" ")[1]) == 8:
-        # if format of time portion is 00:00:00 then use 00:00 format
-        dt_str = dt_str[:-3]
-        rtnval = datetime.datetime.strptime(dt_str, from_format).strftime(to_format)
-    elif (len(dt_str.strip().split("-")[0]) == 4) and (
-        len(from_format.strip().split("/")[0]) == 2
-    ):
-        # if the format of the date portion of the data is in YYYY-MM-DD format
-        # and from_format is in MM-DD-YYYY then resolve this by modifying the from_format
-        # to use the YYYY-MM-DD.  This resolves mixed date formats in files
-        from_format = "%Y-%m-%d " + from_format.strip().split(" ")[1]
-    else:
-        dt_str = "<blank>"
-
-    return rtnval
-
-
 def trim_whitespace(df: pd.DataFrame) -> pd.DataFrame:
     logging.info("Trimming whitespace")
     for col in df.columns:
@@ -332,34 +288,6 @@ def unpack_file(infile: str, dest_path: str, compression_type: str = "zip") -> N
         logging.info(f"{infile} not unpacked because it does not exist.")
 
 
-def convert_json_to_csv(
-    source_file_json: str,
-    source_file_csv: str,
-    record_path: str,
-    meta: list,
-    separator: str = "|",
-) -> None:
-    logging.info(f"Converting JSON file {source_file_json} to {source_file_csv}")
-    f = open(
-        source_file_json.strip(),
-    )
-    json_data = json.load(f)
-    if record_path:
-        df = pd.json_normalize(
-            json_data["results"],
-            record_path=[record_path],
-            meta=meta,
-            errors="ignore",
-        )
-    else:
-        df = pd.DataFrame(json_data["results"])
-    for col in df.columns:
-        df[col] = df[col].fillna("")
-    df.to_csv(
-        source_file_csv, index=False, sep=separator, quotechar='"', encoding="utf-8"
-    )
-
-
 def upload_file_to_gcs(file_path: pathlib.Path, gcs_bucket: str, gcs_path: str) -> None:
     storage_client = storage.Client()
     bucket = storage_client.bucket(gcs_bucket)
@@ -383,5 +311,4 @@ if __name__ == "__main__":
         rename_mappings=json.loads(os.environ["RENAME_MAPPINGS"]),
         reorder_headers_list=json.loads(os.environ["REORDER_HEADERS"]),
         record_path=os.environ["RECORD_PATH"],
-        meta=json.loads(os.environ["META"]),
     )
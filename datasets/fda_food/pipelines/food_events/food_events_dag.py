@@ -54,7 +54,6 @@ with DAG(
             "RENAME_MAPPINGS": '{ "report_number": "report_number", "reactions": "reactions", "outcomes": "outcomes", "name_brand": "products_brand_name", "industry_code": "products_industry_code",\n  "role": "products_role", "industry_name": "products_industry_name", "date_created": "date_created", "date_started": "date_started", "consumer.gender": "consumer_gender",\n  "consumer.age": "consumer_age", "consumer.age_unit": "consumer_age_unit" }',
             "REORDER_HEADERS": '[ "report_number", "reactions", "outcomes", "products_brand_name", "products_industry_code",\n  "products_role", "products_industry_name", "date_created", "date_started", "consumer_gender",\n  "consumer_age", "consumer_age_unit" ]',
             "RECORD_PATH": "products",
-            "META": '[\n  "report_number", "outcomes", "date_created", "reactions", "date_started",\n  ["consumer", "age"], ["consumer", "age_unit"], ["consumer", "gender"]\n]',
         },
         resources={
             "request_memory": "4G",
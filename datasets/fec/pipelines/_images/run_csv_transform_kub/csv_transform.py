@@ -15,6 +15,7 @@
 
 import csv
 import datetime
+import functools
 import json
 import logging
 import os
@@ -25,6 +26,7 @@ from zipfile import ZipFile
 import pandas as pd
 import requests
 from google.cloud import storage
+from pdp_transform import files, parallel, transforms
 
 
 def main(
@@ -40,6 +42,7 @@ def main(
     csv_headers: typing.List[str],
     chunksize: str,
     pipeline_name: str,
+    transform_workers: str,
 ) -> None:
 
     logging.info(
@@ -115,7 +118,12 @@ def main(
         download_blob(source_bucket, source_object, source_file)
 
         process_source_file(
-            source_file, target_file, chunksize, csv_headers, pipeline_name
+            source_file,
+            target_file,
+            chunksize,
+            csv_headers,
+            pipeline_name,
+            transform_workers=int(transform_workers),
         )
 
         logging.info(
@@ -130,43 +138,42 @@ def process_source_file(
     chunksize: str,
     csv_headers: typing.List[str],
     pipeline_name: str,
+    transform_workers: int = 1,
 ) -> None:
     logging.info(f"Opening source file {source_file}")
     csv.field_size_limit(512 << 10)
     csv.register_dialect("TabDialect", quotechar='"', delimiter="\t", strict=True)
-    with open(
-        source_file,
-    ) as reader:
-        data = []
-        chunk_number = 1
-        for index, line in enumerate(csv.reader(reader, "TabDialect"), 0):
-            data.append(line)
-            if int(index) % int(chunksize) == 0 and int(index) > 0:
-
-                process_dataframe_chunk(
-                    data,
-                    target_file,
-                    chunk_number,
-                    pipeline_name,
-                )
-                data = []
-                chunk_number += 1
-
-        if data:
-            process_dataframe_chunk(
-                data,
-                target_file,
-                chunk_number,
-                pipeline_name,
-            )
-
-
-def process_dataframe_chunk(
-    data: typing.List[str],
-    target_file: str,
-    chunk_number: int,
+    with open(source_file) as reader, files.ChunkWriter(target_file, sep=",") as writer:
+        transform_chunk = functools.partial(process_chunk, pipeline_name=pipeline_name)
+        for chunk_number, df in enumerate(
+            parallel.map_ordered(
+                transform_chunk,
+                read_line_chunks(csv.reader(reader, "TabDialect"), int(chunksize)),
+                workers=transform_workers,
+            ),
+            1,
+        ):
+            logging.info(f"Writing batch #{chunk_number} of {source_file}")
+            writer.write(df)
+
+
+def read_line_chunks(
+    lines: typing.Iterable[typing.List[str]], chunksize: int
+) -> typing.Iterator[typing.List[typing.List[str]]]:
+    data = []
+    for line in lines:
+        data.append(line)
+        if len(data) == chunksize:
+            yield data
+            data = []
+    if data:
+        yield data
+
+
+def process_chunk(
+    data: typing.List[typing.List[str]],
     pipeline_name: str,
-) -> None:
+) -> pd.DataFrame:
     data = list([char.split("|") for item in data for char in item])
     df = pd.DataFrame(
         data,
@@ -194,26 +201,6 @@ def process_dataframe_chunk(
             "sub_id",
         ],
     )
-    target_file_batch = str(target_file).replace(
-        ".csv", "-" + str(chunk_number) + ".csv"
-    )
-    process_chunk(
-        df=df,
-        target_file_batch=target_file_batch,
-        target_file=target_file,
-        pipeline_name=pipeline_name,
-        skip_header=(not chunk_number == 1),
-    )
-
-
-def process_chunk(
-    df: pd.DataFrame,
-    target_file_batch: str,
-    target_file: str,
-    pipeline_name: str,
-    skip_header: bool,
-) -> None:
-    logging.info(f"Processing batch file {target_file_batch}")
     df["image_num"] = df["image_num"].astype(str)
     df["transaction_dt"] = df["transaction_dt"].astype(str)
     convert_string_to_int(df, "image_num")
@@ -221,9 +208,7 @@ def process_chunk(
     date_for_length(df, "transaction_dt")
     df = resolve_date_format(df, "transaction_dt", pipeline_name)
     df = df.rename(columns=lambda x: x.strip())
-    save_to_new_file(df, file_path=str(target_file_batch), sep=",")
-    append_batch_file(target_file_batch, target_file, skip_header)
-    logging.info(f"Processing batch file {target_file_batch} completed")
+    return df
 
 
 def save_to_new_file(df: pd.DataFrame, file_path: str, sep: str = ",") -> None:
@@ -231,26 +216,6 @@ def save_to_new_file(df: pd.DataFrame, file_path: str, sep: str = ",") -> None:
     df.to_csv(file_path, index=False, sep=",")
 
 
-def append_batch_file(
-    target_file_batch: str, target_file: str, skip_header: bool
-) -> None:
-
-    with open(target_file_batch, "r") as data_file:
-        with open(target_file, "a+") as target_file:
-            if skip_header:
-                logging.info(
-                    f"Appending batch file {target_file_batch} to {target_file} with skipheader..."
-                )
-                next(data_file)
-            else:
-                logging.info(
-                    f"Appending batch file {target_file_batch} to {target_file}"
-                )
-            target_file.write(data_file.read())
-            if os.path.exists(target_file_batch):
-                os.remove(target_file_batch)
-
-
 def download_blob(bucket, object, target_file):
     """Downloads a blob from the bucket."""
     storage_client = storage.Client()
@@ -264,46 +229,12 @@ def resolve_date_format(
     field_name: str,
     pipeline: str,
 ) -> pd.DataFrame:
-    if "opex" not in pipeline:
-        logging.info("Resolving date formats")
-        df[field_name] = df[field_name].apply(convert_dt_format)
-        return df
-    else:
-        logging.info("Resolving date formats")
-        df[field_name] = df[field_name].apply(convert_dt_format_opex)
-        return df
-
-
-def convert_dt_format(dt_str: str) -> str:
-    if (
-        not dt_str
-        or str(dt_str).lower() == "nan"
-        or str(dt_str).lower() == "nat"
-        or dt_str == "-"
-    ):
-        return ""
-    else:
-        return str(
-            datetime.datetime.strftime(
-                datetime.datetime.strptime(dt_str, "%m%d%Y"), "%Y-%m-%d"
-            )
-        )
-
-
-def convert_dt_format_opex(dt_str: str) -> str:
-    if (
-        not dt_str
-        or str(dt_str).lower() == "nan"
-        or str(dt_str).lower() == "nat"
-        or dt_str == "-"
-    ):
-        return ""
-    else:
-        return str(
-            datetime.datetime.strftime(
-                datetime.datetime.strptime(dt_str, "%m/%d/%Y"), "%Y-%m-%d"
-            )
-        )
+    logging.info("Resolving date formats")
+    from_format = "%m/%d/%Y" if "opex" in pipeline else "%m%d%Y"
+    df[field_name] = transforms.normalize_datetime(
+        df[field_name], from_format, "%Y-%m-%d", null_values=["-"]
+    )
+    return df
 
 
 def fill_null_values(df: pd.DataFrame, field_name: str):
@@ -387,4 +318,5 @@ if __name__ == "__main__":
         csv_headers=json.loads(os.environ["CSV_HEADERS"]),
         chunksize=os.environ.get("CHUNKSIZE", ""),
         pipeline_name=os.environ.get("PIPELINE_NAME", ""),
+        transform_workers=os.environ.get("TRANSFORM_WORKERS", "1"),
     )
@@ -61,12 +61,13 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output.csv",
             "CHUNKSIZE": "1000000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_2016",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]         ',
         },
         resources={
-            "request_memory": "5G",
-            "request_cpu": "1",
+            "request_memory": "8G",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
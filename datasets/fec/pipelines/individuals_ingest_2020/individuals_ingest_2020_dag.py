@@ -68,13 +68,14 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output_ingest_1.csv",
             "CHUNKSIZE": "1000000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_ingest_2020",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]',
             "RENAME_MAPPINGS": '{"0":"cmte_id","1":"amndt_ind","2":"rpt_tp","3":"transaction_pgi","4":"image_num","5":"transaction_tp", "6":"entity_tp","7":"name","8":"city","9":"state","10":"zip_code","11":"employer", "12":"occupation","13":"transaction_dt","14":"transaction_amt","15":"other_id","16":"tran_id", "17":"file_num","18":"memo_cd","19":"memo_text","20":"sub_id"}',
         },
         resources={
-            "request_memory": "4G",
-            "request_cpu": "1",
+            "request_memory": "8G",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -236,13 +237,14 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output_ingest_2.csv",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_ingest_2020",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]',
             "RENAME_MAPPINGS": '{"0":"cmte_id","1":"amndt_ind","2":"rpt_tp","3":"transaction_pgi","4":"image_num","5":"transaction_tp", "6":"entity_tp","7":"name","8":"city","9":"state","10":"zip_code","11":"employer", "12":"occupation","13":"transaction_dt","14":"transaction_amt","15":"other_id","16":"tran_id", "17":"file_num","18":"memo_cd","19":"memo_text","20":"sub_id"}',
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -404,13 +406,14 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output_ingest_3.csv",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_ingest_2020",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]',
             "RENAME_MAPPINGS": '{"0":"cmte_id","1":"amndt_ind","2":"rpt_tp","3":"transaction_pgi","4":"image_num","5":"transaction_tp", "6":"entity_tp","7":"name","8":"city","9":"state","10":"zip_code","11":"employer", "12":"occupation","13":"transaction_dt","14":"transaction_amt","15":"other_id","16":"tran_id", "17":"file_num","18":"memo_cd","19":"memo_text","20":"sub_id"}',
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -572,13 +575,14 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output_ingest_4.csv",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_ingest_2020",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]',
             "RENAME_MAPPINGS": '{"0":"cmte_id","1":"amndt_ind","2":"rpt_tp","3":"transaction_pgi","4":"image_num","5":"transaction_tp", "6":"entity_tp","7":"name","8":"city","9":"state","10":"zip_code","11":"employer", "12":"occupation","13":"transaction_dt","14":"transaction_amt","15":"other_id","16":"tran_id", "17":"file_num","18":"memo_cd","19":"memo_text","20":"sub_id"}',
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -740,13 +744,14 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output_ingest_5.csv",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_ingest_2020",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]',
             "RENAME_MAPPINGS": '{"0":"cmte_id","1":"amndt_ind","2":"rpt_tp","3":"transaction_pgi","4":"image_num","5":"transaction_tp", "6":"entity_tp","7":"name","8":"city","9":"state","10":"zip_code","11":"employer", "12":"occupation","13":"transaction_dt","14":"transaction_amt","15":"other_id","16":"tran_id", "17":"file_num","18":"memo_cd","19":"memo_text","20":"sub_id"}',
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -908,13 +913,14 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output_ingest_6.csv",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_ingest_2020",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]',
             "RENAME_MAPPINGS": '{"0":"cmte_id","1":"amndt_ind","2":"rpt_tp","3":"transaction_pgi","4":"image_num","5":"transaction_tp", "6":"entity_tp","7":"name","8":"city","9":"state","10":"zip_code","11":"employer", "12":"occupation","13":"transaction_dt","14":"transaction_amt","15":"other_id","16":"tran_id", "17":"file_num","18":"memo_cd","19":"memo_text","20":"sub_id"}',
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -1076,13 +1082,14 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output_ingest_7.csv",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_ingest_2020",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]',
             "RENAME_MAPPINGS": '{"0":"cmte_id","1":"amndt_ind","2":"rpt_tp","3":"transaction_pgi","4":"image_num","5":"transaction_tp", "6":"entity_tp","7":"name","8":"city","9":"state","10":"zip_code","11":"employer", "12":"occupation","13":"transaction_dt","14":"transaction_amt","15":"other_id","16":"tran_id", "17":"file_num","18":"memo_cd","19":"memo_text","20":"sub_id"}',
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -1244,13 +1251,14 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output_ingest_8.csv",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_ingest_2020",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]',
             "RENAME_MAPPINGS": '{"0":"cmte_id","1":"amndt_ind","2":"rpt_tp","3":"transaction_pgi","4":"image_num","5":"transaction_tp", "6":"entity_tp","7":"name","8":"city","9":"state","10":"zip_code","11":"employer", "12":"occupation","13":"transaction_dt","14":"transaction_amt","15":"other_id","16":"tran_id", "17":"file_num","18":"memo_cd","19":"memo_text","20":"sub_id"}',
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -1412,12 +1420,13 @@ with DAG(
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/fec/individuals/data_output_ingest_9.csv",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "2",
             "PIPELINE_NAME": "individuals_ingest_2020",
             "CSV_HEADERS": '["cmte_id","amndt_ind","rpt_tp","transaction_pgi","image_num","transaction_tp","entity_tp","name","city","state", "zip_code","employer","occupation","transaction_dt","transaction_amt","other_id","tran_id","file_num", "memo_cd","memo_text","sub_id"]',
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "2",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -13,16 +13,16 @@
 # limitations under the License.
 
 
+import functools
 import logging
 import os
 import pathlib
-import subprocess
 import typing
 from datetime import date, timedelta
 
 import bs4
 import requests
-from google.cloud import storage
+from pdp_transform import fetch, gcs, parallel
 
 # The manifest file contains a list of files already downloaded for a given date
 MANIFEST_FILE = "manifest.txt"
@@ -34,6 +34,7 @@ def main(
     download_dir: pathlib.Path,
     target_bucket: str,
     batch_size: int,
+    max_workers: int,
 ) -> None:
     # Get date prefix, e.g. Y2021/M01/D01, and create directories for them
     date_prefix = _date_prefix(dt)
@@ -42,13 +43,18 @@ def main(
     # Generate a set of all .nc4 files from the specified url and date
     all_files = get_all_files(base_url, date_prefix)
 
-    stored_files = get_stored_files(target_bucket, date_prefix, download_dir)
+    stored_files = get_stored_files(target_bucket, date_prefix)
 
     # Files present in the source webpage but not yet stored on GCS
     unstored_files = all_files - stored_files
 
     download_and_store_new_files(
-        download_dir, date_prefix, unstored_files, batch_size, target_bucket
+        download_dir,
+        date_prefix,
+        unstored_files,
+        batch_size,
+        target_bucket,
+        max_workers,
     )
 
 
@@ -72,23 +78,13 @@ def get_all_files(base_url: str, date_prefix: str) -> typing.Set[str]:
     return all_files
 
 
-def get_stored_files(
-    bucket_name: str, date_prefix: str, download_dir: pathlib.Path
-) -> typing.Set[str]:
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
+def get_stored_files(bucket_name: str, date_prefix: str) -> typing.Set[str]:
     gcs_object = f"{date_prefix}/{MANIFEST_FILE}"
-    local_object = download_dir / MANIFEST_FILE
-
-    if storage.Blob(bucket=bucket, name=gcs_object).exists(storage_client):
-        logging.info(f"Manifest file found at gs://{bucket_name}/{gcs_object}")
-        blob = bucket.blob(gcs_object)
-        blob.download_to_filename(str(local_object))
-    else:
-        local_object.touch()
-
-    with open(local_object) as f:
-        return set(f.read().splitlines())
+    blob = gcs.storage_client().bucket(bucket_name).get_blob(gcs_object)
+    if blob is None:
+        return set()
+    logging.info(f"Manifest file found at gs://{bucket_name}/{gcs_object}")
+    return set(blob.download_as_text().splitlines())
 
 
 def scrape(source_path: str, webpage: bs4.BeautifulSoup) -> typing.List[str]:
@@ -111,102 +107,62 @@ def download_and_store_new_files(
     new_files: typing.Set[str],
     batch_size: int,
     target_bucket: str,
+    max_workers: int = 8,
 ) -> None:
-    """In batches, download files from the source to the local filesystem
-    and upload them to the GCS target bucket
+    """Download files from the source and upload each one to the GCS target
+    bucket as soon as it is downloaded, `max_workers` files at a time. The
+    manifest is updated every `batch_size` stored files.
     """
     total_files = len(new_files)
-    logging.info(f"Downloading {total_files} files.")
-    for n, batch in enumerate(batches(list(new_files), batch_size=batch_size), 1):
-        logging.info(
-            f"Processing batch {n}: {(n - 1) * batch_size + 1} to {min(total_files, n * batch_size)}"
-        )
-        download_batch(batch, download_dir)
-        move_dir_contents_to_gcs(download_dir, target_bucket, date_prefix)
-        update_manifest_file(batch, download_dir, target_bucket, date_prefix)
-
-
-def download_batch(batch: typing.List[str], download_dir: pathlib.Path) -> None:
-    for file_path in batch:
-        logging.info(f"Downloading file to {download_dir}/{file_path}")
-        subprocess.check_call(
-            [
-                "wget",
-                f"{os.environ['BASE_URL']}/{file_path}",
-                "-O",
-                f"{download_dir}/{file_path}",
-                "-nv",
-            ]
-        )
-
-
-def move_dir_contents_to_gcs(
-    dir_: pathlib.Path, target_bucket: str, date_prefix: str
-) -> None:
-    subprocess.check_call(
-        [
-            "gsutil",
-            "-m",
-            "-o",
-            "GSUtil:parallel_composite_upload_threshold=250M",
-            "cp",
-            f"{dir_}/{date_prefix}/*.nc4",
-            f"gs://{target_bucket}/{date_prefix}",
-        ]
+    logging.info(f"Downloading {total_files} files with {max_workers} workers.")
+    session = fetch.retrying_session(pool_size=max_workers)
+    # Even when a transfer fails, the files already stored are recorded once
+    # the running transfers finish, so the next run does not copy them again
+    parallel.run_in_batches(
+        functools.partial(
+            transfer_file,
+            session,
+            download_dir=download_dir,
+            target_bucket=target_bucket,
+        ),
+        sorted(new_files),
+        lambda stored: update_manifest_file(stored, target_bucket, date_prefix),
+        batch_size,
+        workers=max_workers,
     )
-    delete_temp_pcu_objects(target_bucket)
-    delete_dir_contents(dir_ / date_prefix)
-
-
-def delete_dir_contents(dir_to_delete: pathlib.Path) -> None:
-    """Delete directory contents, but not the dir itself. This is useful for keeping
-    date dirs such as Y2021/M07/D12 intact for the next batch of files to use.
-    """
-    [f.unlink() for f in dir_to_delete.glob("*") if f.is_file()]
 
 
-def delete_temp_pcu_objects(target_bucket: str) -> None:
-    """Delete temp GCS objects created by gsutil's parallel composite uploads.
-    See https://cloud.google.com/storage/docs/uploads-downloads#gsutil-pcu
-    """
-    res = subprocess.run(
-        ["gsutil", "ls", f"gs://{target_bucket}"],
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        universal_newlines=True,
+def transfer_file(
+    session: requests.Session,
+    file_path: str,
+    download_dir: pathlib.Path,
+    target_bucket: str,
+) -> str:
+    local_file = download_dir / file_path
+    logging.info(f"Downloading file to {local_file}")
+    fetch.download_file(
+        f"{os.environ['BASE_URL']}/{file_path}", str(local_file), session
     )
-    uris = res.stdout.split()
-    for uri in uris:
-        object_name = uri.split(target_bucket + "/")[-1]
-        if not object_name.startswith("Y"):
-            subprocess.check_call(
-                ["gsutil", "rm", "-r", f"gs://{target_bucket}/{object_name}"],
-            )
+    gcs.upload_file_to_gcs(local_file, target_bucket, file_path)
+    local_file.unlink()
+    return file_path
 
 
 def update_manifest_file(
     paths: typing.List[str],
-    download_dir: pathlib.Path,
     target_bucket: str,
     date_prefix: str,
 ) -> None:
-    manifest_path = download_dir / MANIFEST_FILE
-    with open(manifest_path, "a") as f:
-        f.write("\n".join(paths))
-        f.write("\n")
-    subprocess.check_call(
-        [
-            "gsutil",
-            "cp",
-            str(manifest_path),
-            f"gs://{target_bucket}/{date_prefix}/{MANIFEST_FILE}",
-        ]
-    )
+    """Append `paths` to the date's manifest. The write only succeeds against
+    the manifest generation it read, so concurrent runs cannot drop entries.
+    """
 
+    def append_paths(manifest: str) -> str:
+        return "".join(f"{line}\n" for line in manifest.splitlines() + paths)
 
-def batches(file_paths: typing.List[str], batch_size: int):
-    for i in range(0, len(file_paths), batch_size):
-        yield file_paths[i : i + batch_size]
+    gcs.update_text_in_gcs(
+        target_bucket, f"{date_prefix}/{MANIFEST_FILE}", append_paths
+    )
 
 
 if __name__ == "__main__":
@@ -223,4 +179,5 @@ if __name__ == "__main__":
         download_dir=pathlib.Path(os.environ["DOWNLOAD_DIR"]).expanduser(),
         target_bucket=os.environ["TARGET_BUCKET"],
         batch_size=int(os.getenv("BATCH_SIZE", 10)),
+        max_workers=int(os.getenv("MAX_WORKERS", 8)),
     )
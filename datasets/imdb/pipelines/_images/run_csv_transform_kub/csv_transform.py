@@ -12,13 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import concurrent.futures
 import datetime
-import glob
 import json
 import logging
-import math
 import os
 import pathlib
+import re
 import tarfile
 import typing
 
@@ -29,7 +29,30 @@ from google.cloud import storage
 
 TEST_TRAIN = ["test", "train"]
 NEG_POS_UNSUP = ["neg", "pos", "unsup"]
-REVIEW_COLS = ["review", "split", "label", "id_tag", "path", "reviewer_rating"]
+# (split, label) folders of the aclImdb archive, in output order
+REVIEW_FOLDERS = [
+    (parent, child)
+    for parent in TEST_TRAIN
+    for child in NEG_POS_UNSUP
+    if (parent, child) != ("test", "unsup")
+]
+REVIEW_COLS = [
+    "review",
+    "split",
+    "label",
+    "id_tag",
+    "path",
+    "reviewer_rating",
+    "movie_url",
+    "movie_id",
+]
+# e.g. aclImdb/train/pos/0_9.txt, named <id_tag>_<reviewer_rating>.txt
+REVIEW_MEMBER_PATTERN = re.compile(
+    r"aclImdb/(test|train)/(neg|pos|unsup)/(\d+)_(\d+)\.txt"
+)
+# e.g. aclImdb/train/urls_pos.txt, the movie URL of each id_tag, one per line
+URLS_MEMBER_PATTERN = re.compile(r"aclImdb/(test|train)/urls_(neg|pos|unsup)\.txt")
+HTML_TAG_PATTERN = re.compile("<{1,}.{0,4}>")
 LABEL_DICT = {"neg": "Negative", "pos": "Positive", "unsup": "Unsupervised"}
 REPLACE_DICT = {"\\N": np.nan}
 REPLACE_BINARY_DICT = {"0": 0, "1": 1, "0.0": 0, "1.0": 1, 0.0: 0, 1.0: 1}
@@ -40,7 +63,6 @@ def main(
     source_gcs_object: str,
     source_url: dict,
     source_file: dict,
-    extract_here: pathlib.Path,
     target_csv_file: pathlib.Path,
     target_gcs_bucket: str,
     target_gcs_path: str,
@@ -58,9 +80,7 @@ def main(
     pathlib.Path("./files").mkdir(parents=True, exist_ok=True)
 
     if pipeline_name == "reviews":
-        df = get_reviews(
-            source_gcs_bucket, source_gcs_object, source_url, source_file, extract_here
-        )
+        df = get_reviews(source_gcs_bucket, source_gcs_object, source_url, source_file)
     elif pipeline_name == "interfaces":
         download_gzfile(source_url.get("url", ""), source_file.get("url_data", ""))
 
@@ -104,14 +124,24 @@ def get_reviews(
     source_gcs_object: str,
     source_url: dict,
     source_file: dict,
-    extract_here: pathlib.Path,
 ) -> pd.DataFrame:
-    download_gzfile(source_url.get("title_link", ""), source_file.get("title_data", ""))
-    download_blob(
-        source_gcs_bucket, source_gcs_object, source_file.get("user_review_data", "")
-    )
-    extract_tar(source_file.get("user_review_data", ""), extract_here)
-    df_reviews = create_dataframe(extract_here)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        downloads = [
+            executor.submit(
+                download_gzfile,
+                source_url.get("title_link", ""),
+                source_file.get("title_data", ""),
+            ),
+            executor.submit(
+                download_blob,
+                source_gcs_bucket,
+                source_gcs_object,
+                source_file.get("user_review_data", ""),
+            ),
+        ]
+        for download in downloads:
+            download.result()
+    df_reviews = read_reviews(source_file.get("user_review_data", ""))
     df = add_movie_title(df_reviews, source_file.get("title_data", ""))
     clean_html_tags(df, "review")
     coldata_replace(df, "label", LABEL_DICT)
@@ -260,92 +290,61 @@ def download_blob(source_gcs_bucket: str, source_gcs_object: str, target_file: s
     logging.info("Downloading Completed.")
 
 
-def extract_tar(source_file: pathlib.Path, extract_here: pathlib.Path):
-    logging.info(f"Extracting tar.gz file to -> {extract_here}.")
-    if "tar.gz" in source_file:
-        with tarfile.open(str(source_file), "r") as tar_fb:
-            def is_within_directory(directory, target):
-                
-                abs_directory = os.path.abspath(directory)
-                abs_target = os.path.abspath(target)
-            
-                prefix = os.path.commonprefix([abs_directory, abs_target])
-                
-                return prefix == abs_directory
-            
-            def safe_extract(tar, path=".", members=None, *, numeric_owner=False):
-            
-                for member in tar.getmembers():
-                    member_path = os.path.join(path, member.name)
-                    if not is_within_directory(path, member_path):
-                        raise Exception("Attempted Path Traversal in Tar File")
-            
-                tar.extractall(path, members, numeric_owner=numeric_owner) 
-                
-            
-            safe_extract(tar_fb, extract_here)
-    logging.info(f"Successfully extracted tar file to -> {extract_here}.")
-
-
-def get_id_rating(file: str, index: int):
-    if "unsup" in file and index == 1:
-        return math.nan
-    return int(file.split("/")[-1].split(".")[0].split("_")[index])
-
-
-def allign_data(file: str):
-    review = open(file).read()
-    split = str(file).split("/")[2]
-    label = file.split("/")[-2]
-    review_path = file
-    id_tag = get_id_rating(file, 0)
-    reviewer_rating = get_id_rating(file, 1)
-    return [review, split, label, id_tag, review_path, reviewer_rating]
-
-
-def add_movie_url(parent: str, child: str, df: pd.DataFrame, id_tag: str):
-    urls = []
-    try:
-        with open(f"./files/aclImdb/{parent}/urls_{child}.txt") as fb:
-            urls.extend(fb.read().splitlines())
-        urls = [url.replace("usercomments", "") for url in urls]
-        movie_title_dict = dict(enumerate(urls))
-        return df[id_tag].map(movie_title_dict, na_action=None)
-    except FileNotFoundError as e:
-        logging.info(f"\t\t{e}.")
-
-
-def add_movie_id(df: pd.DataFrame, column: str, index: int):
-    return df[column].apply(lambda row: row.split("/")[index])
-
-
-def create_dataframe(extract_here: pathlib.Path):
-    logging.info("Started creating Dataframe for reviews(data).")
-    df_reviews = pd.DataFrame(columns=REVIEW_COLS)
-    for parent in TEST_TRAIN:
-        for child in NEG_POS_UNSUP:
-            if parent == "test" and child == "unsup":
-                break
-            path = f"{extract_here}/aclImdb/{parent}/{child}/"
-            csv_files = list(glob.glob(path + "*.txt"))
-            csv_files.sort()
-            logging.info(
-                f"\tCreating Dataframe by reading files from {parent}-->{child}."
-            )
-            df_child = pd.DataFrame(
-                [allign_data(file) for file in csv_files], columns=REVIEW_COLS
-            )
-            logging.info("\tAdding movie_url column")
-            df_child["movie_url"] = add_movie_url(parent, child, df_child, "id_tag")
-            logging.info("\tAdding movie_id column")
-            df_child["movie_id"] = add_movie_id(df_child, "movie_url", -2)
-            logging.info(
-                f"\tTrying to concatenating main dataframe & child dataframe for {parent}-->{child} (folder)."
-            )
-            df_reviews = pd.concat([df_reviews, df_child], ignore_index=True)
-            logging.info("\tChild Dataframe concatenated with main Dataframe df")
-    logging.info("Successfully Created Dataframe and assigned to variable df_reviews.")
-    return df_reviews
+def read_reviews(source_file: str) -> pd.DataFrame:
+    """Reads the reviews and their movie URLs straight out of the aclImdb
+    tarball, in one streaming pass and without extracting it to disk.
+
+    Rows come out folder by folder in `REVIEW_FOLDERS` order, sorted by file
+    name within each folder.
+    """
+    logging.info(f"Reading reviews from {source_file}.")
+    reviews = {folder: [] for folder in REVIEW_FOLDERS}
+    urls = {}
+    with tarfile.open(str(source_file), "r|gz") as tar:
+        for member in tar:
+            if not member.isfile():
+                continue
+            match = REVIEW_MEMBER_PATTERN.fullmatch(member.name)
+            if match:
+                parent, child, id_tag, rating = match.groups()
+                reviews[(parent, child)].append(
+                    (member.name, read_text(tar, member), int(id_tag), int(rating))
+                )
+                continue
+            match = URLS_MEMBER_PATTERN.fullmatch(member.name)
+            if match:
+                urls[match.groups()] = [
+                    url.replace("usercomments", "")
+                    for url in read_text(tar, member).splitlines()
+                ]
+
+    num_reviews = sum(len(folder) for folder in reviews.values())
+    columns = {col: [None] * num_reviews for col in REVIEW_COLS}
+    row = 0
+    for parent, child in REVIEW_FOLDERS:
+        logging.info(f"\tAdding {len(reviews[(parent, child)])} {parent}-->{child}.")
+        folder_urls = urls.get((parent, child), [])
+        for path, review, id_tag, rating in sorted(reviews[(parent, child)]):
+            columns["review"][row] = review
+            columns["split"][row] = parent
+            columns["label"][row] = child
+            columns["id_tag"][row] = id_tag
+            columns["path"][row] = path
+            columns["reviewer_rating"][row] = None if child == "unsup" else rating
+            if id_tag < len(folder_urls):
+                columns["movie_url"][row] = folder_urls[id_tag]
+                columns["movie_id"][row] = folder_urls[id_tag].split("/")[-2]
+            row += 1
+    df = pd.DataFrame(columns)
+    df["reviewer_rating"] = df["reviewer_rating"].astype("Int64")
+    logging.info(f"Successfully read {num_reviews} reviews.")
+    return df
+
+
+def read_text(tar: tarfile.TarFile, member: tarfile.TarInfo) -> str:
+    """Reads a tar member as text with universal newlines, like `open`."""
+    text = tar.extractfile(member).read().decode("utf-8")
+    return text.replace("\r\n", "\n").replace("\r", "\n")
 
 
 def add_movie_title(df: pd.DataFrame, source_url_path: str):
@@ -373,7 +372,7 @@ def add_movie_title(df: pd.DataFrame, source_url_path: str):
 
 def clean_html_tags(df: pd.DataFrame, review: str) -> None:
     logging.info("Started cleaning html tags from the user review.")
-    df[review].replace(to_replace="<{1,}.{0,4}>", value="", regex=True, inplace=True)
+    df[review] = df[review].str.replace(HTML_TAG_PATTERN, "", regex=True)
     logging.info("Cleaning html tags completed.")
 
 
@@ -478,7 +477,6 @@ if __name__ == "__main__":
         source_gcs_object=os.environ.get("SOURCE_GCS_OBJECT", ""),
         source_url=json.loads(os.environ.get("SOURCE_URL")),
         source_file=json.loads(os.environ.get("SOURCE_FILE")),
-        extract_here=pathlib.Path(os.environ.get("EXTRACT_HERE", "")).expanduser(),
         target_csv_file=pathlib.Path(os.environ.get("TARGET_CSV_FILE")).expanduser(),
         target_gcs_bucket=os.environ.get("TARGET_GCS_BUCKET"),
         target_gcs_path=os.environ.get("TARGET_GCS_PATH"),
@@ -47,7 +47,6 @@ with DAG(
             "SOURCE_GCS_OBJECT": "data/imdb/reviews/aclImdb_v1.tar.gz",
             "SOURCE_URL": '{"title_link": "https://datasets.imdbws.com/title.basics.tsv.gz"}',
             "SOURCE_FILE": '{"user_review_data": "./files/aclImdb_v1.tar.gz", "title_data": "./files/title_basics.tsv.gz"}',
-            "EXTRACT_HERE": "./files",
             "TARGET_CSV_FILE": "./files/data_output.csv",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/imdb/reviews/data_output.csv",
@@ -12,7 +12,6 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import datetime
 import json
 import logging
 import os
@@ -23,6 +22,7 @@ import pandas as pd
 import requests
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery, storage
+from pdp_transform import transforms
 
 
 def main(
@@ -354,64 +354,25 @@ def replace_regex(df: pd.DataFrame, regex_list: dict) -> pd.DataFrame:
 
 
 def resolve_date_format(df: pd.DataFrame, date_fields: list = []) -> pd.DataFrame:
-    for dt_fld in date_fields:
-        field_name = dt_fld[0]
+    for field_name, from_formats, to_format in date_fields:
         logging.info(f"Resolving date format in column {field_name}")
-        from_format = dt_fld[1]
-        to_format = dt_fld[2]
-        df[field_name] = df[field_name].apply(
-            lambda x: convert_dt_format(str(x), from_format, to_format)
+        df[field_name] = transforms.normalize_datetime(
+            df[field_name], from_formats, to_format
         )
     return df
 
 
-def convert_dt_format(
-    dt_str: str, from_format: str, to_format: str = "%Y-%m-%d %H:%M:%S"
-) -> str:
-    if not dt_str or str(dt_str).lower() == "nan" or str(dt_str).lower() == "nat":
-        dt_str = ""
-        return dt_str
-    else:
-        if from_format == "%Y%m%d":
-            year = dt_str[0:4]
-            month = dt_str[4:6]
-            day = dt_str[6:8]
-            dt_str = f"{year}-{month}-{day} 00:00:00"
-            from_format = "%Y-%m-%d %H:%M:%S"
-        elif len(dt_str.strip().split(" ")[1]) == 8:
-            # if format of time portion is 00:00:00 then use 00:00 format
-            dt_str = dt_str[:-3]
-        elif (len(dt_str.strip().split("-")[0]) == 4) and (
-            len(from_format.strip().split("/")[0]) == 2
-        ):
-            # if the format of the date portion of the data is in YYYY-MM-DD format
-            # and from_format is in MM-DD-YYYY then resolve this by modifying the from_format
-            # to use the YYYY-MM-DD.  This resolves mixed date formats in files
-            from_format = "%Y-%m-%d " + from_format.strip().split(" ")[1]
-        return datetime.datetime.strptime(dt_str, from_format).strftime(to_format)
-
-
 def add_crash_timestamp(
     df: pd.DataFrame, new_crash_field: str, crash_date_field: str, crash_time_field: str
 ) -> pd.DataFrame:
     logging.info(
         f"add_crash_timestamp '{new_crash_field}' '{crash_date_field}' '{crash_time_field}'"
     )
-    df[new_crash_field] = df.apply(
-        lambda x, crash_date_field, crash_time_field: crash_timestamp(
-            x["" + crash_date_field], x["" + crash_time_field]
-        ),
-        args=[crash_date_field, crash_time_field],
-        axis=1,
-    )
-    return df
-
-
-def crash_timestamp(crash_date: str, crash_time: str) -> str:
+    crash_time = df[crash_time_field]
     # if crash time format is H:MM then convert to HH:MM:SS
-    if len(crash_time) == 4:
-        crash_time = f"0{crash_time}:00"
-    return f"{crash_date} {crash_time}"
+    crash_time = crash_time.where(crash_time.str.len() != 4, "0" + crash_time + ":00")
+    df[new_crash_field] = df[crash_date_field] + " " + crash_time
+    return df
 
 
 def save_to_new_file(df: pd.DataFrame, file_path: str, sep: str = "|") -> None:
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import functools
 import json
 import logging
 import os
@@ -23,6 +24,7 @@ import pandas as pd
 import requests
 from google.cloud import bigquery, storage
 from google.cloud.exceptions import NotFound
+from pdp_transform import bq, files, gcs, parallel
 
 
 def main(
@@ -43,6 +45,7 @@ def main(
     input_headers: typing.List[str],
     data_dtypes: dict,
     output_headers: typing.List[str],
+    period_concurrency: str,
 ) -> None:
     logging.info(f"New York taxi trips - {pipeline_name} process started")
     pathlib.Path("./files").mkdir(parents=True, exist_ok=True)
@@ -64,6 +67,7 @@ def main(
         input_headers,
         data_dtypes,
         output_headers,
+        int(period_concurrency),
     )
     logging.info(f"New York taxi trips - {pipeline_name} process completed")
 
@@ -86,147 +90,84 @@ def execute_pipeline(
     input_headers: typing.List[str],
     data_dtypes: dict,
     output_headers: typing.List[str],
+    period_concurrency: int = 1,
 ) -> None:
-    for year_number in range(datetime.now().year, (start_year - 1), -1):
-        process_year_data(
-            source_url=source_url,
-            year_number=int(year_number),
-            source_file=source_file,
-            target_file=target_file,
-            project_id=project_id,
-            dataset_id=dataset_id,
-            table_id=table_id,
-            data_file_year_field=data_file_year_field,
-            data_file_month_field=data_file_month_field,
-            schema_path=schema_path,
-            chunksize=chunksize,
-            target_gcs_bucket=target_gcs_bucket,
-            target_gcs_path=target_gcs_path,
-            pipeline_name=pipeline_name,
-            input_headers=input_headers,
-            data_dtypes=data_dtypes,
-            output_headers=output_headers,
-        )
-
-
-def process_year_data(
-    source_url: str,
-    year_number: int,
-    source_file: str,
-    target_file: str,
-    project_id: str,
-    dataset_id: str,
-    table_id: str,
-    data_file_year_field: str,
-    data_file_month_field: str,
-    schema_path: str,
-    chunksize: str,
-    target_gcs_bucket: str,
-    target_gcs_path: str,
-    pipeline_name: str,
-    input_headers: typing.List[str],
-    data_dtypes: dict,
-    output_headers: typing.List[str],
-) -> None:
-    logging.info(f"Processing year {year_number}")
-    destination_table = f"{table_id}_{year_number}"
-    for month_number in range(1, 13):
-        padded_month = str(month_number).zfill(2)
-        process_year_month = f"{year_number}-{padded_month}"
-        logging.info(f"Processing month {process_year_month}")
-        month_data_already_loaded = table_has_month_data(
-            project_id=project_id,
-            dataset_id=dataset_id,
-            table_name=destination_table,
-            data_file_year_field=data_file_year_field,
-            year_number=year_number,
-            data_file_month_field=data_file_month_field,
-            month_number=month_number,
-        )
-        if month_data_already_loaded:
-            logging.info(f"{process_year_month} data is already loaded. Skipping.")
-        else:
-            target_file_name = str.replace(
-                target_file, ".csv", f"_{year_number}-{month_number}.csv"
-            )
-            process_month(
+    months = [
+        (year_number, month_number)
+        for year_number in range(datetime.now().year, (start_year - 1), -1)
+        for month_number in range(1, 13)
+    ]
+    loaded_months = months_with_data(
+        project_id=project_id,
+        dataset_id=dataset_id,
+        table_id=table_id,
+        years=[year_number for year_number, _ in months],
+        data_file_year_field=data_file_year_field,
+        data_file_month_field=data_file_month_field,
+    )
+    parallel.run_pipelined(
+        months,
+        [
+            functools.partial(
+                download_month,
                 source_url=source_url,
-                year_number=year_number,
-                month_number=month_number,
                 source_file=source_file,
                 target_file=target_file,
-                project_id=project_id,
-                dataset_id=dataset_id,
-                table_id=destination_table,
-                target_file_name=target_file_name,
-                schema_path=schema_path,
-                chunksize=chunksize,
-                target_gcs_bucket=target_gcs_bucket,
                 target_gcs_path=target_gcs_path,
+                table_id=table_id,
+                loaded_months=loaded_months,
+            ),
+            functools.partial(
+                transform_month,
+                chunksize=chunksize,
                 input_headers=input_headers,
                 data_dtypes=data_dtypes,
                 output_headers=output_headers,
                 pipeline_name=pipeline_name,
-            )
-    logging.info(f"Processing year {year_number} completed")
+            ),
+            functools.partial(
+                load_month,
+                project_id=project_id,
+                dataset_id=dataset_id,
+                schema_path=schema_path,
+                target_gcs_bucket=target_gcs_bucket,
+            ),
+        ],
+        max_in_flight=period_concurrency,
+    )
 
 
-def table_has_month_data(
+def months_with_data(
     project_id: str,
     dataset_id: str,
-    table_name: str,
+    table_id: str,
+    years: typing.Iterable[int],
     data_file_year_field: str,
-    year_number: int,
     data_file_month_field: str,
-    month_number: int,
-) -> bool:
-    check_field_exists = field_exists(
-        project_id, dataset_id, table_name, data_file_month_field
+) -> typing.Set[typing.Tuple[int, int]]:
+    """Returns the (year, month) pairs already loaded into the yearly tables.
+
+    Rows count only in the `{table_id}_{year}` table for their own year.
+    """
+    metadata = bq.table_metadata(project_id)
+    table_names = [
+        f"{table_id}_{year}"
+        for year in sorted(set(years))
+        if metadata.field_exists(
+            dataset_id, f"{table_id}_{year}", data_file_month_field
+        )
+    ]
+    counts = bq.count_rows_by_period(
+        project_id,
+        dataset_id,
+        table_names,
+        [data_file_year_field, data_file_month_field],
     )
-    if check_field_exists:
-        client = bigquery.Client(project=project_id)
-        query = f"""
-            SELECT count(1) AS number_of_rows
-            FROM {dataset_id}.{table_name}
-            WHERE {data_file_year_field} = {year_number}
-              AND {data_file_month_field} = {month_number}
-        """
-        job_config = bigquery.QueryJobConfig()
-        query_job = client.query(query, job_config=job_config)
-        for row in query_job.result():
-            count_rows = row.number_of_rows
-        if int(count_rows) > 0:
-            return True
-        else:
-            return False
-    else:
-        return None
-
-
-def table_exists(project_id: str, dataset_id: str, table_name: str) -> bool:
-    client = bigquery.Client(project=project_id)
-    tables = client.list_tables(dataset_id)
-    found_table = False
-    for tbl in tables:
-        if tbl.table_id == table_name:
-            found_table = True
-    return found_table
-
-
-def field_exists(
-    project_id: str, dataset_id: str, table_name: str, field_name: str
-) -> bool:
-    if table_exists(project_id, dataset_id, table_name):
-        client = bigquery.Client(project=project_id)
-        table_ref = f"{dataset_id}.{table_name}"
-        tbl_schema = client.get_table(table_ref).schema
-        found_field = False
-        for field in tbl_schema:
-            if field.name == field_name:
-                found_field = True
-        return found_field
-    else:
-        return False
+    return {
+        (int(year), int(month))
+        for (table_name, year, month), number_rows in counts.items()
+        if number_rows > 0 and table_name == f"{table_id}_{year}"
+    }
 
 
 def load_data_to_bq(
@@ -239,7 +180,7 @@ def load_data_to_bq(
     logging.info(
         f"Loading data from {file_path} into {project_id}.{dataset_id}.{table_id} started"
     )
-    client = bigquery.Client(project=project_id)
+    client = bq.bigquery_client(project_id)
     table_ref = client.dataset(dataset_id).table(table_id)
     job_config = bigquery.LoadJobConfig()
     job_config.source_format = bigquery.SourceFormat.CSV
@@ -263,7 +204,7 @@ def create_dest_table(
 ) -> None:
     table_ref = f"{project_id}.{dataset_id}.{table_id}"
     logging.info(f"Attempting to create table {table_ref} if it doesn't already exist")
-    client = bigquery.Client()
+    client = bq.bigquery_client(project_id)
     try:
         table_exists_id = client.get_table(table_ref).table_id
         logging.info(f"Table {table_exists_id} currently exists.")
@@ -276,6 +217,7 @@ def create_dest_table(
         schema = create_table_schema([], bucket_name, schema_filepath)
         table = bigquery.Table(table_ref, schema=schema)
         client.create_table(table)
+        bq.table_metadata(project_id).invalidate(dataset_id, table_id)
         print(f"Table {table_ref} was created".format(table_id))
 
 
@@ -307,105 +249,139 @@ def create_table_schema(
     return schema
 
 
-def process_month(
+def download_month(
+    year_month: typing.Tuple[int, int],
     source_url: str,
-    year_number: int,
-    month_number: int,
     source_file: str,
     target_file: str,
-    project_id: str,
-    dataset_id: str,
+    target_gcs_path: str,
     table_id: str,
-    target_file_name: str,
-    schema_path: str,
+    loaded_months: typing.Set[typing.Tuple[int, int]],
+) -> typing.Optional[dict]:
+    year_number, month_number = year_month
+    padded_month = str(month_number).zfill(2)
+    process_year_month = f"{year_number}-{padded_month}"
+    logging.info(f"Processing month {process_year_month}")
+    destination_table = f"{table_id}_{year_number}"
+    if year_month in loaded_months:
+        logging.info(f"{process_year_month} data is already loaded. Skipping.")
+        return None
+    month = {
+        "year_number": year_number,
+        "month_number": month_number,
+        "process_year_month": process_year_month,
+        "table_id": destination_table,
+        "source_parquet_file": str(source_file).replace(
+            ".csv", f"_{process_year_month}.parquet"
+        ),
+        "source_file_to_process": str(source_file).replace(
+            ".csv", f"_{process_year_month}.csv"
+        ),
+        "target_file_name": str.replace(
+            target_file, ".csv", f"_{year_number}-{month_number}.csv"
+        ),
+        "target_gcs_path": str(target_gcs_path).replace(
+            ".csv", f"_{process_year_month}.csv"
+        ),
+    }
+    source_url_to_process = f"{source_url}{process_year_month}.parquet"
+    if not download_file(source_url_to_process, month["source_parquet_file"]):
+        logging.info(
+            f"Informational: The data file {month['target_file_name']} was not generated because no data was available for year {year_number}.  Continuing."
+        )
+        remove_month_files(month)
+        return None
+    return month
+
+
+def transform_month(
+    month: dict,
     chunksize: str,
-    target_gcs_bucket: str,
-    target_gcs_path: str,
     input_headers: typing.List[str],
     data_dtypes: dict,
     output_headers: typing.List[str],
     pipeline_name: str,
-) -> None:
-    padded_month = str(month_number).zfill(2)
-    process_year_month = f"{year_number}-{padded_month}"
-    source_url_to_process = f"{source_url}{process_year_month}.parquet"
-    source_parquet_file = str(source_file).replace(
-        ".csv", f"_{process_year_month}.parquet"
-    )
-    source_file_to_process = str(source_file).replace(
-        ".csv", f"_{process_year_month}.csv"
-    )
-    successful_download = download_file(source_url_to_process, source_parquet_file)
-    if successful_download:
-        try:
-            df_parquet = pd.read_parquet(source_parquet_file)
-        except BaseException as error:
-            logging.info(f" ... Unable to obtain or read parquet file ... {error}")
-            logging.info(f"Processing {process_year_month} failed")
-        else:
-            df_parquet.to_csv(source_file_to_process, sep="|", index=False)
-            with pd.read_csv(
-                source_file_to_process,
-                engine="python",
-                encoding="utf-8",
-                quotechar='"',
-                chunksize=int(chunksize),
-                sep="|",
-                names=input_headers,
-                skiprows=1,
-                dtype=data_dtypes,
-            ) as reader:
-                for chunk_number, chunk in enumerate(reader):
-                    logging.info(
-                        f"Processing chunk #{chunk_number} of file {process_year_month} started"
-                    )
-                    target_file_batch = str(target_file).replace(
-                        ".csv", f"-{process_year_month}-{chunk_number}.csv"
-                    )
-                    df = pd.DataFrame()
-                    df = pd.concat([df, chunk])
-                    process_chunk(
-                        df,
-                        target_file_batch,
-                        target_file_name,
-                        month_number == 1 and chunk_number == 0,
-                        month_number == 1 and chunk_number == 0,
-                        output_headers,
-                        pipeline_name,
-                        year_number,
-                        month_number,
-                    )
-                    logging.info(
-                        f"Processing chunk #{chunk_number} of file {process_year_month} completed"
-                    )
-            if not table_exists(project_id, dataset_id, table_id):
-                # Destination able doesn't exist
-                create_dest_table(
-                    project_id=project_id,
-                    dataset_id=dataset_id,
-                    table_id=table_id,
-                    schema_filepath=schema_path,
-                    bucket_name=target_gcs_bucket,
-                )
-            load_data_to_bq(
-                project_id=project_id,
-                dataset_id=dataset_id,
-                table_id=table_id,
-                file_path=target_file_name,
-                field_delimiter="|",
+) -> typing.Optional[dict]:
+    process_year_month = month["process_year_month"]
+    try:
+        df_parquet = pd.read_parquet(month["source_parquet_file"])
+    except BaseException as error:
+        logging.info(f" ... Unable to obtain or read parquet file ... {error}")
+        logging.info(f"Processing {process_year_month} failed")
+        remove_month_files(month)
+        return None
+    df_parquet.to_csv(month["source_file_to_process"], sep="|", index=False)
+    writer = files.ChunkWriter(month["target_file_name"])
+    with pd.read_csv(
+        month["source_file_to_process"],
+        engine="python",
+        encoding="utf-8",
+        quotechar='"',
+        chunksize=int(chunksize),
+        sep="|",
+        names=input_headers,
+        skiprows=1,
+        dtype=data_dtypes,
+    ) as reader, writer:
+        for chunk_number, chunk in enumerate(reader):
+            logging.info(
+                f"Processing chunk #{chunk_number} of file {process_year_month} started"
             )
-            upload_file_to_gcs(
-                file_path=target_file_name,
-                target_gcs_bucket=target_gcs_bucket,
-                target_gcs_path=str(target_gcs_path).replace(
-                    ".csv", f"_{process_year_month}.csv"
-                ),
+            process_chunk(
+                chunk,
+                writer,
+                output_headers,
+                pipeline_name,
+                month["year_number"],
+                month["month_number"],
             )
-            logging.info(f"Processing {process_year_month} completed")
-    else:
-        logging.info(
-            f"Informational: The data file {target_file_name} was not generated because no data was available for year {year_number}.  Continuing."
+            logging.info(
+                f"Processing chunk #{chunk_number} of file {process_year_month} completed"
+            )
+    return month
+
+
+def load_month(
+    month: dict,
+    project_id: str,
+    dataset_id: str,
+    schema_path: str,
+    target_gcs_bucket: str,
+) -> dict:
+    if not bq.table_metadata(project_id).table_exists(dataset_id, month["table_id"]):
+        # Destination able doesn't exist
+        create_dest_table(
+            project_id=project_id,
+            dataset_id=dataset_id,
+            table_id=month["table_id"],
+            schema_filepath=schema_path,
+            bucket_name=target_gcs_bucket,
         )
+    load_data_to_bq(
+        project_id=project_id,
+        dataset_id=dataset_id,
+        table_id=month["table_id"],
+        file_path=month["target_file_name"],
+        field_delimiter="|",
+    )
+    gcs.upload_file_to_gcs(
+        file_path=month["target_file_name"],
+        target_gcs_bucket=target_gcs_bucket,
+        target_gcs_path=month["target_gcs_path"],
+    )
+    remove_month_files(month)
+    logging.info(f"Processing {month['process_year_month']} completed")
+    return month
+
+
+def remove_month_files(month: dict) -> None:
+    for file_key in [
+        "source_parquet_file",
+        "source_file_to_process",
+        "target_file_name",
+    ]:
+        if os.path.exists(month[file_key]):
+            os.remove(month[file_key])
 
 
 def download_file(source_url: str, source_file: pathlib.Path) -> bool:
@@ -430,10 +406,7 @@ def download_file(source_url: str, source_file: pathlib.Path) -> bool:
 
 def process_chunk(
     df: pd.DataFrame,
-    target_file_batch: str,
-    target_file: str,
-    include_header: bool,
-    truncate_file: bool,
+    writer: files.ChunkWriter,
     output_headers: typing.List[str],
     pipeline_name: str,
     year_number: int,
@@ -453,9 +426,7 @@ def process_chunk(
     )
     df = remove_null_rows(df)
     df = df[output_headers]
-    save_to_new_file(df, file_path=str(target_file_batch))
-    append_batch_file(target_file_batch, target_file, include_header, truncate_file)
-    logging.info(f"Processing Batch {target_file_batch} completed")
+    writer.write(df)
 
 
 def remove_null_rows(df: pd.DataFrame) -> pd.DataFrame:
@@ -480,57 +451,6 @@ def format_date_time(
     return df
 
 
-def save_to_new_file(df, file_path, sep="|") -> None:
-    logging.info(f"Saving to file {file_path} separator='{sep}'")
-    df.to_csv(file_path, sep=sep, index=False)
-
-
-def append_batch_file(
-    batch_file_path: str,
-    target_file_path: str,
-    include_header: bool,
-    truncate_target_file: bool,
-) -> None:
-    logging.info(
-        f"Appending file {batch_file_path} to file {target_file_path} with include_header={include_header} and truncate_target_file={truncate_target_file}"
-    )
-    data_file = open(batch_file_path, "r")
-    if truncate_target_file:
-        target_file = open(target_file_path, "w+").close()
-    target_file = open(target_file_path, "a+")
-    if not include_header:
-        logging.info(
-            f"Appending batch file {batch_file_path} to {target_file_path} without header"
-        )
-        next(data_file)
-    else:
-        logging.info(
-            f"Appending batch file {batch_file_path} to {target_file_path} with header"
-        )
-    target_file.write(data_file.read())
-    data_file.close()
-    target_file.close()
-    if os.path.exists(batch_file_path):
-        os.remove(batch_file_path)
-
-
-def upload_file_to_gcs(
-    file_path: pathlib.Path, target_gcs_bucket: str, target_gcs_path: str
-) -> None:
-    if os.path.exists(file_path):
-        logging.info(
-            f"Uploading output file {file_path} to gs://{target_gcs_bucket}/{target_gcs_path}"
-        )
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(target_gcs_bucket)
-        blob = bucket.blob(target_gcs_path)
-        blob.upload_from_filename(file_path)
-    else:
-        logging.info(
-            f"Cannot upload file {file_path} to gs://{target_gcs_bucket}/{target_gcs_path} as it does not exist."
-        )
-
-
 if __name__ == "__main__":
     logging.getLogger().setLevel(logging.INFO)
 
@@ -552,4 +472,5 @@ if __name__ == "__main__":
         input_headers=json.loads(os.environ.get("INPUT_CSV_HEADERS", "")),
         data_dtypes=json.loads(os.environ.get("DATA_DTYPES", "")),
         output_headers=json.loads(os.environ.get("OUTPUT_CSV_HEADERS", "")),
+        period_concurrency=os.environ.get("PERIOD_CONCURRENCY", "1"),
     )
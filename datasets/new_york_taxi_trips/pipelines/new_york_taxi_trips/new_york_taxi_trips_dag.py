@@ -71,6 +71,7 @@ with DAG(
             "DATA_FILE_MONTH_FIELD": "data_file_month",
             "SCHEMA_PATH": "{{ var.json.new_york_taxi_trips.container_registry.green_trips_schema_path }}",
             "CHUNKSIZE": "500000",
+            "PERIOD_CONCURRENCY": "3",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "{{ var.json.new_york_taxi_trips.container_registry.green_trips_target_gcs_path }}",
             "PIPELINE_NAME": "tlc_green_trips",
@@ -108,6 +109,7 @@ with DAG(
             "TABLE_ID": "{{ var.json.new_york_taxi_trips.container_registry.yellow_trips_table_id }}",
             "SCHEMA_PATH": "{{ var.json.new_york_taxi_trips.container_registry.yellow_trips_schema_path }}",
             "CHUNKSIZE": "500000",
+            "PERIOD_CONCURRENCY": "3",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "{{ var.json.new_york_taxi_trips.container_registry.yellow_trips_target_gcs_path }}",
             "PIPELINE_NAME": "tlc_yellow_trips",
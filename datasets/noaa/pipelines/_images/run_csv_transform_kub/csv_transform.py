@@ -12,10 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import csv
 import datetime
-import ftplib
-import gzip
+import functools
 import json
 import logging
 import os
@@ -26,10 +24,19 @@ import typing
 from urllib.request import Request, urlopen
 
 import pandas as pd
-import requests
 from bs4 import BeautifulSoup
-from google.api_core.exceptions import NotFound
-from google.cloud import bigquery, storage
+from google.cloud import bigquery
+from pdp_transform import bq, files, gcs, manifest, parallel, transforms
+
+# A row with bad coordinates is loaded without a location rather than failing
+# the whole load
+NOAA_TRANSFORMS = {
+    **transforms.TRANSFORMS,
+    "generate_location": (
+        functools.partial(transforms.generate_location, errors="coerce"),
+        "gen_location_list",
+    ),
+}
 
 
 def main(
@@ -56,15 +63,20 @@ def main(
     data_dtypes: dict,
     reorder_headers_list: typing.List[str],
     null_rows_list: typing.List[str],
-    date_format_list: typing.List[str],
+    date_format_list: dict,
     slice_column_list: dict,
     regex_list: dict,
     rename_headers_list: dict,
     remove_source_file: str,
     delete_target_file: str,
     number_of_header_rows: str,
-    int_date_list: typing.List[str],
+    int_date_list: dict,
     gen_location_list: dict,
+    transform_list: typing.List[str],
+    output_format: str,
+    transform_workers: str,
+    period_concurrency: str,
+    source_manifest_path: str,
 ) -> None:
     logging.info(f"{pipeline_name} process started")
     pathlib.Path("./files").mkdir(parents=True, exist_ok=True)
@@ -101,6 +113,11 @@ def main(
         number_of_header_rows=int(number_of_header_rows),
         int_date_list=int_date_list,
         gen_location_list=gen_location_list,
+        transform_list=transform_list,
+        output_format=output_format,
+        transform_workers=int(transform_workers),
+        period_concurrency=int(period_concurrency),
+        source_manifest_path=source_manifest_path,
     )
     logging.info(f"{pipeline_name} process completed")
 
@@ -129,59 +146,86 @@ def execute_pipeline(
     data_dtypes: dict,
     reorder_headers_list: typing.List[str],
     null_rows_list: typing.List[str],
-    date_format_list: typing.List[str],
+    date_format_list: dict,
     slice_column_list: dict,
     regex_list: dict,
     remove_source_file: bool,
     rename_headers_list: dict,
     delete_target_file: bool,
     number_of_header_rows: int,
-    int_date_list: typing.List[str],
+    int_date_list: dict,
     gen_location_list: dict,
+    transform_list: typing.List[str],
+    output_format: str,
+    transform_workers: int,
+    period_concurrency: int,
+    source_manifest_path: str,
 ) -> None:
     if pipeline_name == "GHCND by year":
         if full_data_load == "N":
             start = str(datetime.datetime.now().year - 6)
         else:
             start = start_year
-        ftp_batch = 1
+        years = []
         for yr in range(int(start), datetime.datetime.now().year + 1):
             yr_str = str(yr)
-            source_zipfile = str.replace(str(source_file), ".csv", f"_{yr_str}.csv.gz")
-            source_file_unzipped = str.replace(str(source_zipfile), ".csv.gz", ".csv")
-            target_file_year = str.replace(str(target_file), ".csv", f"_{yr_str}.csv")
-            destination_table_year = f"{destination_table}_{yr_str}"
-            source_url_year = str.replace(source_url, ".csv.gz", f"{yr_str}.csv.gz")
-            target_gcs_path_year = str.replace(
-                target_gcs_path, ".csv", f"_{yr_str}.csv"
+            years.append(
+                {
+                    "year": yr_str,
+                    "source_zipfile": str.replace(
+                        str(source_file), ".csv", f"_{yr_str}.csv.gz"
+                    ),
+                    "target_file": str.replace(
+                        str(target_file), ".csv", f"_{yr_str}.csv"
+                    ),
+                    "destination_table": f"{destination_table}_{yr_str}",
+                    "source_url": str.replace(
+                        source_url, ".csv.gz", f"{yr_str}.csv.gz"
+                    ),
+                    "target_gcs_path": str.replace(
+                        target_gcs_path, ".csv", f"_{yr_str}.csv"
+                    ),
+                }
             )
+        if source_manifest_path:
+            source_manifest = manifest.SourceManifest.load(
+                target_gcs_bucket, source_manifest_path
+            )
+        else:
+            source_manifest = None
+        ftp_batch = 1
+
+        def download_year(year: dict) -> typing.Optional[dict]:
+            nonlocal ftp_batch
             if ftp_batch == int(ftp_batch_size):
                 logging.info("Sleeping...")
                 time.sleep(int(ftp_batch_sleep_time))
                 ftp_batch = 1
             else:
                 ftp_batch += 1
-            download_file_ftp(
+            if not files.download_file_ftp(
                 ftp_host=ftp_host,
                 ftp_dir=ftp_dir,
-                ftp_filename=f"{yr_str}.csv.gz",
-                local_file=source_zipfile,
-                source_url=source_url_year,
-            )
-            gz_decompress(
-                infile=source_zipfile, tofile=source_file_unzipped, delete_zipfile=True
-            )
+                ftp_filename=f"{year['year']}.csv.gz",
+                local_file=year["source_zipfile"],
+                source_url=year["source_url"],
+                source_manifest=source_manifest,
+            ):
+                return None
+            return year
+
+        def transform_year(year: dict) -> dict:
             process_and_load_table(
-                source_file=source_file_unzipped,
-                target_file=target_file_year,
+                source_file=year["source_zipfile"],
+                target_file=year["target_file"],
                 pipeline_name=pipeline_name,
-                source_url=source_url_year,
+                source_url=year["source_url"],
                 chunksize=chunksize,
                 project_id=project_id,
                 dataset_id=dataset_id,
-                destination_table=destination_table_year,
+                destination_table=year["destination_table"],
                 target_gcs_bucket=target_gcs_bucket,
-                target_gcs_path=target_gcs_path_year,
+                target_gcs_path=year["target_gcs_path"],
                 schema_path=schema_path,
                 drop_dest_table=drop_dest_table,
                 input_field_delimiter=input_field_delimiter,
@@ -197,7 +241,35 @@ def execute_pipeline(
                 delete_target_file=delete_target_file,
                 int_date_list=int_date_list,
                 gen_location_list=gen_location_list,
+                transform_list=transform_list,
+                output_format=output_format,
+                transform_workers=transform_workers,
+                load_target=False,
             )
+            return year
+
+        def load_year(year: dict) -> dict:
+            load_target_file(
+                target_file=year["target_file"],
+                target_gcs_bucket=target_gcs_bucket,
+                target_gcs_path=year["target_gcs_path"],
+                project_id=project_id,
+                dataset_id=dataset_id,
+                destination_table=year["destination_table"],
+                schema_path=schema_path,
+                drop_dest_table=drop_dest_table,
+                delete_target_file=delete_target_file,
+                output_format=output_format,
+            )
+            if source_manifest is not None:
+                source_manifest.commit(year["source_url"])
+            return year
+
+        parallel.run_pipelined(
+            years,
+            [download_year, transform_year, load_year],
+            max_in_flight=period_concurrency,
+        )
     if pipeline_name in [
         "GHCND countries",
         "GHCND inventory",
@@ -206,7 +278,9 @@ def execute_pipeline(
         "GSOD stations",
     ]:
         ftp_filename = os.path.split(source_url)[1]
-        download_file_ftp(ftp_host, ftp_dir, ftp_filename, source_file, source_url)
+        files.download_file_ftp(
+            ftp_host, ftp_dir, ftp_filename, source_file, source_url
+        )
         if number_of_header_rows > 0:
             remove_header_rows(source_file, number_of_header_rows=number_of_header_rows)
         else:
@@ -237,9 +311,12 @@ def execute_pipeline(
             delete_target_file=delete_target_file,
             int_date_list=int_date_list,
             gen_location_list=gen_location_list,
+            transform_list=transform_list,
+            output_format=output_format,
+            transform_workers=transform_workers,
         )
     if pipeline_name == "GHCND hurricanes":
-        download_file(source_url, source_file)
+        files.download_file(source_url, source_file)
         if number_of_header_rows > 0:
             remove_header_rows(source_file, number_of_header_rows=number_of_header_rows)
         else:
@@ -270,6 +347,9 @@ def execute_pipeline(
             delete_target_file=delete_target_file,
             int_date_list=int_date_list,
             gen_location_list=gen_location_list,
+            transform_list=transform_list,
+            output_format=output_format,
+            transform_workers=transform_workers,
         )
     if pipeline_name == "NOAA lightning strikes by year":
         url_path = os.path.split(source_url)[0]
@@ -291,8 +371,8 @@ def execute_pipeline(
                     target_file_year = str.replace(
                         str(target_file), ".csv", f"_{yr}.csv"
                     )
-                    download_file(url, source_file_zipped)
-                    gz_decompress(
+                    files.download_file(url, source_file_zipped)
+                    files.gz_decompress(
                         infile=source_file_zipped,
                         tofile=source_file_year,
                         delete_zipfile=True,
@@ -337,6 +417,9 @@ def execute_pipeline(
                         delete_target_file=delete_target_file,
                         int_date_list=int_date_list,
                         gen_location_list=gen_location_list,
+                        transform_list=transform_list,
+                        output_format=output_format,
+                        transform_workers=transform_workers,
                     )
 
 
@@ -358,16 +441,25 @@ def process_and_load_table(
     data_dtypes: dict,
     reorder_headers_list: typing.List[str],
     null_rows_list: typing.List[str],
-    date_format_list: typing.List[str],
+    date_format_list: dict,
     slice_column_list: dict,
     regex_list: dict,
     rename_headers_list: dict,
     remove_source_file: bool,
     delete_target_file: bool,
-    int_date_list: typing.List[str],
+    int_date_list: dict,
     gen_location_list: dict,
+    transform_list: typing.List[str],
+    output_format: str,
+    transform_workers: int,
     encoding: str = "utf-8",
+    load_target: bool = True,
 ) -> None:
+    target_file = files.output_file_path(target_file, output_format)
+    if output_format == "PARQUET":
+        schema_fields = gcs.read_json_from_gcs(target_gcs_bucket, schema_path)
+    else:
+        schema_fields = None
     process_source_file(
         source_url=source_url,
         source_file=source_file,
@@ -386,10 +478,43 @@ def process_and_load_table(
         remove_source_file=remove_source_file,
         int_date_list=int_date_list,
         gen_location_list=gen_location_list,
+        transform_list=transform_list,
+        output_format=output_format,
+        transform_workers=transform_workers,
+        schema_fields=schema_fields,
         encoding=encoding,
     )
+    if load_target:
+        load_target_file(
+            target_file=target_file,
+            target_gcs_bucket=target_gcs_bucket,
+            target_gcs_path=target_gcs_path,
+            project_id=project_id,
+            dataset_id=dataset_id,
+            destination_table=destination_table,
+            schema_path=schema_path,
+            drop_dest_table=drop_dest_table,
+            delete_target_file=delete_target_file,
+            output_format=output_format,
+        )
+
+
+def load_target_file(
+    target_file: str,
+    target_gcs_bucket: str,
+    target_gcs_path: str,
+    project_id: str,
+    dataset_id: str,
+    destination_table: str,
+    schema_path: str,
+    drop_dest_table: str,
+    delete_target_file: bool,
+    output_format: str,
+) -> None:
+    target_file = files.output_file_path(target_file, output_format)
+    target_gcs_path = files.output_file_path(target_gcs_path, output_format)
     if os.path.exists(target_file):
-        upload_file_to_gcs(
+        gcs.upload_file_to_gcs(
             file_path=target_file,
             target_gcs_bucket=target_gcs_bucket,
             target_gcs_path=target_gcs_path,
@@ -398,7 +523,7 @@ def process_and_load_table(
             drop_table = True
         else:
             drop_table = False
-        table_exists = create_dest_table(
+        table_exists = bq.create_dest_table(
             project_id=project_id,
             dataset_id=dataset_id,
             table_id=destination_table,
@@ -407,13 +532,14 @@ def process_and_load_table(
             drop_table=drop_table,
         )
         if table_exists:
-            load_data_to_bq(
+            bq.load_data_to_bq(
                 project_id=project_id,
                 dataset_id=dataset_id,
                 table_id=destination_table,
                 file_path=target_file,
                 truncate_table=True,
                 field_delimiter="|",
+                source_format=output_format,
             )
         else:
             error_msg = f"Error: Data was not loaded because the destination table {project_id}.{dataset_id}.{destination_table} does not exist and/or could not be created."
@@ -437,100 +563,23 @@ def process_source_file(
     target_file: str,
     reorder_headers_list: typing.List[str],
     null_rows_list: typing.List[str],
-    date_format_list: typing.List[str],
+    date_format_list: dict,
     input_field_delimiter: str,
     slice_column_list: dict,
     regex_list: dict,
     rename_headers_list: dict,
-    int_date_list: typing.List[str],
+    int_date_list: dict,
     gen_location_list: dict,
+    transform_list: typing.List[str],
+    output_format: str,
+    transform_workers: int,
+    schema_fields: typing.List[dict],
     encoding: str = "utf8",
     remove_source_file: bool = False,
 ) -> None:
-    logging.info(f"Opening source file {source_file}")
-    csv.field_size_limit(512 << 10)
-    csv.register_dialect(
-        "TabDialect", quotechar='"', delimiter=input_field_delimiter, strict=True
-    )
-    with open(source_file, encoding=encoding, mode="r") as reader:
-        data = []
-        chunk_number = 1
-        for index, line in enumerate(
-            csv.reader((line.replace("\0", "") for line in reader), "TabDialect"), 0
-        ):
-            data.append(line)
-            if index % int(chunksize) == 0 and index > 0:
-                process_dataframe_chunk(
-                    data=data,
-                    pipeline_name=pipeline_name,
-                    input_csv_headers=input_csv_headers,
-                    data_dtypes=data_dtypes,
-                    source_url=source_url,
-                    target_file=target_file,
-                    chunk_number=chunk_number,
-                    reorder_headers_list=reorder_headers_list,
-                    date_format_list=date_format_list,
-                    null_rows_list=null_rows_list,
-                    slice_column_list=slice_column_list,
-                    regex_list=regex_list,
-                    rename_headers_list=rename_headers_list,
-                    int_date_list=int_date_list,
-                    gen_location_list=gen_location_list,
-                )
-                data = []
-                chunk_number += 1
-
-        if data:
-            process_dataframe_chunk(
-                data=data,
-                pipeline_name=pipeline_name,
-                input_csv_headers=input_csv_headers,
-                data_dtypes=data_dtypes,
-                source_url=source_url,
-                target_file=target_file,
-                chunk_number=chunk_number,
-                reorder_headers_list=reorder_headers_list,
-                date_format_list=date_format_list,
-                null_rows_list=null_rows_list,
-                slice_column_list=slice_column_list,
-                regex_list=regex_list,
-                rename_headers_list=rename_headers_list,
-                int_date_list=int_date_list,
-                gen_location_list=gen_location_list,
-            )
-        if remove_source_file:
-            os.remove(source_file)
-
-
-def process_dataframe_chunk(
-    data: typing.List[str],
-    pipeline_name: str,
-    input_csv_headers: typing.List[str],
-    data_dtypes: dict,
-    source_url: str,
-    target_file: str,
-    chunk_number: int,
-    reorder_headers_list: typing.List[str],
-    date_format_list: typing.List[str],
-    null_rows_list: typing.List[str],
-    slice_column_list: dict,
-    regex_list: dict,
-    rename_headers_list: dict,
-    int_date_list: typing.List[str],
-    gen_location_list: dict,
-) -> None:
-    logging.info(f"Processing chunk #{chunk_number}")
-    df = pd.DataFrame(data, columns=input_csv_headers)
-    set_df_datatypes(df, data_dtypes)
-    target_file_batch = str(target_file).replace(
-        ".csv", "-" + str(chunk_number) + ".csv"
-    )
-    process_chunk(
-        df=df,
+    transform_chunk = functools.partial(
+        process_chunk,
         source_url=source_url,
-        target_file_batch=target_file_batch,
-        target_file=target_file,
-        skip_header=(not chunk_number == 1),
         pipeline_name=pipeline_name,
         reorder_headers_list=reorder_headers_list,
         date_format_list=date_format_list,
@@ -540,91 +589,55 @@ def process_dataframe_chunk(
         rename_headers_list=rename_headers_list,
         int_date_list=int_date_list,
         gen_location_list=gen_location_list,
+        transform_list=transform_list,
     )
-
-
-def set_df_datatypes(df: pd.DataFrame, data_dtypes: dict) -> pd.DataFrame:
-    logging.info("Setting data types")
-    for key, item in data_dtypes.items():
-        df[key] = df[key].astype(item)
-    return df
+    writer = files.chunk_writer(target_file, output_format, schema_fields)
+    with files.read_csv_chunks(
+        source_file,
+        names=input_csv_headers,
+        dtype=data_dtypes,
+        chunksize=chunksize,
+        sep=input_field_delimiter,
+        encoding=encoding,
+    ) as reader, writer:
+        for chunk_number, df in enumerate(
+            parallel.map_ordered(transform_chunk, reader, workers=transform_workers),
+            1,
+        ):
+            logging.info(f"Writing chunk #{chunk_number}")
+            writer.write(df)
+    if remove_source_file:
+        os.remove(source_file)
 
 
 def process_chunk(
     df: pd.DataFrame,
     source_url: str,
-    target_file_batch: str,
-    target_file: str,
-    skip_header: bool,
     pipeline_name: str,
     reorder_headers_list: dict,
     null_rows_list: typing.List[str],
-    date_format_list: typing.List[str],
+    date_format_list: dict,
     slice_column_list: dict,
     regex_list: dict,
     rename_headers_list: dict,
-    int_date_list: typing.List[str],
+    int_date_list: dict,
     gen_location_list: dict,
-) -> None:
-    if pipeline_name == "GHCND by year":
-        df = filter_null_rows(df, null_rows_list=null_rows_list)
-        df = add_metadata_cols(df, source_url=source_url)
-        df = source_convert_date_formats(df, date_format_list=date_format_list)
-        df = reorder_headers(df, reorder_headers_list=reorder_headers_list)
-    if pipeline_name in [
-        "GHCND countries",
-        "GHCND inventory",
-        "GHCND states",
-        "GHCND stations",
-    ]:
-        df = slice_column(df, slice_column_list)
-        df = add_metadata_cols(df, source_url=source_url)
-        df = reorder_headers(df, reorder_headers_list=reorder_headers_list)
-    if pipeline_name == "GSOD stations":
-        df = slice_column(df, slice_column_list)
-        df = filter_null_rows(df, null_rows_list=null_rows_list)
-        df = add_metadata_cols(df, source_url=source_url)
-        df = reorder_headers(df, reorder_headers_list=reorder_headers_list)
-        df["lat"] = df["lat"].astype(str)
-        df["lon"] = df["lon"].astype(str)
-        df = apply_regex(df, regex_list)
-    if pipeline_name == "GHCND hurricanes":
-        df.columns = df.columns.str.lower()
-        df = rename_headers(df, rename_headers_list=rename_headers_list)
-        df = add_metadata_cols(df, source_url=source_url)
-        df = reorder_headers(df, reorder_headers_list=reorder_headers_list)
-    if pipeline_name == "NOAA lightning strikes by year":
-        df.columns = df.columns.str.lower()
-        df = rename_headers(df, rename_headers_list=rename_headers_list)
-        df = convert_date_from_int(df, int_date_list=int_date_list)
-        df = generate_location(df, gen_location_list=gen_location_list)
-        df = add_metadata_cols(df, source_url=source_url)
-        df = reorder_headers(df, reorder_headers_list=reorder_headers_list)
-    save_to_new_file(df, file_path=str(target_file_batch))
-    append_batch_file(target_file_batch, target_file, skip_header, not (skip_header))
-
-
-def convert_date_from_int(df: pd.DataFrame, int_date_list: dict) -> pd.DataFrame:
-    logging.info("Converting dates from integers")
-    for key, values in int_date_list.items():
-        dt_col = key
-        dt_int_col = values
-        df[dt_col] = (
-            pd.to_datetime(
-                (df[dt_int_col][:].astype("string") + "000000"), "raise", False, True
-            ).astype("string")
-            + " 00:00:00"
-        )
-    return df
-
-
-def generate_location(df: pd.DataFrame, gen_location_list: dict) -> pd.DataFrame:
-    logging.info("Generating location data")
-    for key, values in gen_location_list.items():
-        df[key] = df[[values[0], values[1]]].apply(
-            lambda x: f"POINT({x[0]} {x[1]})", axis=1
-        )
-    return df
+    transform_list: typing.List[str],
+) -> pd.DataFrame:
+    return transforms.apply_transforms(
+        df,
+        transform_list,
+        transforms=NOAA_TRANSFORMS,
+        source_url=source_url,
+        reorder_headers_list=reorder_headers_list,
+        null_rows_list=null_rows_list,
+        date_format_list=date_format_list,
+        slice_column_list=slice_column_list,
+        regex_list=regex_list,
+        rename_headers_list=rename_headers_list,
+        int_date_list=int_date_list,
+        gen_location_list=gen_location_list,
+    )
 
 
 def url_directory_list(
@@ -650,211 +663,11 @@ def url_directory_list(
     return rtn_list
 
 
-def rename_headers(df: pd.DataFrame, rename_headers_list: dict) -> pd.DataFrame:
-    df.rename(columns=rename_headers_list, inplace=True)
-    return df
-
-
 def remove_header_rows(source_file: str, number_of_header_rows: int) -> None:
     logging.info(f"Removing header from {source_file}")
     os.system(f"sed -i '1,{number_of_header_rows}d' {source_file} ")
 
 
-def add_metadata_cols(df: pd.DataFrame, source_url: str) -> pd.DataFrame:
-    logging.info("Adding metadata columns")
-    df["source_url"] = source_url
-    df["etl_timestamp"] = pd.to_datetime(
-        datetime.datetime.now(), format="%Y-%m-%d %H:%M:%S", infer_datetime_format=True
-    )
-    return df
-
-
-def reorder_headers(
-    df: pd.DataFrame, reorder_headers_list: typing.List[str]
-) -> pd.DataFrame:
-    logging.info("Reordering headers..")
-    return df[reorder_headers_list]
-
-
-def gz_decompress(infile: str, tofile: str, delete_zipfile: bool = False) -> None:
-    logging.info(f"Decompressing {infile}")
-    with open(infile, "rb") as inf, open(tofile, "w", encoding="utf8") as tof:
-        decom_str = gzip.decompress(inf.read()).decode("utf-8")
-        tof.write(decom_str)
-    if delete_zipfile:
-        os.remove(infile)
-
-
-def filter_null_rows(
-    df: pd.DataFrame, null_rows_list: typing.List[str]
-) -> pd.DataFrame:
-    logging.info("Removing rows with blank id's..")
-    for fld in null_rows_list:
-        df = df[df[fld] != ""]
-    return df
-
-
-def convert_dt_format(dt_str: str) -> str:
-    if not dt_str or dt_str.lower() == "nan":
-        return dt_str
-    else:
-        return str(
-            datetime.datetime.strptime(dt_str, "%Y%m%d").date().strftime("%Y-%m-%d")
-        )
-
-
-def source_convert_date_formats(
-    df: pd.DataFrame, date_format_list: typing.List[str]
-) -> pd.DataFrame:
-    logging.info("Converting Date Format..")
-    for fld in date_format_list:
-        df[fld] = df[fld].apply(convert_dt_format)
-    return df
-
-
-def slice_column(
-    df: pd.DataFrame, slice_column_list: dict, pipeline_name: str = ""
-) -> pd.DataFrame:
-    logging.info("Extracting column data..")
-    for key, values in slice_column_list.items():
-        src_col = values[0]
-        dest_col = key
-        start_pos = values[1]
-        end_pos = values[2]
-        if pipeline_name == "GHCND states":
-            if dest_col == "name":
-                # Work-around for Alabama - bad data
-                df[dest_col] = df[src_col].apply(
-                    lambda x: "ALABAMA"
-                    if str(x)[0:2] == "AL"
-                    else str(x)[int(start_pos) :].strip()
-                )
-            else:
-                if end_pos == "":
-                    df[dest_col] = df[src_col].apply(
-                        lambda x: str(x)[int(start_pos) :].strip()
-                    )
-                else:
-                    df[dest_col] = df[src_col].apply(
-                        lambda x: str(x)[int(start_pos) : int(end_pos)].strip()
-                    )
-        else:
-            if end_pos == "":
-                df[dest_col] = df[src_col].apply(
-                    lambda x: str(x)[int(start_pos) :].strip()
-                )
-            else:
-                df[dest_col] = df[src_col].apply(
-                    lambda x: str(x)[int(start_pos) : int(end_pos)].strip()
-                )
-    return df
-
-
-def get_column_country_code(col_val: str) -> str:
-    return col_val.strip().split(" ")[0]
-
-
-def get_column_country_name(col_val: str) -> str:
-    len_code = len(str.split(str.strip(col_val), " ")[0])
-    strmain1 = str.strip(col_val)
-    len_main = len(str.strip(col_val))
-    len_out = len_main - len_code
-    return str.strip((strmain1[::-1])[0:(len_out)][::-1])
-
-
-def apply_regex(df: pd.DataFrame, regex_list: dict) -> pd.DataFrame:
-    logging.info("Applying RegEx")
-    for key, values in regex_list.items():
-        regex_expr = values[0]
-        replace_expr = values[1]
-        isregex = values[2] == "True"
-        df[key][:].replace(regex_expr, replace_expr, regex=isregex, inplace=True)
-    return df
-
-
-def load_data_to_bq(
-    project_id: str,
-    dataset_id: str,
-    table_id: str,
-    file_path: str,
-    truncate_table: bool,
-    field_delimiter: str = "|",
-) -> None:
-    logging.info(
-        f"Loading data from {file_path} into {project_id}.{dataset_id}.{table_id} started"
-    )
-    client = bigquery.Client(project=project_id)
-    table_ref = client.dataset(dataset_id).table(table_id)
-    job_config = bigquery.LoadJobConfig()
-    job_config.source_format = bigquery.SourceFormat.CSV
-    job_config.field_delimiter = field_delimiter
-    if truncate_table:
-        job_config.write_disposition = "WRITE_TRUNCATE"
-    else:
-        job_config.write_disposition = "WRITE_APPEND"
-    job_config.skip_leading_rows = 1  # ignore the header
-    job_config.autodetect = False
-    with open(file_path, "rb") as source_file:
-        job = client.load_table_from_file(source_file, table_ref, job_config=job_config)
-    job.result()
-    logging.info(
-        f"Loading data from {file_path} into {project_id}.{dataset_id}.{table_id} completed"
-    )
-
-
-def create_dest_table(
-    project_id: str,
-    dataset_id: str,
-    table_id: str,
-    schema_filepath: list,
-    bucket_name: str,
-    drop_table: bool = False,
-) -> bool:
-    table_ref = f"{project_id}.{dataset_id}.{table_id}"
-    logging.info(f"Attempting to create table {table_ref} if it doesn't already exist")
-    client = bigquery.Client()
-    table_exists = False
-    try:
-        table = client.get_table(table_ref)
-        table_exists_id = table.table_id
-        logging.info(f"Table {table_exists_id} currently exists.")
-        if drop_table:
-            logging.info("Dropping existing table")
-            client.delete_table(table)
-            table = None
-    except NotFound:
-        table = None
-    if not table:
-        logging.info(
-            (
-                f"Table {table_ref} currently does not exist.  Attempting to create table."
-            )
-        )
-        if check_gcs_file_exists(schema_filepath, bucket_name):
-            schema = create_table_schema([], bucket_name, schema_filepath)
-            table = bigquery.Table(table_ref, schema=schema)
-            client.create_table(table)
-            print(f"Table {table_ref} was created".format(table_id))
-            table_exists = True
-        else:
-            file_name = os.path.split(schema_filepath)[1]
-            file_path = os.path.split(schema_filepath)[0]
-            logging.info(
-                f"Error: Unable to create table {table_ref} because schema file {file_name} does not exist in location {file_path} in bucket {bucket_name}"
-            )
-            table_exists = False
-    else:
-        table_exists = True
-    return table_exists
-
-
-def check_gcs_file_exists(file_path: str, bucket_name: str) -> bool:
-    storage_client = storage.Client()
-    bucket = storage_client.bucket(bucket_name)
-    exists = storage.Blob(bucket=bucket, name=file_path).exists(storage_client)
-    return exists
-
-
 def delete_source_file_data_from_bq(
     project_id: str, dataset_id: str, table_id: str, source_url: str
 ) -> None:
@@ -879,122 +692,6 @@ def delete_source_file_data_from_bq(
     query_job.result()
 
 
-def create_table_schema(
-    schema_structure: list, bucket_name: str = "", schema_filepath: str = ""
-) -> list:
-    logging.info(f"Defining table schema... {bucket_name} ... {schema_filepath}")
-    schema = []
-    if not (schema_filepath):
-        schema_struct = schema_structure
-    else:
-        storage_client = storage.Client()
-        bucket = storage_client.get_bucket(bucket_name)
-        blob = bucket.blob(schema_filepath)
-        schema_struct = json.loads(blob.download_as_bytes(client=None))
-    for schema_field in schema_struct:
-        fld_name = schema_field["name"]
-        fld_type = schema_field["type"]
-        try:
-            fld_descr = schema_field["description"]
-        except KeyError:
-            fld_descr = ""
-        fld_mode = schema_field["mode"]
-        schema.append(
-            bigquery.SchemaField(
-                name=fld_name, field_type=fld_type, mode=fld_mode, description=fld_descr
-            )
-        )
-    return schema
-
-
-def save_to_new_file(df: pd.DataFrame, file_path: str, sep: str = "|") -> None:
-    logging.info(f"Saving data to target file.. {file_path} ...")
-    df.to_csv(file_path, index=False, sep=sep)
-
-
-def append_batch_file(
-    batch_file_path: str, target_file_path: str, skip_header: bool, truncate_file: bool
-) -> None:
-    with open(batch_file_path, "r") as data_file:
-        if truncate_file:
-            target_file = open(target_file_path, "w+").close()
-        with open(target_file_path, "a+") as target_file:
-            if skip_header:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path} with skip header"
-                )
-                next(data_file)
-            else:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path}"
-                )
-            target_file.write(data_file.read())
-            if os.path.exists(batch_file_path):
-                os.remove(batch_file_path)
-
-
-def download_file(source_url: str, source_file: pathlib.Path) -> None:
-    logging.info(f"Downloading {source_url} to {source_file}")
-    r = requests.get(source_url, stream=True)
-    if r.status_code == 200:
-        with open(source_file, "wb") as f:
-            for chunk in r:
-                f.write(chunk)
-    else:
-        logging.error(f"Couldn't download {source_url}: {r.text}")
-
-
-def download_file_ftp(
-    ftp_host: str,
-    ftp_dir: str,
-    ftp_filename: str,
-    local_file: pathlib.Path,
-    source_url: str,
-) -> None:
-    logging.info(f"Downloading {source_url} into {local_file}")
-    for retry in range(1, 3):
-        if not download_file_ftp_single_try(
-            ftp_host, ftp_dir, ftp_filename, local_file
-        ):
-            logging.info(f"FTP file download failed.  Retrying #{retry} in 60 seconds")
-            time.sleep(60)
-        else:
-            break
-
-
-def download_file_ftp_single_try(
-    ftp_host: str, ftp_dir: str, ftp_filename: str, local_file: pathlib.Path
-) -> bool:
-    # try:
-    with ftplib.FTP(ftp_host, timeout=60) as ftp_conn:
-        ftp_conn.login("", "")
-        ftp_conn.cwd(ftp_dir)
-        ftp_conn.encoding = "utf-8"
-        with open(local_file, "wb") as dest_file:
-            ftp_conn.retrbinary("RETR %s" % ftp_filename, dest_file.write)
-        ftp_conn.quit()
-        return True
-    # except:
-    #     return True
-
-
-def upload_file_to_gcs(
-    file_path: pathlib.Path, target_gcs_bucket: str, target_gcs_path: str
-) -> None:
-    if os.path.exists(file_path):
-        logging.info(
-            f"Uploading output file to gs://{target_gcs_bucket}/{target_gcs_path}"
-        )
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(target_gcs_bucket)
-        blob = bucket.blob(target_gcs_path)
-        blob.upload_from_filename(file_path)
-    else:
-        logging.info(
-            f"Cannot upload file to gs://{target_gcs_bucket}/{target_gcs_path} as it does not exist."
-        )
-
-
 if __name__ == "__main__":
     logging.getLogger().setLevel(logging.INFO)
 
@@ -1022,13 +719,18 @@ if __name__ == "__main__":
         data_dtypes=json.loads(os.environ.get("DATA_DTYPES", r"{}")),
         reorder_headers_list=json.loads(os.environ.get("REORDER_HEADERS_LIST", r"[]")),
         null_rows_list=json.loads(os.environ.get("NULL_ROWS_LIST", r"[]")),
-        date_format_list=json.loads(os.environ.get("DATE_FORMAT_LIST", r"[]")),
+        date_format_list=json.loads(os.environ.get("DATE_FORMAT_LIST", r"{}")),
         slice_column_list=json.loads(os.environ.get("SLICE_COLUMN_LIST", r"{}")),
         rename_headers_list=json.loads(os.environ.get("RENAME_HEADERS_LIST", r"{}")),
         remove_source_file=os.environ.get("REMOVE_SOURCE_FILE", "N"),
         delete_target_file=os.environ.get("DELETE_TARGET_FILE", "N"),
         number_of_header_rows=os.environ.get("NUMBER_OF_HEADER_ROWS", "0"),
         regex_list=json.loads(os.environ.get("REGEX_LIST", r"{}")),
-        int_date_list=json.loads(os.environ.get("INT_DATE_LIST", r"[]")),
+        int_date_list=json.loads(os.environ.get("INT_DATE_LIST", r"{}")),
         gen_location_list=json.loads(os.environ.get("GEN_LOCATION_LIST", r"{}")),
+        transform_list=json.loads(os.environ.get("TRANSFORM_LIST", r"[]")),
+        output_format=os.environ.get("OUTPUT_FORMAT", "CSV"),
+        transform_workers=os.environ.get("TRANSFORM_WORKERS", "1"),
+        period_concurrency=os.environ.get("PERIOD_CONCURRENCY", "1"),
+        source_manifest_path=os.environ.get("SOURCE_MANIFEST_PATH", ""),
     )
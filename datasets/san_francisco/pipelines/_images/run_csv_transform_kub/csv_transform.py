@@ -28,6 +28,7 @@ import pandas as pd
 import requests
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery, storage
+from pdp_transform import files, geo, transforms
 
 
 def main(
@@ -525,9 +526,8 @@ def process_sf_muni_shapes(
         target_file_path=str(target_file),
     )
     df_shapes = rename_headers(df=df_shapes, rename_headers_list=rename_headers_list)
-    df_shapes["shape_point_geom"] = df_shapes.apply(
-        lambda x: create_geometry_columns(x["shape_point_lon"], x["shape_point_lat"]),
-        axis=1,
+    df_shapes["shape_point_geom"] = geo.point_wkt(
+        df_shapes["shape_point_lon"], df_shapes["shape_point_lat"], errors="coerce"
     )
     df_shapes = reorder_headers(df=df_shapes, output_headers_list=reorder_headers_list)
     save_to_new_file(df=df_shapes, file_path=target_file, sep="|")
@@ -573,8 +573,8 @@ def process_sf_muni_stops(
         source_file_gcs_path=source_url_dict["stops"],
         target_file_path=str(target_file),
     )
-    df_stops["stop_geom"] = df_stops.apply(
-        lambda x: create_geometry_columns(x["stop_lon"], x["stop_lat"]), axis=1
+    df_stops["stop_geom"] = geo.point_wkt(
+        df_stops["stop_lon"], df_stops["stop_lat"], errors="coerce"
     )
     df_stops = reorder_headers(df=df_stops, output_headers_list=reorder_headers_list)
     save_to_new_file(df=df_stops, file_path=target_file, sep="|")
@@ -831,10 +831,6 @@ def df_replace_values(
     return df
 
 
-def create_geometry_columns(long: float, lat: float) -> pd.DataFrame:
-    return f"POINT({str(long)} {str(lat)})".replace("POINT( )", "")
-
-
 def rename_headers(df: pd.DataFrame, rename_headers_list: dict) -> pd.DataFrame:
     logging.info("Renaming Headers")
     df = df.rename(columns=rename_headers_list)
@@ -1051,6 +1047,7 @@ def process_source_file(
     field_separator: str = ",",
 ) -> None:
     logging.info(f"Opening source file {source_file}")
+    writer = files.ChunkWriter(target_file)
     if header_row_ordinal is None or header_row_ordinal == "None":
         with pd.read_csv(
             source_file,
@@ -1063,18 +1060,12 @@ def process_source_file(
             dtype=data_dtypes,
             keep_default_na=True,
             na_values=[" "],
-        ) as reader:
+        ) as reader, writer:
             for chunk_number, chunk in enumerate(reader):
-                target_file_batch = str(target_file).replace(
-                    ".csv", "-" + str(chunk_number) + ".csv"
-                )
-                df = pd.DataFrame()
-                df = pd.concat([df, chunk])
                 process_chunk(
-                    df=df,
-                    target_file_batch=target_file_batch,
+                    df=chunk,
+                    writer=writer,
                     target_file=target_file,
-                    skip_header=(not chunk_number == 0),
                     destination_table=destination_table,
                     rename_headers_list=rename_headers_list,
                     empty_key_list=empty_key_list,
@@ -1100,18 +1091,12 @@ def process_source_file(
                 dtype=data_dtypes,
                 keep_default_na=True,
                 na_values=[" "],
-            ) as reader:
+            ) as reader, writer:
                 for chunk_number, chunk in enumerate(reader):
-                    target_file_batch = str(target_file).replace(
-                        ".csv", "-" + str(chunk_number) + ".csv"
-                    )
-                    df = pd.DataFrame()
-                    df = pd.concat([df, chunk])
                     process_chunk(
-                        df=df,
-                        target_file_batch=target_file_batch,
+                        df=chunk,
+                        writer=writer,
                         target_file=target_file,
-                        skip_header=(not chunk_number == 0),
                         destination_table=destination_table,
                         rename_headers_list=rename_headers_list,
                         empty_key_list=empty_key_list,
@@ -1134,18 +1119,12 @@ def process_source_file(
                 header=header,  # use when the data file does not contain a header
                 keep_default_na=True,
                 na_values=[" "],
-            ) as reader:
+            ) as reader, writer:
                 for chunk_number, chunk in enumerate(reader):
-                    target_file_batch = str(target_file).replace(
-                        ".csv", "-" + str(chunk_number) + ".csv"
-                    )
-                    df = pd.DataFrame()
-                    df = pd.concat([df, chunk])
                     process_chunk(
-                        df=df,
-                        target_file_batch=target_file_batch,
+                        df=chunk,
+                        writer=writer,
                         target_file=target_file,
-                        skip_header=(not chunk_number == 0),
                         destination_table=destination_table,
                         rename_headers_list=rename_headers_list,
                         empty_key_list=empty_key_list,
@@ -1161,9 +1140,8 @@ def process_source_file(
 
 def process_chunk(
     df: pd.DataFrame,
-    target_file_batch: str,
+    writer: files.ChunkWriter,
     target_file: str,
-    skip_header: bool,
     destination_table: str,
     rename_headers_list: typing.List[str],
     empty_key_list: typing.List[str],
@@ -1175,7 +1153,6 @@ def process_chunk(
     date_format_list: dict,
     reorder_headers_list: typing.List[str],
 ) -> None:
-    logging.info(f"Processing batch file {target_file_batch}")
     if destination_table == "311_service_requests":
         df = rename_headers(df, rename_headers_list)
         df = remove_empty_key_rows(df, empty_key_list)
@@ -1189,8 +1166,7 @@ def process_chunk(
         df = rename_headers(df, rename_headers_list)
         df = strip_whitespace(df, strip_whitespace_list)
         df = strip_newlines(df, strip_newlines_list)
-        df = extract_latitude_from_geom(df, "location_geom", "latitude")
-        df = extract_longitude_from_geom(df, "location_geom", "longitude")
+        df["longitude"], df["latitude"] = geo.parse_point(df["location_geom"])
         df = resolve_date_format(df, date_format_list)
         df = reorder_headers(df, reorder_headers_list)
     elif destination_table == "street_trees":
@@ -1215,7 +1191,7 @@ def process_chunk(
     elif destination_table == "bikeshare_station_info":
         df = rename_headers(df, rename_headers_list)
         df = remove_empty_key_rows(df, empty_key_list)
-        df = generate_location(df, gen_location_list)
+        df = transforms.generate_location(df, gen_location_list, errors="coerce")
         df = resolve_datatypes(df, resolve_datatypes_list)
         df = reorder_headers(df, reorder_headers_list)
     elif destination_table == "bikeshare_station_status":
@@ -1227,7 +1203,7 @@ def process_chunk(
             df = resolve_date_format(df, date_format_list)
         if str(target_file).find("_tripdata.csv") > -1:
             df = resolve_date_format(df, date_format_list)
-            df = generate_location(df, gen_location_list)
+            df = transforms.generate_location(df, gen_location_list, errors="coerce")
         df = add_key(df)
     elif destination_table == "film_locations":
         df = rename_headers(df, rename_headers_list)
@@ -1236,9 +1212,7 @@ def process_chunk(
         df = reorder_headers(df, reorder_headers_list)
     else:
         pass
-    save_to_new_file(df, file_path=str(target_file_batch), sep="|")
-    append_batch_file(target_file_batch, target_file, skip_header, not (skip_header))
-    logging.info(f"Processing batch file {target_file_batch} completed")
+    writer.write(df)
 
 
 def add_key(df: pd.DataFrame) -> pd.DataFrame:
@@ -1417,48 +1391,6 @@ def remove_parenthesis_long_lat(
     return df
 
 
-def extract_longitude_from_geom(
-    df: pd.DataFrame,
-    geom_field_name: str,
-    lon_field_name: str,
-) -> str:
-    logging.info(f"Extracting longitude field {lon_field_name} from {geom_field_name}")
-    df[lon_field_name] = df[geom_field_name].apply(
-        lambda x: str(x).replace("POINT (", "").replace(")", "").split(" ", 1)[0]
-        if str(x) != ""
-        else "POINT (  )"
-    )
-    return df
-
-
-def extract_latitude_from_geom(
-    df: pd.DataFrame,
-    geom_field_name: str,
-    lat_field_name: str,
-) -> str:
-    logging.info(f"Extracting latitude field {lat_field_name} from {geom_field_name}")
-    df[lat_field_name] = df[geom_field_name].apply(
-        lambda x: str(x).replace("POINT (", "").replace(")", "").split(" ", 1)[-1]
-        if str(x) != ""
-        else "POINT (  )"
-    )
-    return df
-
-
-def generate_location(df: pd.DataFrame, gen_location_list: dict) -> pd.DataFrame:
-    logging.info("Generating location data")
-    for key, values in gen_location_list.items():
-        logging.info(f"Generating location data for field {key}")
-        df[key] = (
-            "POINT("
-            + df[values[0]][:].astype("string")
-            + " "
-            + df[values[1]][:].astype("string")
-            + ")"
-        )
-    return df
-
-
 def strip_whitespace(
     df: pd.DataFrame, strip_whitespace_list: typing.List[str]
 ) -> pd.DataFrame:
@@ -1483,32 +1415,14 @@ def resolve_date_format(
     date_format_list: dict,
 ) -> pd.DataFrame:
     logging.info("Resolving date formats")
-    for dt_fld in date_format_list.items():
+    for dt_fld, to_format in date_format_list.items():
         logging.info(f"Resolving date formats in field {dt_fld}")
-        df[dt_fld[0]] = df[dt_fld[0]].apply(convert_dt_format, to_format=dt_fld[1])
+        df[dt_fld] = transforms.normalize_datetime(
+            df[dt_fld], [to_format, None], to_format
+        )
     return df
 
 
-def convert_dt_format(dt_str: str, to_format: str = '"%Y-%m-%d %H:%M:%S"') -> str:
-    if not dt_str or str(dt_str).lower() == "nan" or str(dt_str).lower() == "nat":
-        return ""
-    else:
-        if to_format.find(" ") > 0:
-            # Date and Time
-            return str(
-                pd.to_datetime(
-                    dt_str, format=f"{to_format}", infer_datetime_format=True
-                )
-            )
-        else:
-            # Date Only
-            return str(
-                pd.to_datetime(
-                    dt_str, format=f"{to_format}", infer_datetime_format=True
-                ).date()
-            )
-
-
 def reorder_headers(
     df: pd.DataFrame, output_headers_list: typing.List[str]
 ) -> pd.DataFrame:
@@ -1521,27 +1435,6 @@ def save_to_new_file(df: pd.DataFrame, file_path: str, sep: str = "|") -> None:
     df.to_csv(file_path, index=False, sep=sep)
 
 
-def append_batch_file(
-    batch_file_path: str, target_file_path: str, skip_header: bool, truncate_file: bool
-) -> None:
-    with open(batch_file_path, "r") as data_file:
-        if truncate_file:
-            target_file = open(target_file_path, "w+").close()
-        with open(target_file_path, "a+") as target_file:
-            if skip_header:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path} with skip header"
-                )
-                next(data_file)
-            else:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path}"
-                )
-            target_file.write(data_file.read())
-            if os.path.exists(batch_file_path):
-                os.remove(batch_file_path)
-
-
 def upload_file_to_gcs(
     file_path: pathlib.Path, target_gcs_bucket: str, target_gcs_path: str
 ) -> None:
@@ -12,9 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import csv
 import datetime
-import gzip
+import functools
 import json
 import logging
 import os
@@ -26,6 +25,7 @@ import pandas as pd
 import requests
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery, storage
+from pdp_transform import files, gcs, parallel, transforms
 
 
 def main(
@@ -46,6 +46,7 @@ def main(
     data_dtypes: dict,
     datetime_list: typing.List[str],
     null_string_list: typing.List[str],
+    transform_workers: str,
 ) -> None:
 
     logging.info(f"{pipeline_name} process started")
@@ -67,6 +68,7 @@ def main(
         data_dtypes=data_dtypes,
         datetime_list=datetime_list,
         null_string_list=null_string_list,
+        transform_workers=int(transform_workers),
     )
     logging.info(f"{pipeline_name} process completed")
 
@@ -88,12 +90,15 @@ def execute_pipeline(
     data_dtypes: dict,
     datetime_list: typing.List[str],
     null_string_list: typing.List[str],
+    transform_workers: int = 1,
 ) -> None:
     source_file_path = os.path.split(source_file)[0]
     source_url_file = os.path.basename(urlparse(source_url).path)
     source_file_zipfile = f"{source_file_path}/{source_url_file}"
     download_file(source_url, source_file_zipfile)
-    gz_decompress(infile=source_file_zipfile, tofile=source_file, delete_zipfile=False)
+    files.gz_decompress(
+        infile=source_file_zipfile, tofile=source_file, delete_zipfile=False
+    )
     remove_header_footer(
         source_file=source_file,
         header_rows=int(source_file_header_rows),
@@ -109,9 +114,10 @@ def execute_pipeline(
         datetime_list=datetime_list,
         null_string_list=null_string_list,
         source_url=source_url,
+        transform_workers=transform_workers,
     )
     if os.path.exists(target_file):
-        upload_file_to_gcs(
+        gcs.upload_file_to_gcs(
             file_path=target_file,
             target_gcs_bucket=target_gcs_bucket,
             target_gcs_path=target_gcs_path,
@@ -147,15 +153,6 @@ def execute_pipeline(
         )
 
 
-def gz_decompress(infile: str, tofile: str, delete_zipfile: bool = False) -> None:
-    logging.info(f"Decompressing {infile}")
-    with open(infile, "rb") as inf, open(tofile, "w", encoding="utf8") as tof:
-        decom_str = gzip.decompress(inf.read()).decode("utf-8")
-        tof.write(decom_str)
-    if delete_zipfile:
-        os.remove(infile)
-
-
 def remove_header_footer(source_file: str, header_rows: int, footer_rows: int) -> None:
     logging.info(f"Cleansing data in {source_file}")
     os.system(f"sed -i $'s/[^[:print:]\t]//g' {source_file} ")
@@ -182,98 +179,41 @@ def process_source_file(
     datetime_list: typing.List[str],
     null_string_list: typing.List[str],
     source_url: str,
+    transform_workers: int = 1,
 ) -> None:
-    logging.info(f"Opening source file {source_file}")
-    csv.field_size_limit(512 << 10)
-    csv.register_dialect("TabDialect", quotechar='"', delimiter="\t", strict=True)
-    with open(
+    with files.read_csv_chunks(
         source_file,
-    ) as reader:
-        data = []
-        chunk_number = 1
-        for index, line in enumerate(csv.reader(reader, "TabDialect"), 0):
-            data.append(line)
-            if index % int(chunksize) == 0 and index > 0:
-                process_dataframe_chunk(
-                    data,
-                    input_headers,
-                    data_dtypes,
-                    target_file,
-                    chunk_number,
-                    datetime_list,
-                    null_string_list,
-                    source_file,
-                    source_url,
-                )
-                data = []
-                chunk_number += 1
-
-        if data:
-            process_dataframe_chunk(
-                data,
-                input_headers,
-                data_dtypes,
-                target_file,
-                chunk_number,
-                datetime_list,
-                null_string_list,
-                source_file,
-                source_url,
-            )
-
-
-def process_dataframe_chunk(
-    data: typing.List[str],
-    input_headers: typing.List[str],
-    data_dtypes: dict,
-    target_file: str,
-    chunk_number: int,
-    datetime_list: typing.List[str],
-    null_string_list: typing.List[str],
-    source_file: str,
-    source_url: str,
-) -> None:
-    df = pd.DataFrame(data, columns=input_headers)
-    set_df_datatypes(df, data_dtypes)
-    target_file_batch = str(target_file).replace(
-        ".csv", "-" + str(chunk_number) + ".csv"
-    )
-    process_chunk(
-        df=df,
-        target_file_batch=target_file_batch,
-        target_file=target_file,
-        skip_header=(not chunk_number == 1),
-        datetime_list=datetime_list,
-        null_string_list=null_string_list,
-        source_file=source_file,
-        source_url=source_url,
-    )
-
-
-def set_df_datatypes(df: pd.DataFrame, data_dtypes: dict) -> pd.DataFrame:
-    logging.info("Setting data types")
-    for key, item in data_dtypes.items():
-        df[key] = df[key].astype(item)
-    return df
+        names=input_headers,
+        dtype=data_dtypes,
+        chunksize=chunksize,
+        sep="\t",
+    ) as reader, files.ChunkWriter(target_file, sep="|") as writer:
+        transform_chunk = functools.partial(
+            process_chunk,
+            datetime_list=datetime_list,
+            null_string_list=null_string_list,
+            source_file=source_file,
+            source_url=source_url,
+        )
+        for chunk_number, df in enumerate(
+            parallel.map_ordered(transform_chunk, reader, workers=transform_workers),
+            1,
+        ):
+            logging.info(f"Writing batch #{chunk_number} of {source_file}")
+            writer.write(df)
 
 
 def process_chunk(
     df: pd.DataFrame,
-    target_file_batch: str,
-    target_file: str,
-    skip_header: bool,
     datetime_list: typing.List[str],
     null_string_list: typing.List[str],
     source_file: str,
     source_url: str,
-) -> None:
-    logging.info(f"Processing batch file {target_file_batch}")
+) -> pd.DataFrame:
     df = remove_null_strings(df, null_string_list)
     df = add_metadata_columns(df, source_file, source_url)
     df = resolve_date_format(df, datetime_list)
-    save_to_new_file(df, file_path=str(target_file_batch), sep="|")
-    append_batch_file(target_file_batch, target_file, skip_header, not (skip_header))
-    logging.info(f"Processing batch file {target_file_batch} completed")
+    return df
 
 
 def add_metadata_columns(
@@ -300,19 +240,10 @@ def resolve_date_format(
 ) -> pd.DataFrame:
     logging.info("Resolving date formats")
     for dt_fld in date_format_list:
-        df[dt_fld] = df[dt_fld].apply(convert_dt_format)
-    return df
-
-
-def convert_dt_format(dt_str: str) -> str:
-    if not dt_str or str(dt_str).lower() == "nan" or str(dt_str).lower() == "nat":
-        return ""
-    else:
-        return str(
-            pd.to_datetime(
-                dt_str, format='"%Y-%m-%d %H:%M:%S"', infer_datetime_format=True
-            )
+        df[dt_fld] = transforms.normalize_datetime(
+            df[dt_fld], ["%Y-%m-%d %H:%M:%S", None]
         )
+    return df
 
 
 def download_file(source_url: str, source_file: pathlib.Path) -> None:
@@ -445,49 +376,6 @@ def create_table_schema(
     return schema
 
 
-def save_to_new_file(df: pd.DataFrame, file_path: str, sep: str = "|") -> None:
-    logging.info(f"Saving data to target file.. {file_path} ...")
-    df.to_csv(file_path, index=False, sep=sep)
-
-
-def append_batch_file(
-    batch_file_path: str, target_file_path: str, skip_header: bool, truncate_file: bool
-) -> None:
-    with open(batch_file_path, "r") as data_file:
-        if truncate_file:
-            target_file = open(target_file_path, "w+").close()
-        with open(target_file_path, "a+") as target_file:
-            if skip_header:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path} with skip header"
-                )
-                next(data_file)
-            else:
-                logging.info(
-                    f"Appending batch file {batch_file_path} to {target_file_path}"
-                )
-            target_file.write(data_file.read())
-            if os.path.exists(batch_file_path):
-                os.remove(batch_file_path)
-
-
-def upload_file_to_gcs(
-    file_path: pathlib.Path, target_gcs_bucket: str, target_gcs_path: str
-) -> None:
-    if os.path.exists(file_path):
-        logging.info(
-            f"Uploading output file to gs://{target_gcs_bucket}/{target_gcs_path}"
-        )
-        storage_client = storage.Client()
-        bucket = storage_client.bucket(target_gcs_bucket)
-        blob = bucket.blob(target_gcs_path)
-        blob.upload_from_filename(file_path)
-    else:
-        logging.info(
-            f"Cannot upload file to gs://{target_gcs_bucket}/{target_gcs_path} as it does not exist."
-        )
-
-
 if __name__ == "__main__":
     logging.getLogger().setLevel(logging.INFO)
 
@@ -509,4 +397,5 @@ if __name__ == "__main__":
         data_dtypes=json.loads(os.environ["DATA_DTYPES"]),
         datetime_list=json.loads(os.environ["DATETIME_LIST"]),
         null_string_list=json.loads(os.environ["NULL_STRING_LIST"]),
+        transform_workers=os.environ.get("TRANSFORM_WORKERS", "1"),
     )
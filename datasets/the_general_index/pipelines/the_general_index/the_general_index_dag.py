@@ -63,6 +63,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -94,6 +95,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -125,6 +127,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -156,6 +159,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -187,6 +191,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -218,6 +223,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -249,6 +255,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -280,6 +287,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -311,6 +319,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -342,6 +351,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -373,6 +383,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -404,6 +415,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -435,6 +447,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -466,6 +479,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -497,6 +511,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
@@ -528,6 +543,7 @@ with DAG(
             "PROJECT_ID": "{{ var.value.gcp_project }}",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "CHUNKSIZE": "{{ var.json.the_general_index.chunksize }}",
+            "TRANSFORM_WORKERS": "3",
             "DATASET_ID": "{{ var.json.the_general_index.dataset_id }}",
             "TABLE_ID": "{{ var.json.the_general_index.destination_table }}",
             "SCHEMA_PATH": "{{ var.json.the_general_index.schema_path }}",
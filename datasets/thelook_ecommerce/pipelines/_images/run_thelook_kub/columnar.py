@@ -0,0 +1,622 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Columnar generator for the thelook_ecommerce tables.
+
+Draws whole columns per batch of users with a NumPy `Generator` instead of
+building one Python object per row, following the same distributions as the
+dataclasses in `fake.py`. Each batch is written to the output files as soon
+as it is drawn, so memory is bounded by the batch size.
+"""
+
+import datetime
+import logging
+import os
+import pathlib
+import typing
+
+import faker
+import numpy as np
+import pandas as pd
+from pdp_transform import files, gcs
+
+# Output columns of each table, in the order of its BigQuery schema.
+TABLE_FIELDS = {
+    "users": [
+        ("id", "INTEGER"),
+        ("first_name", "STRING"),
+        ("last_name", "STRING"),
+        ("email", "STRING"),
+        ("age", "INTEGER"),
+        ("gender", "STRING"),
+        ("state", "STRING"),
+        ("street_address", "STRING"),
+        ("postal_code", "STRING"),
+        ("city", "STRING"),
+        ("country", "STRING"),
+        ("latitude", "FLOAT"),
+        ("longitude", "FLOAT"),
+        ("traffic_source", "STRING"),
+        ("created_at", "TIMESTAMP"),
+    ],
+    "orders": [
+        ("order_id", "INTEGER"),
+        ("user_id", "INTEGER"),
+        ("status", "STRING"),
+        ("gender", "STRING"),
+        ("created_at", "TIMESTAMP"),
+        ("returned_at", "TIMESTAMP"),
+        ("shipped_at", "TIMESTAMP"),
+        ("delivered_at", "TIMESTAMP"),
+        ("num_of_item", "INTEGER"),
+    ],
+    "order_items": [
+        ("id", "INTEGER"),
+        ("order_id", "INTEGER"),
+        ("user_id", "INTEGER"),
+        ("product_id", "INTEGER"),
+        ("inventory_item_id", "INTEGER"),
+        ("status", "STRING"),
+        ("created_at", "TIMESTAMP"),
+        ("shipped_at", "TIMESTAMP"),
+        ("delivered_at", "TIMESTAMP"),
+        ("returned_at", "TIMESTAMP"),
+        ("sale_price", "FLOAT"),
+    ],
+    "events": [
+        ("id", "INTEGER"),
+        ("user_id", "INTEGER"),
+        ("sequence_number", "INTEGER"),
+        ("session_id", "STRING"),
+        ("created_at", "TIMESTAMP"),
+        ("ip_address", "STRING"),
+        ("city", "STRING"),
+        ("state", "STRING"),
+        ("postal_code", "STRING"),
+        ("browser", "STRING"),
+        ("traffic_source", "STRING"),
+        ("uri", "STRING"),
+        ("event_type", "STRING"),
+    ],
+    "inventory_items": [
+        ("id", "INTEGER"),
+        ("product_id", "INTEGER"),
+        ("created_at", "TIMESTAMP"),
+        ("sold_at", "TIMESTAMP"),
+        ("cost", "FLOAT"),
+        ("product_category", "STRING"),
+        ("product_name", "STRING"),
+        ("product_brand", "STRING"),
+        ("product_retail_price", "FLOAT"),
+        ("product_department", "STRING"),
+        ("product_sku", "STRING"),
+        ("product_distribution_center_id", "INTEGER"),
+    ],
+}
+
+USER_TRAFFIC_SOURCES = (
+    ["Organic", "Facebook", "Search", "Email", "Display"],
+    [0.15, 0.06, 0.7, 0.05, 0.04],
+)
+ORDERS_PER_USER = ([0, 1, 2, 3, 4], [0.2, 0.5, 0.2, 0.05, 0.05])
+ORDER_STATUSES = (
+    ["Complete", "Cancelled", "Returned", "Processing", "Shipped"],
+    [0.25, 0.15, 0.1, 0.2, 0.3],
+)
+ITEMS_PER_ORDER = ([1, 2, 3, 4], [0.7, 0.2, 0.05, 0.05])
+UNSOLD_ITEMS_PER_ORDER_ITEM = ([1, 2, 3], [0.5, 0.3, 0.2])
+BROWSERS = (
+    ["IE", "Chrome", "Safari", "Firefox", "Other"],
+    [0.05, 0.5, 0.2, 0.2, 0.05],
+)
+SESSION_TRAFFIC_SOURCES = (
+    ["Email", "Adwords", "Organic", "YouTube", "Facebook"],
+    [0.45, 0.3, 0.05, 0.1, 0.1],
+)
+SINGLE_ITEM_FLOW = np.array(["home", "department", "product", "cart", "purchase"])
+MULTI_ITEM_FLOW = np.array(["department", "product", "cart"])
+GHOST_FLOWS = [
+    ["product", "cart", "cancel"],
+    ["department", "product", "cart"],
+    ["product"],
+    ["department", "product"],
+]
+MIN_AGE = 12
+MAX_AGE = 71
+
+SECOND = np.timedelta64(1, "s")
+MINUTE = np.timedelta64(1, "m")
+DAY = np.timedelta64(1, "D")
+NOT_A_TIME = np.datetime64("NaT", "us")
+OCTETS = np.array([str(i) for i in range(256)], dtype=object)
+
+
+def schema_fields(table_name: str) -> typing.List[dict]:
+    return [
+        {"name": name, "type": field_type}
+        for name, field_type in TABLE_FIELDS[table_name]
+    ]
+
+
+def _group_positions(
+    counts: np.ndarray,
+) -> typing.Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Expands per-parent row counts into child rows.
+
+    Returns the parent of every child row, its position within the parent and
+    the offset of each parent's first child.
+    """
+    starts = np.cumsum(counts) - counts
+    parents = np.repeat(np.arange(len(counts)), counts)
+    return parents, np.arange(len(parents)) - starts[parents], starts
+
+
+def _group_cumsum(
+    values: np.ndarray, parents: np.ndarray, starts: np.ndarray
+) -> np.ndarray:
+    """Running total of `values` that restarts at every parent."""
+    totals = np.cumsum(values)
+    return totals - totals[starts][parents] + values[starts][parents]
+
+
+class ColumnarGenerator:
+    """Draws the thelook_ecommerce tables a batch of users at a time.
+
+    Ids keep counting across batches, so the batches of each table can be
+    concatenated into one table. Passing the same `seed` reproduces the
+    same data.
+    """
+
+    def __init__(
+        self,
+        products: pd.DataFrame,
+        locations: pd.DataFrame,
+        seed: typing.Optional[int] = None,
+        name_pool_size: int = 10000,
+    ):
+        self.rng = np.random.default_rng(seed)
+        self.now = np.datetime64(datetime.datetime.now(), "us")
+        self.products = products
+        self.locations = locations
+        population = locations["population"].astype(float).to_numpy()
+        self.location_weights = population / population.sum()
+        department = products["department"].to_numpy()
+        self.products_by_gender = {
+            "M": np.flatnonzero(department == "Men"),
+            "F": np.flatnonzero(department == "Women"),
+        }
+        self.product_uris = "/product/" + products["id"].to_numpy(dtype=object)
+        self.department_uris = (
+            "/department/"
+            + products["department"].str.lower()
+            + "/category/"
+            + products["category"].str.lower().str.replace(" ", "")
+            + "/brand/"
+            + products["brand"].str.lower().str.replace(" ", "")
+        ).to_numpy(dtype=object)
+        fake = faker.Faker()
+        fake.seed_instance(seed)
+        self.male_names = self._pool(fake.first_name_male, name_pool_size)
+        self.female_names = self._pool(fake.first_name_female, name_pool_size)
+        self.last_names = self._pool(fake.last_name_nonbinary, name_pool_size)
+        self.streets = self._pool(fake.street_address, name_pool_size)
+        self.domains = self._pool(fake.safe_domain_name, 100)
+        self.next_ids = {
+            "users": 1,
+            "orders": 1,
+            "order_items": 1,
+            "events": 1,
+            "inventory_items": 1,
+        }
+
+    @staticmethod
+    def _pool(draw: typing.Callable[[], str], size: int) -> np.ndarray:
+        # Faker values are drawn once and then sampled per row, which keeps
+        # Faker's own frequency weighting without a Python call per row.
+        return np.array([draw() for _ in range(size)], dtype=object)
+
+    def _ids(self, table_name: str, size: int) -> np.ndarray:
+        start = self.next_ids[table_name]
+        self.next_ids[table_name] = start + size
+        return np.arange(start, start + size)
+
+    def _choice(self, population_weights: tuple, size: int) -> np.ndarray:
+        population, weights = population_weights
+        return np.asarray(population)[
+            self.rng.choice(len(population), size=size, p=weights)
+        ]
+
+    def _sample(self, pool: np.ndarray, size: int) -> np.ndarray:
+        return pool[self.rng.integers(0, len(pool), size)]
+
+    def _days_since(self, start: np.ndarray) -> np.ndarray:
+        # Matches `fake.created_at`: a random number of whole days between 1
+        # and the days elapsed since `start`, with at least 2 days elapsed.
+        elapsed = np.maximum((self.now - start) // DAY, 2)
+        return self.rng.integers(1, elapsed) * DAY
+
+    def _created_at(self, start: np.ndarray) -> np.ndarray:
+        minutes = self.rng.integers(0, 60 * 19, len(start)) * MINUTE
+        return start + self._days_since(start) + minutes
+
+    def _ip_addresses(self, size: int) -> np.ndarray:
+        octets = [self.rng.integers(1, 224, size)] + [
+            self.rng.integers(0, 256, size) for _ in range(3)
+        ]
+        return (
+            OCTETS[octets[0]]
+            + "."
+            + OCTETS[octets[1]]
+            + "."
+            + OCTETS[octets[2]]
+            + "."
+            + OCTETS[octets[3]]
+        )
+
+    def _session_ids(self, size: int) -> np.ndarray:
+        raw = self.rng.integers(0, 256, size=(size, 16), dtype=np.uint8)
+        raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+        raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+        hexed = np.frombuffer(raw.tobytes().hex().encode(), dtype="S32")
+        hexed = pd.Series(hexed.astype(str), dtype=object)
+        return (
+            hexed.str[:8]
+            + "-"
+            + hexed.str[8:12]
+            + "-"
+            + hexed.str[12:16]
+            + "-"
+            + hexed.str[16:20]
+            + "-"
+            + hexed.str[20:]
+        ).to_numpy(dtype=object)
+
+    def _products_for(self, gender: np.ndarray) -> np.ndarray:
+        draw = self.rng.random(len(gender))
+        men, women = self.products_by_gender["M"], self.products_by_gender["F"]
+        return np.where(
+            gender == "M",
+            men[(draw * len(men)).astype(int)],
+            women[(draw * len(women)).astype(int)],
+        )
+
+    def _uris(self, event_type: np.ndarray, product_idx: np.ndarray) -> np.ndarray:
+        return np.where(
+            event_type == "product",
+            self.product_uris[product_idx],
+            np.where(
+                event_type == "department",
+                self.department_uris[product_idx],
+                "/" + event_type.astype(object),
+            ),
+        )
+
+    def _location_columns(self, size: int) -> pd.DataFrame:
+        idx = self.rng.choice(len(self.locations), size=size, p=self.location_weights)
+        return self.locations.iloc[idx].reset_index(drop=True)
+
+    def user_batch(self, size: int) -> typing.Dict[str, pd.DataFrame]:
+        """Draws `size` users along with their orders, order items, events and
+        inventory items."""
+        users = self._users(size)
+        orders = self._orders(users)
+        order_items, item_users, item_products = self._order_items(orders)
+        events, last_event_at = self._events(
+            order_items, item_users, item_products, users
+        )
+        # An order item ends up timestamped after its last event, as the
+        # row-wise generator advances it through its events.
+        single = order_items["num_of_item"].to_numpy() == 1
+        order_items["created_at"] = np.where(
+            single,
+            last_event_at + self.rng.integers(0, 180, len(single)) * SECOND,
+            last_event_at,
+        )
+        inventory_items = self._inventory_items(order_items, item_products)
+        return {
+            "users": users,
+            "orders": orders,
+            "order_items": order_items,
+            "events": events,
+            "inventory_items": inventory_items,
+        }
+
+    def _users(self, size: int) -> pd.DataFrame:
+        gender = self.rng.choice(np.array(["M", "F"]), size)
+        name_idx = self.rng.integers(0, len(self.male_names), size)
+        first_name = np.where(
+            gender == "M", self.male_names[name_idx], self.female_names[name_idx]
+        )
+        last_name = self._sample(self.last_names, size)
+        users = self._location_columns(size)
+        start = np.where(
+            self.rng.random(size) < 0.025,
+            self.now - 7 * DAY,
+            np.datetime64("2019-01-01", "us"),
+        )
+        users = users.assign(
+            id=self._ids("users", size),
+            first_name=first_name,
+            last_name=last_name,
+            email=pd.Series(first_name).str.lower().to_numpy(dtype=object)
+            + pd.Series(last_name).str.lower().to_numpy(dtype=object)
+            + "@"
+            + self._sample(self.domains, size),
+            age=self.rng.integers(MIN_AGE, MAX_AGE, size),
+            gender=gender,
+            street_address=self._sample(self.streets, size),
+            traffic_source=self._choice(USER_TRAFFIC_SOURCES, size),
+            created_at=self._created_at(start),
+            num_of_orders=self._choice(ORDERS_PER_USER, size),
+        )
+        return users
+
+    def _orders(self, users: pd.DataFrame) -> pd.DataFrame:
+        user_idx = np.repeat(np.arange(len(users)), users["num_of_orders"])
+        size = len(user_idx)
+        status = self._choice(ORDER_STATUSES, size)
+        user_created = users["created_at"].to_numpy()[user_idx]
+        created_at = user_created + self._days_since(user_created)
+        shipped_at = created_at + self.rng.integers(0, 1440 * 3, size) * MINUTE
+        delivered_at = shipped_at + self.rng.integers(0, 1440 * 5, size) * MINUTE
+        returned_at = delivered_at + self.rng.integers(0, 1440 * 3, size) * MINUTE
+        return pd.DataFrame(
+            {
+                "order_id": self._ids("orders", size),
+                "user_id": users["id"].to_numpy()[user_idx],
+                "status": status,
+                "gender": users["gender"].to_numpy()[user_idx],
+                "created_at": created_at,
+                "returned_at": np.where(status == "Returned", returned_at, NOT_A_TIME),
+                "shipped_at": np.where(
+                    np.isin(status, ["Returned", "Complete", "Shipped"]),
+                    shipped_at,
+                    NOT_A_TIME,
+                ),
+                "delivered_at": np.where(
+                    np.isin(status, ["Returned", "Complete"]),
+                    delivered_at,
+                    NOT_A_TIME,
+                ),
+                "num_of_item": self._choice(ITEMS_PER_ORDER, size),
+                "user_idx": user_idx,
+            }
+        )
+
+    def _order_items(
+        self, orders: pd.DataFrame
+    ) -> typing.Tuple[pd.DataFrame, np.ndarray, np.ndarray]:
+        order_idx = np.repeat(np.arange(len(orders)), orders["num_of_item"])
+        size = len(order_idx)
+        item_orders = orders.iloc[order_idx].reset_index(drop=True)
+        product_idx = self._products_for(item_orders["gender"].to_numpy())
+        created_at = (
+            item_orders["created_at"].to_numpy()
+            - self.rng.integers(0, 60 * 240, size) * SECOND
+        )
+        order_items = pd.DataFrame(
+            {
+                "id": self._ids("order_items", size),
+                "order_id": item_orders["order_id"].to_numpy(),
+                "user_id": item_orders["user_id"].to_numpy(),
+                "product_id": self.products["id"].to_numpy()[product_idx],
+                "inventory_item_id": 0,
+                "status": item_orders["status"].to_numpy(),
+                "created_at": created_at,
+                "shipped_at": item_orders["shipped_at"].to_numpy(),
+                "delivered_at": item_orders["delivered_at"].to_numpy(),
+                "returned_at": item_orders["returned_at"].to_numpy(),
+                "sale_price": self.products["retail_price"].to_numpy()[product_idx],
+                "num_of_item": item_orders["num_of_item"].to_numpy(),
+                "ip_address": self._ip_addresses(size),
+                "browser": self._choice(BROWSERS, size),
+                "traffic_source": self._choice(SESSION_TRAFFIC_SOURCES, size),
+                "session_id": self._session_ids(size),
+            }
+        )
+        return order_items, item_orders["user_idx"].to_numpy(), product_idx
+
+    def _events(
+        self,
+        order_items: pd.DataFrame,
+        item_users: np.ndarray,
+        item_products: np.ndarray,
+        users: pd.DataFrame,
+    ) -> typing.Tuple[pd.DataFrame, np.ndarray]:
+        # One order item of a single-item order browses home, department,
+        # product, cart and purchase. In a multi-item order each item browses
+        # department, product and cart once per item, then purchases.
+        num_of_item = order_items["num_of_item"].to_numpy()
+        counts = np.where(num_of_item == 1, 5, 3 * num_of_item + 1)
+        items, position, starts = _group_positions(counts)
+        item_num_of_item = num_of_item[items]
+        single = item_num_of_item == 1
+        event_type = np.where(
+            single,
+            SINGLE_ITEM_FLOW[np.minimum(position, 4)],
+            np.where(
+                position < 3 * item_num_of_item,
+                MULTI_ITEM_FLOW[position % 3],
+                "purchase",
+            ),
+        )
+        steps = self.rng.integers(0, 180, len(items)) * SECOND
+        steps[position == 0] = np.timedelta64(0, "s")
+        purchase_days = self.rng.integers(0, 5, len(items)) * DAY
+        steps += np.where(
+            ~single & (event_type == "purchase"), purchase_days, np.timedelta64(0, "s")
+        )
+        created_at = order_items["created_at"].to_numpy()[items] + _group_cumsum(
+            steps, items, starts
+        )
+        user_idx = item_users[items]
+        events = pd.DataFrame(
+            {
+                "id": self._ids("events", len(items)),
+                "user_id": order_items["user_id"].to_numpy()[items],
+                "sequence_number": position + 1,
+                "session_id": order_items["session_id"].to_numpy()[items],
+                "created_at": created_at,
+                "ip_address": order_items["ip_address"].to_numpy()[items],
+                "city": users["city"].to_numpy()[user_idx],
+                "state": users["state"].to_numpy()[user_idx],
+                "postal_code": users["postal_code"].to_numpy()[user_idx],
+                "browser": order_items["browser"].to_numpy()[items],
+                "traffic_source": order_items["traffic_source"].to_numpy()[items],
+                "uri": self._uris(event_type, item_products[items]),
+                "event_type": event_type,
+            }
+        )
+        return events, created_at[starts + counts - 1]
+
+    def _inventory_items(
+        self, order_items: pd.DataFrame, item_products: np.ndarray
+    ) -> pd.DataFrame:
+        # Every order item takes one sold inventory item followed by a few
+        # unsold ones of the same product.
+        counts = 1 + self._choice(UNSOLD_ITEMS_PER_ORDER_ITEM, len(order_items))
+        items, position, starts = _group_positions(counts)
+        ids = self._ids("inventory_items", len(items))
+        order_items["inventory_item_id"] = ids[starts]
+        sold = position == 0
+        sold_at = order_items["created_at"].to_numpy()[items]
+        product_idx = item_products[items]
+        products = self.products.iloc[product_idx].reset_index(drop=True)
+        return pd.DataFrame(
+            {
+                "id": ids,
+                "product_id": products["id"],
+                "created_at": np.where(
+                    sold,
+                    sold_at - self.rng.integers(0, 86400, len(items)) * MINUTE,
+                    self._created_at(
+                        np.full(len(items), np.datetime64("2020-01-01", "us"))
+                    ),
+                ),
+                "sold_at": np.where(sold, sold_at, NOT_A_TIME),
+                "cost": products["cost"],
+                "product_category": products["category"],
+                "product_name": products["name"],
+                "product_brand": products["brand"],
+                "product_retail_price": products["retail_price"],
+                "product_department": products["department"],
+                "product_sku": products["sku"],
+                "product_distribution_center_id": products["distribution_center_id"],
+            }
+        )
+
+    def ghost_event_batch(self, size: int) -> pd.DataFrame:
+        """Draws the events of `size` anonymous browsing sessions."""
+        locations = self._location_columns(size)
+        flow_idx = self.rng.integers(0, len(GHOST_FLOWS), size)
+        counts = np.array([len(flow) for flow in GHOST_FLOWS])[flow_idx]
+        sessions, position, starts = _group_positions(counts)
+        flows = np.array([flow + [""] * (3 - len(flow)) for flow in GHOST_FLOWS])
+        event_type = flows[flow_idx[sessions], position]
+        gender = self.rng.choice(np.array(["M", "F"]), size)
+        product_idx = self._products_for(gender)[sessions]
+        session_start = self._created_at(
+            np.full(size, np.datetime64("2019-01-01", "us"))
+        )
+        steps = self.rng.integers(0, 30, len(sessions)) * MINUTE
+        return pd.DataFrame(
+            {
+                "id": self._ids("events", len(sessions)),
+                "user_id": pd.array([None] * len(sessions), dtype="Int64"),
+                "sequence_number": position + 1,
+                "session_id": self._session_ids(size)[sessions],
+                "created_at": session_start[sessions]
+                + _group_cumsum(steps, sessions, starts),
+                "ip_address": self._ip_addresses(size)[sessions],
+                "city": locations["city"].to_numpy()[sessions],
+                "state": locations["state"].to_numpy()[sessions],
+                "postal_code": locations["postal_code"].to_numpy()[sessions],
+                "browser": self._choice(BROWSERS, size)[sessions],
+                "traffic_source": self._choice(SESSION_TRAFFIC_SOURCES, size)[sessions],
+                "uri": self._uris(event_type, product_idx),
+                "event_type": event_type,
+            }
+        )
+
+
+def _batch_sizes(total: int, batch_size: int) -> typing.Iterator[int]:
+    for start in range(0, total, batch_size):
+        yield min(batch_size, total - start)
+
+
+def generate(
+    generator: ColumnarGenerator,
+    num_of_users: int,
+    num_of_ghost_events: int,
+    batch_size: int,
+) -> typing.Iterator[typing.Tuple[str, pd.DataFrame]]:
+    """Yields `(table_name, batch)` pairs covering every generated table.
+
+    Batches hold exactly the columns of `TABLE_FIELDS`. Ghost sessions are
+    drawn after all users, so their event ids follow those of the users.
+    """
+    for size in _batch_sizes(num_of_users, batch_size):
+        logging.info(f"generating {size} users")
+        for table_name, df in generator.user_batch(size).items():
+            yield table_name, df[[name for name, _ in TABLE_FIELDS[table_name]]]
+    for size in _batch_sizes(num_of_users * num_of_ghost_events, batch_size):
+        logging.info(f"generating {size} ghost sessions")
+        yield "events", generator.ghost_event_batch(size)
+
+
+def main(
+    num_of_users: int,
+    num_of_ghost_events: int,
+    target_gcs_prefix: str,
+    target_gcs_bucket: str,
+    source_dir: str,
+    batch_size: int,
+    seed: typing.Optional[int] = None,
+    output_format: str = "CSV",
+    output_dir: str = "output",
+) -> None:
+    products = pd.read_csv(
+        f"{source_dir}/products.csv", dtype=str, keep_default_na=False
+    )
+    locations = pd.read_csv(
+        f"{source_dir}/world_pop.csv", dtype=str, keep_default_na=False
+    )
+    generator = ColumnarGenerator(products, locations, seed=seed)
+    pathlib.Path(output_dir).mkdir(parents=True, exist_ok=True)
+    writers = {
+        table_name: files.chunk_writer(
+            files.output_file_path(f"{output_dir}/{table_name}.csv", output_format),
+            output_format,
+            schema_fields(table_name),
+            sep=",",
+        )
+        for table_name in TABLE_FIELDS
+    }
+    try:
+        for table_name, df in generate(
+            generator, num_of_users, num_of_ghost_events, batch_size
+        ):
+            writers[table_name].write(df)
+    finally:
+        for writer in writers.values():
+            writer.close()
+    for table_name, writer in writers.items():
+        gcs.upload_file_to_gcs(
+            file_path=writer.file_path,
+            target_gcs_bucket=target_gcs_bucket,
+            target_gcs_path=files.output_file_path(
+                f"{target_gcs_prefix}/{table_name}.csv", output_format
+            ),
+        )
+        os.remove(writer.file_path)
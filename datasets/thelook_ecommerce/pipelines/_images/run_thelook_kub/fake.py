@@ -11,6 +11,7 @@ import random
 import typing
 import uuid
 
+import columnar
 import faker
 import numpy as np
 from google.cloud import storage
@@ -147,8 +148,54 @@ def main(
     target_gcs_bucket: str,
     source_dir: str,
     extraneous_headers: typing.List[str],
+    generator_mode: str = "ROWS",
+    batch_size: int = 100000,
+    seed: typing.Optional[int] = None,
+    output_format: str = "CSV",
 ) -> None:
 
+    if generator_mode == "COLUMNAR":
+        logging.info("generating data in columnar batches")
+        columnar.main(
+            num_of_users=num_of_users,
+            num_of_ghost_events=num_of_ghost_events,
+            target_gcs_prefix=target_gcs_prefix,
+            target_gcs_bucket=target_gcs_bucket,
+            source_dir=source_dir,
+            batch_size=batch_size,
+            seed=seed,
+            output_format=output_format,
+        )
+    else:
+        generate_rows(
+            num_of_users=num_of_users,
+            num_of_ghost_events=num_of_ghost_events,
+            target_gcs_prefix=target_gcs_prefix,
+            target_gcs_bucket=target_gcs_bucket,
+            extraneous_headers=extraneous_headers,
+        )
+
+    # upload static data to gcs
+    file_names = ["products.csv", "distribution_centers.csv"]
+    for file in file_names:
+        logging.info(
+            f"uploading output file to... gs://{target_gcs_bucket}/{target_gcs_prefix}/{file}"
+        )
+        upload_to_bucket(
+            target_bucket=target_gcs_bucket,
+            target_prefix=target_gcs_prefix,
+            target_object=f"{file}",
+            source_filepath=f"{source_dir}/{file}",
+        )
+
+
+def generate_rows(
+    num_of_users: int,
+    num_of_ghost_events: int,
+    target_gcs_prefix: str,
+    target_gcs_bucket: str,
+    extraneous_headers: typing.List[str],
+) -> None:
     # read and generate location
     logging.info("generating data")
     for user_num in range(int(num_of_users)):
@@ -183,19 +230,6 @@ def main(
             source_data=csv_data,
         )
 
-    # upload static data to gcs
-    file_names = ["products.csv", "distribution_centers.csv"]
-    for file in file_names:
-        logging.info(
-            f"uploading output file to... gs://{target_gcs_bucket}/{target_gcs_prefix}/{file}"
-        )
-        upload_to_bucket(
-            target_bucket=target_gcs_bucket,
-            target_prefix=target_gcs_prefix,
-            target_object=f"{file}",
-            source_filepath=f"{source_dir}/{file}",
-        )
-
 
 # returns random address based off specified distribution
 def get_address(
@@ -828,4 +862,8 @@ if __name__ == "__main__":
         target_gcs_bucket=os.environ["TARGET_GCS_BUCKET"],
         source_dir=os.environ["SOURCE_DIR"],
         extraneous_headers=json.loads(os.environ["EXTRANEOUS_HEADERS"]),
+        generator_mode=os.environ.get("GENERATOR_MODE", "ROWS"),
+        batch_size=int(os.environ.get("BATCH_SIZE", "100000")),
+        seed=int(os.environ["SEED"]) if os.environ.get("SEED") else None,
+        output_format=os.environ.get("OUTPUT_FORMAT", "CSV"),
     )
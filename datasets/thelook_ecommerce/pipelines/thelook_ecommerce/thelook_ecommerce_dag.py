@@ -49,6 +49,8 @@ with DAG(
             "TARGET_GCS_PREFIX": "data/thelook_ecommerce",
             "SOURCE_DIR": "data",
             "EXTRANEOUS_HEADERS": '["event_type", "ip_address", "browser", "traffic_source", "session_id", "sequence_number", "uri", "is_sold"]',
+            "GENERATOR_MODE": "COLUMNAR",
+            "BATCH_SIZE": "100000",
         },
         resources={
             "request_memory": "8G",
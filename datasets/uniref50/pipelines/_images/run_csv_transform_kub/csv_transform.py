@@ -12,15 +12,36 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import csv
+import functools
 import json
 import logging
 import os
 import pathlib
+import re
+import shutil
+import typing
 
-from Bio import SeqIO
+import pandas as pd
 from google.api_core.exceptions import NotFound
 from google.cloud import bigquery, storage
+from pdp_transform import fasta, files, parallel
+
+# Output columns, in the order of uniref50_schema.json
+COLUMNS = [
+    "ClusterID",
+    "RepID",
+    "TaxID",
+    "Sequence",
+    "ClusterName",
+    "Size",
+    "Organism",
+]
+
+# e.g. "UniRef50_A0A1 Protein A n=2 Tax=Homo sapiens TaxID=9606 RepID=A0A1_HUMAN"
+HEADER_PATTERN = re.compile(
+    r"(?P<cluster_id>\S+) (?P<cluster_name>.*?) n=(?P<size>\d+)"
+    r" Tax=(?P<organism>.*) TaxID=(?P<tax_id>\S*) RepID=(?P<rep_id>\S+)"
+)
 
 
 def main(
@@ -28,7 +49,6 @@ def main(
     source_gcs_bucket: str,
     source_gcs_object: str,
     source_file: pathlib.Path,
-    batch_file: str,
     target_file: pathlib.Path,
     project_id: str,
     dataset_id: str,
@@ -37,6 +57,8 @@ def main(
     chunksize: str,
     target_gcs_bucket: str,
     target_gcs_path: str,
+    transform_workers: int = 1,
+    output_format: str = "CSV",
 ) -> None:
     logging.info(f"{pipeline_name} process started")
     pathlib.Path("./files").mkdir(parents=True, exist_ok=True)
@@ -44,15 +66,16 @@ def main(
         source_gcs_bucket=source_gcs_bucket,
         source_gcs_object=source_gcs_object,
         source_file=source_file,
-        batch_file=batch_file,
-        target_file=target_file,
+        target_file=files.output_file_path(target_file, output_format),
         project_id=project_id,
         dataset_id=dataset_id,
         destination_table=table_id,
         schema_path=schema_path,
         chunksize=chunksize,
         target_gcs_bucket=target_gcs_bucket,
-        target_gcs_path=target_gcs_path,
+        target_gcs_path=files.output_file_path(target_gcs_path, output_format),
+        transform_workers=transform_workers,
+        output_format=output_format,
     )
     logging.info(f"{pipeline_name} process completed")
 
@@ -61,8 +84,7 @@ def execute_pipeline(
     source_gcs_bucket: str,
     source_gcs_object: str,
     source_file: pathlib.Path,
-    batch_file: str,
-    target_file: pathlib.Path,
+    target_file: str,
     project_id: str,
     dataset_id: str,
     destination_table: str,
@@ -70,13 +92,16 @@ def execute_pipeline(
     chunksize: str,
     target_gcs_bucket: str,
     target_gcs_path: str,
+    transform_workers: int,
+    output_format: str,
 ) -> None:
     download_blob(source_gcs_bucket, source_gcs_object, source_file)
     process_source_file(
         source_file=source_file,
-        batch_file=batch_file,
         target_file=target_file,
         chunksize=chunksize,
+        transform_workers=transform_workers,
+        output_format=output_format,
     )
     if os.path.exists(target_file):
         upload_file_to_gcs(
@@ -99,6 +124,7 @@ def execute_pipeline(
                 file_path=target_file,
                 truncate_table=False,
                 field_delimiter=",",
+                source_format=output_format,
             )
         else:
             error_msg = f"Error: Data was not loaded because the destination table {project_id}.{dataset_id}.{destination_table} does not exist and/or could not be created."
@@ -123,95 +149,97 @@ def download_blob(source_gcs_bucket: str, source_gcs_object: str, source_file: s
 
 def process_source_file(
     source_file: str,
-    batch_file: str,
     target_file: str,
     chunksize: str,
+    transform_workers: int = 1,
+    output_format: str = "CSV",
 ) -> None:
-    logging.info(f"Opening source file {source_file}")
-    csv.field_size_limit(512 << 10)
-    csv.register_dialect("TabDialect", quotechar='"', delimiter=",", strict=True)
-    append_header_data(
-        batch_file,
-        headers_list=[
-            "ClusterID",
-            "RepID",
-            "TaxID",
-            "Sequence",
-            "ClusterName",
-            "Organism",
-            "Size",
-        ],
+    """Converts the FASTA file to `target_file`, one byte range per worker.
+
+    Each worker writes its records to its own part file, and the parts are
+    then joined in source order.
+    """
+    ranges = fasta.record_ranges(source_file, transform_workers)
+    logging.info(f"Converting {source_file} in {len(ranges)} parts")
+    part_files = [f"{target_file}.part{index}" for index in range(len(ranges))]
+    convert = functools.partial(
+        convert_range,
+        source_file=source_file,
+        chunksize=int(chunksize),
+        output_format=output_format,
     )
-    fasta_sequences = SeqIO.parse(open(source_file), "fasta")
-    logging.info(f"Finished opening source file {source_file}")
-    row_position = 0
-    for fasta in fasta_sequences:
-        description, sequence = str(fasta.description), str(fasta.seq)
-        description_list = description.split(" ")
-        row_list = []
-        string = ""
-        append_row_list(description_list, sequence, row_list)
-        description_list = [" {0}".format(elem) for elem in description_list]
-        iteration_list = iter(description_list[1:])
-        iteration_string = ""
-        for item in description_list:
-            try:
-                iteration_string = next(iteration_list)
-                if " n=" in iteration_string:
-                    string = string + item
-                    row_list.append(string.lstrip())
-                    string = ""
-                elif " n=" in item:
-                    string = string + item
-                    row_list.append(string.lstrip()[2:])
-                    string = ""
-                else:
-                    string = string + item
-            except StopIteration:
-                string = string + item
-                row_list.append(string.lstrip()[4:])
-
-        write_batch_file(batch_file, row_list)
-        row_position = row_position + 1
-        if row_position % int(chunksize) == 0 and row_position > 0:
-            process_chunk(
-                batch_file=batch_file,
-                target_file=target_file,
-            )
-            row_position = 0
-
-    if row_position != 0:
-        process_chunk(
-            batch_file=batch_file,
-            target_file=target_file,
+    rows = sum(
+        parallel.map_ordered(
+            convert, zip(ranges, part_files), workers=transform_workers
         )
+    )
+    logging.info(f"Converted {rows} records")
+    if rows:
+        join_parts(part_files, target_file, output_format)
+    for part_file in part_files:
+        if os.path.exists(part_file):
+            os.remove(part_file)
 
 
-def append_row_list(description_list: list, sequence: str, row_list: list) -> None:
-    row_list.append(description_list.pop(0))
-    row_list.append(description_list.pop()[6:])
-    row_list.append(description_list.pop()[6:])
-    row_list.append(str(sequence))
-    return row_list
-
-
-def write_batch_file(batch_file: str, row_list: list) -> None:
-    with open(
-        batch_file,
-        "a",
-    ) as rowobj:
-        row_append = csv.writer(rowobj)
-        row_append.writerow(row_list)
-
-
-def process_chunk(
-    batch_file: str,
-    target_file: str,
-) -> None:
-    logging.info("Processing batch file")
-    target_file_batch = batch_file
-    append_batch_file(target_file_batch, target_file)
-    logging.info(f"Processing batch file {target_file_batch} completed")
+def convert_range(
+    range_and_part_file: typing.Tuple[typing.Tuple[int, int], str],
+    source_file: str,
+    chunksize: int,
+    output_format: str,
+) -> int:
+    """Writes the records in one byte range of the FASTA file to a part file."""
+    (start, end), part_file = range_and_part_file
+    schema_fields = [{"name": name, "type": "STRING"} for name in COLUMNS]
+    rows = []
+    with files.chunk_writer(part_file, output_format, schema_fields, sep=",") as writer:
+        for header, sequence in fasta.read_records(source_file, start, end):
+            rows.append(parse_record(header, sequence))
+            if len(rows) == chunksize:
+                writer.write(pd.DataFrame(rows, columns=COLUMNS))
+                rows = []
+        if rows:
+            writer.write(pd.DataFrame(rows, columns=COLUMNS))
+        return writer.rows_written
+
+
+def parse_record(header: str, sequence: str) -> typing.List[str]:
+    """Splits a UniRef header into the output columns."""
+    match = HEADER_PATTERN.fullmatch(header)
+    if match is None:
+        logging.warning(f"Unexpected header format: {header}")
+        return [header.split(" ", 1)[0], "", "", sequence, "", "", ""]
+    return [
+        match["cluster_id"],
+        match["rep_id"],
+        match["tax_id"],
+        sequence,
+        match["cluster_name"],
+        match["size"],
+        match["organism"],
+    ]
+
+
+def join_parts(part_files: typing.List[str], target_file: str, output_format: str):
+    """Joins the part files, in order, into `target_file`."""
+    logging.info(f"Joining {len(part_files)} parts into {target_file}")
+    part_files = [part_file for part_file in part_files if os.path.exists(part_file)]
+    if output_format == "PARQUET":
+        import pyarrow.parquet as pq
+
+        with pq.ParquetWriter(
+            target_file, pq.read_schema(part_files[0]), compression="snappy"
+        ) as writer:
+            for part_file in part_files:
+                part = pq.ParquetFile(part_file)
+                for index in range(part.num_row_groups):
+                    writer.write_table(part.read_row_group(index))
+        return
+    with open(target_file, "wb") as target:
+        for index, part_file in enumerate(part_files):
+            with open(part_file, "rb") as part:
+                if index > 0:
+                    part.readline()  # Only the first part keeps its header
+                shutil.copyfileobj(part, target, files.READ_BUFFER_SIZE)
 
 
 def load_data_to_bq(
@@ -221,6 +249,7 @@ def load_data_to_bq(
     file_path: str,
     truncate_table: bool,
     field_delimiter: str,
+    source_format: str = "CSV",
 ) -> None:
     logging.info(
         f"Loading data from {file_path} into {project_id}.{dataset_id}.{table_id} started"
@@ -228,13 +257,16 @@ def load_data_to_bq(
     client = bigquery.Client(project=project_id)
     table_ref = client.dataset(dataset_id).table(table_id)
     job_config = bigquery.LoadJobConfig()
-    job_config.source_format = bigquery.SourceFormat.CSV
-    job_config.field_delimiter = field_delimiter
+    if source_format == "PARQUET":
+        job_config.source_format = bigquery.SourceFormat.PARQUET
+    else:
+        job_config.source_format = bigquery.SourceFormat.CSV
+        job_config.field_delimiter = field_delimiter
+        job_config.skip_leading_rows = 1  # ignore the header
     if truncate_table:
         job_config.write_disposition = "WRITE_TRUNCATE"
     else:
         job_config.write_disposition = "WRITE_APPEND"
-    job_config.skip_leading_rows = 1  # ignore the header
     job_config.autodetect = False
     with open(file_path, "rb") as source_file:
         job = client.load_table_from_file(source_file, table_ref, job_config=job_config)
@@ -244,12 +276,6 @@ def load_data_to_bq(
     )
 
 
-def append_header_data(batch_file: str, headers_list: list) -> None:
-    with open(batch_file, "w") as headerobj:
-        header_write = csv.writer(headerobj)
-        header_write.writerow(headers_list)
-
-
 def create_dest_table(
     project_id: str,
     dataset_id: str,
@@ -327,18 +353,6 @@ def create_table_schema(
     return schema
 
 
-def append_batch_file(target_file_batch: str, target_file: str) -> None:
-
-    with open(target_file_batch, "r") as data_file:
-        with open(target_file, "a+") as _target_file:
-            logging.info(f"Appending batch file {target_file_batch} to {target_file}")
-            logging.info(f"Size of target file is {os.path.getsize(target_file_batch)}")
-            logging.info(f"Size of target file is {os.path.getsize(target_file)}")
-            _target_file.write(data_file.read())
-            if os.path.exists(target_file_batch):
-                os.remove(target_file_batch)
-
-
 def upload_file_to_gcs(
     file_path: pathlib.Path, target_gcs_bucket: str, target_gcs_path: str
 ) -> None:
@@ -365,7 +379,6 @@ if __name__ == "__main__":
         source_gcs_bucket=os.environ.get("SOURCE_GCS_BUCKET"),
         source_gcs_object=os.environ.get("SOURCE_GCS_OBJECT"),
         source_file=pathlib.Path(os.environ.get("SOURCE_FILE")).expanduser(),
-        batch_file=os.environ.get("BATCH_FILE"),
         target_file=pathlib.Path(os.environ.get("TARGET_FILE")).expanduser(),
         chunksize=os.environ.get("CHUNKSIZE"),
         target_gcs_bucket=os.environ.get(
@@ -376,4 +389,6 @@ if __name__ == "__main__":
         dataset_id=os.environ.get("DATASET_ID"),
         table_id=os.environ["TABLE_ID"],
         schema_path=os.environ["SCHEMA_PATH"],
+        transform_workers=int(os.environ.get("TRANSFORM_WORKERS", "1")),
+        output_format=os.environ.get("OUTPUT_FORMAT", "CSV"),
     )
@@ -57,7 +57,6 @@ with DAG(
             "SOURCE_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "SOURCE_GCS_OBJECT": "data/uniref50/uniref/myseq_10.fa",
             "SOURCE_FILE": "files/uniref50.fa",
-            "BATCH_FILE": "files/batch.csv",
             "TARGET_FILE": "files/data_output.csv",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/uniref50/uniref/data_output_1.csv",
@@ -67,10 +66,11 @@ with DAG(
             "TABLE_ID": "uniref50",
             "SCHEMA_PATH": "data/uniref50/uniref50_schema.json",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "4",
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "4",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -129,7 +129,6 @@ with DAG(
             "SOURCE_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "SOURCE_GCS_OBJECT": "data/uniref50/uniref/myseq_13500000.fa",
             "SOURCE_FILE": "files/uniref50.fa",
-            "BATCH_FILE": "files/batch.csv",
             "TARGET_FILE": "files/data_output.csv",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/uniref50/uniref/data_output_2.csv",
@@ -139,10 +138,11 @@ with DAG(
             "DATASET_ID": "uniref50",
             "SCHEMA_PATH": "data/uniref50/uniref50_schema.json",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "4",
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "4",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -201,7 +201,6 @@ with DAG(
             "SOURCE_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "SOURCE_GCS_OBJECT": "data/uniref50/uniref/myseq_17000000.fa",
             "SOURCE_FILE": "files/uniref50.fa",
-            "BATCH_FILE": "files/batch.csv",
             "TARGET_FILE": "files/data_output.csv",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/uniref50/uniref/data_output_3.csv",
@@ -211,10 +210,11 @@ with DAG(
             "DATASET_ID": "uniref50",
             "SCHEMA_PATH": "data/uniref50/uniref50_schema.json",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "4",
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "4",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -273,7 +273,6 @@ with DAG(
             "SOURCE_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "SOURCE_GCS_OBJECT": "data/uniref50/uniref/myseq10000000.fa",
             "SOURCE_FILE": "files/uniref50.fa",
-            "BATCH_FILE": "files/batch.csv",
             "TARGET_FILE": "files/data_output.csv",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/uniref50/uniref/data_output_4.csv",
@@ -283,10 +282,11 @@ with DAG(
             "DATASET_ID": "uniref50",
             "SCHEMA_PATH": "data/uniref50/uniref50_schema.json",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "4",
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "4",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -345,7 +345,6 @@ with DAG(
             "SOURCE_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "SOURCE_GCS_OBJECT": "data/uniref50/uniref/myseq20000000.fa",
             "SOURCE_FILE": "files/uniref50.fa",
-            "BATCH_FILE": "files/batch.csv",
             "TARGET_FILE": "files/data_output.csv",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/uniref50/uniref/data_output_5.csv",
@@ -355,10 +354,11 @@ with DAG(
             "DATASET_ID": "uniref50",
             "SCHEMA_PATH": "data/uniref50/uniref50_schema.json",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "4",
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "4",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -417,7 +417,6 @@ with DAG(
             "SOURCE_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "SOURCE_GCS_OBJECT": "data/uniref50/uniref/myseq30000000.fa",
             "SOURCE_FILE": "files/uniref50.fa",
-            "BATCH_FILE": "files/batch.csv",
             "TARGET_FILE": "files/data_output.csv",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/uniref50/uniref/data_output_6.csv",
@@ -427,10 +426,11 @@ with DAG(
             "DATASET_ID": "uniref50",
             "SCHEMA_PATH": "data/uniref50/uniref50_schema.json",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "4",
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "4",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -489,7 +489,6 @@ with DAG(
             "SOURCE_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "SOURCE_GCS_OBJECT": "data/uniref50/uniref/myseq40000000.fa",
             "SOURCE_FILE": "files/uniref50.fa",
-            "BATCH_FILE": "files/batch.csv",
             "TARGET_FILE": "files/data_output.csv",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/uniref50/uniref/data_output_7.csv",
@@ -499,10 +498,11 @@ with DAG(
             "DATASET_ID": "uniref50",
             "SCHEMA_PATH": "data/uniref50/uniref50_schema.json",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "4",
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "4",
             "request_ephemeral_storage": "10G",
         },
     )
@@ -561,7 +561,6 @@ with DAG(
             "SOURCE_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "SOURCE_GCS_OBJECT": "data/uniref50/uniref/myseq50000000.fa",
             "SOURCE_FILE": "files/uniref50.fa",
-            "BATCH_FILE": "files/batch.csv",
             "TARGET_FILE": "files/data_output.csv",
             "TARGET_GCS_BUCKET": "{{ var.value.composer_bucket }}",
             "TARGET_GCS_PATH": "data/uniref50/uniref/data_output_8.csv",
@@ -571,10 +570,11 @@ with DAG(
             "DATASET_ID": "uniref50",
             "SCHEMA_PATH": "data/uniref50/uniref50_schema.json",
             "CHUNKSIZE": "100000",
+            "TRANSFORM_WORKERS": "4",
         },
         resources={
             "request_memory": "4G",
-            "request_cpu": "1",
+            "request_cpu": "4",
             "request_ephemeral_storage": "10G",
         },
     )
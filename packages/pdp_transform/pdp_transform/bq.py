@@ -0,0 +1,211 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import functools
+import logging
+import os
+import threading
+import typing
+
+from google.api_core.exceptions import NotFound
+from google.cloud import bigquery
+from pdp_transform import gcs
+
+
+@functools.lru_cache(maxsize=None)
+def bigquery_client(project_id: typing.Optional[str] = None) -> bigquery.Client:
+    """Returns the BigQuery client shared by every helper in this process."""
+    return bigquery.Client(project=project_id)
+
+
+class TableMetadata:
+    """Caches which tables a dataset holds and the schema of each table.
+
+    A dataset is listed once and each schema is fetched once, however many
+    periods ask about them. `create_dest_table` calls `invalidate` after it
+    creates or drops a table. The cache is safe to share between the stage
+    threads of `parallel.run_pipelined`.
+    """
+
+    def __init__(self, client: bigquery.Client):
+        self.client = client
+        self._lock = threading.Lock()
+        self._tables = {}
+        self._schemas = {}
+
+    def table_exists(self, dataset_id: str, table_name: str) -> bool:
+        with self._lock:
+            if dataset_id not in self._tables:
+                logging.info(f"Listing tables in dataset {dataset_id}")
+                self._tables[dataset_id] = {
+                    tbl.table_id for tbl in self.client.list_tables(dataset_id)
+                }
+            return table_name in self._tables[dataset_id]
+
+    def schema(
+        self, dataset_id: str, table_name: str
+    ) -> typing.List[bigquery.SchemaField]:
+        if not self.table_exists(dataset_id, table_name):
+            return []
+        table_ref = f"{dataset_id}.{table_name}"
+        with self._lock:
+            if table_ref not in self._schemas:
+                self._schemas[table_ref] = self.client.get_table(table_ref).schema
+            return self._schemas[table_ref]
+
+    def field_exists(self, dataset_id: str, table_name: str, field_name: str) -> bool:
+        return any(
+            field.name == field_name for field in self.schema(dataset_id, table_name)
+        )
+
+    def invalidate(self, dataset_id: str, table_name: str) -> None:
+        with self._lock:
+            self._tables.pop(dataset_id, None)
+            self._schemas.pop(f"{dataset_id}.{table_name}", None)
+
+
+@functools.lru_cache(maxsize=None)
+def table_metadata(project_id: typing.Optional[str] = None) -> TableMetadata:
+    """Returns the metadata cache shared by every helper in this process."""
+    return TableMetadata(bigquery_client(project_id))
+
+
+def count_rows_by_period(
+    project_id: str,
+    dataset_id: str,
+    table_names: typing.List[str],
+    period_exprs: typing.List[str],
+) -> typing.Dict[typing.Tuple[str, ...], int]:
+    """Counts the rows of each table per period in a single query.
+
+    `period_exprs` are the SQL expressions a period is grouped by, such as
+    a year column or `FORMAT_DATE('%Y', date_field)`. The result maps
+    `(table_name, *period_values)`, with values as strings, to the row
+    count. Periods without rows, and rows with a NULL period, are absent.
+    """
+    if not table_names:
+        return {}
+    periods = ", ".join(f"{expr} AS period_{i}" for i, expr in enumerate(period_exprs))
+    group_by = ", ".join(str(i + 2) for i in range(len(period_exprs)))
+    query = "\nUNION ALL\n".join(
+        f"""
+        SELECT '{table_name}' AS table_name, {periods}, count(1) AS number_of_rows
+        FROM {dataset_id}.{table_name}
+        GROUP BY {group_by}
+        """
+        for table_name in table_names
+    )
+    logging.info(f"Counting rows per period in {len(table_names)} table(s)")
+    counts = {}
+    for row in bigquery_client(project_id).query(query).result():
+        period = [row[f"period_{i}"] for i in range(len(period_exprs))]
+        if None in period:
+            continue
+        counts[(row.table_name, *map(str, period))] = int(row.number_of_rows)
+    return counts
+
+
+def create_table_schema(
+    schema_structure: list, bucket_name: str = "", schema_filepath: str = ""
+) -> list:
+    logging.info(f"Defining table schema... {bucket_name} ... {schema_filepath}")
+    if not schema_filepath:
+        schema_struct = schema_structure
+    else:
+        schema_struct = gcs.read_json_from_gcs(bucket_name, schema_filepath)
+    schema = []
+    for schema_field in schema_struct:
+        schema.append(
+            bigquery.SchemaField(
+                name=schema_field["name"],
+                field_type=schema_field["type"],
+                mode=schema_field["mode"],
+                description=schema_field.get("description", ""),
+            )
+        )
+    return schema
+
+
+def create_dest_table(
+    project_id: str,
+    dataset_id: str,
+    table_id: str,
+    schema_filepath: str,
+    bucket_name: str,
+    drop_table: bool = False,
+) -> bool:
+    table_ref = f"{project_id}.{dataset_id}.{table_id}"
+    logging.info(f"Attempting to create table {table_ref} if it doesn't already exist")
+    client = bigquery_client(project_id)
+    try:
+        table = client.get_table(table_ref)
+        logging.info(f"Table {table.table_id} currently exists.")
+        if drop_table:
+            logging.info("Dropping existing table")
+            client.delete_table(table)
+            table_metadata(project_id).invalidate(dataset_id, table_id)
+            table = None
+    except NotFound:
+        table = None
+    if table:
+        return True
+    logging.info(
+        f"Table {table_ref} currently does not exist.  Attempting to create table."
+    )
+    if not gcs.check_gcs_file_exists(schema_filepath, bucket_name):
+        file_path, file_name = os.path.split(schema_filepath)
+        logging.info(
+            f"Error: Unable to create table {table_ref} because schema file {file_name} does not exist in location {file_path} in bucket {bucket_name}"
+        )
+        return False
+    schema = create_table_schema([], bucket_name, schema_filepath)
+    client.create_table(bigquery.Table(table_ref, schema=schema))
+    table_metadata(project_id).invalidate(dataset_id, table_id)
+    logging.info(f"Table {table_ref} was created")
+    return True
+
+
+def load_data_to_bq(
+    project_id: str,
+    dataset_id: str,
+    table_id: str,
+    file_path: str,
+    truncate_table: bool,
+    field_delimiter: str = "|",
+    source_format: str = "CSV",
+) -> None:
+    logging.info(
+        f"Loading data from {file_path} into {project_id}.{dataset_id}.{table_id} started"
+    )
+    client = bigquery_client(project_id)
+    table_ref = client.dataset(dataset_id).table(table_id)
+    job_config = bigquery.LoadJobConfig()
+    if source_format == "PARQUET":
+        job_config.source_format = bigquery.SourceFormat.PARQUET
+    else:
+        job_config.source_format = bigquery.SourceFormat.CSV
+        job_config.field_delimiter = field_delimiter
+        job_config.skip_leading_rows = 1  # ignore the header
+    if truncate_table:
+        job_config.write_disposition = "WRITE_TRUNCATE"
+    else:
+        job_config.write_disposition = "WRITE_APPEND"
+    job_config.autodetect = False
+    with open(file_path, "rb") as source_file:
+        job = client.load_table_from_file(source_file, table_ref, job_config=job_config)
+    job.result()
+    logging.info(
+        f"Loading data from {file_path} into {project_id}.{dataset_id}.{table_id} completed"
+    )
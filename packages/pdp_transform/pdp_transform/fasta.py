@@ -0,0 +1,84 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Reads FASTA files in byte ranges that can be parsed in parallel."""
+
+import os
+import typing
+
+from pdp_transform import files
+
+_WHITESPACE = b" \t\n\r\x0b\x0c"
+
+
+def record_ranges(source_file: str, parts: int) -> typing.List[typing.Tuple[int, int]]:
+    """Splits a FASTA file into about `parts` byte ranges of similar size.
+
+    Every range starts at a `>` header line, so each one can be handed to
+    `read_records` in a separate process. Fewer ranges come back when the
+    file holds fewer records than `parts`.
+    """
+    size = os.path.getsize(source_file)
+    bounds = [0]
+    with open(source_file, "rb") as f:
+        for part in range(1, parts):
+            offset = size * part // parts
+            if offset <= bounds[-1]:
+                continue
+            # Finish the line `offset` falls in, then find the next header.
+            f.seek(offset - 1)
+            f.readline()
+            while True:
+                position = f.tell()
+                line = f.readline()
+                if not line or line.startswith(b">"):
+                    break
+            if bounds[-1] < position < size:
+                bounds.append(position)
+    bounds.append(size)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def read_records(
+    source_file: str, start: int = 0, end: typing.Optional[int] = None
+) -> typing.Iterator[typing.Tuple[str, str]]:
+    """Yields the `(header, sequence)` of each record between two offsets.
+
+    `start` must be the offset of a header line, such as one returned by
+    `record_ranges`. The header excludes the leading `>`, like the
+    `description` of a Biopython record, and the sequence lines are joined
+    with their whitespace removed. Lines before the first header are skipped.
+    """
+    with open(source_file, "rb", buffering=files.READ_BUFFER_SIZE) as f:
+        f.seek(start)
+        position = start
+        header = None
+        sequence = []
+        for line in f:
+            if end is not None and position >= end:
+                break
+            position += len(line)
+            if line.startswith(b">"):
+                if header is not None:
+                    yield header, _join_sequence(sequence)
+                header = line[1:].decode().rstrip()
+                sequence = []
+            elif header is not None:
+                sequence.append(line)
+        if header is not None:
+            yield header, _join_sequence(sequence)
+
+
+def _join_sequence(lines: typing.List[bytes]) -> str:
+    return b"".join(lines).translate(None, _WHITESPACE).decode()
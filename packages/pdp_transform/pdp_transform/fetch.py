@@ -0,0 +1,131 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Concurrent HTTP GETs over a pooled session that retries with backoff."""
+
+import concurrent.futures
+import logging
+import os
+import typing
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+
+
+def retrying_session(
+    pool_size: int = 10, retries: int = 5, backoff_factor: float = 1.0
+) -> requests.Session:
+    """Returns a session that keeps up to `pool_size` connections per host open.
+
+    Connection errors and 429/5xx responses are retried `retries` times with
+    exponential backoff, honouring `Retry-After`. When the retries run out, the
+    last response is returned rather than raised.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_many(
+    urls: typing.Sequence[str],
+    max_workers: int = 8,
+    session: typing.Optional[requests.Session] = None,
+    **kwargs: typing.Any,
+) -> typing.Iterator[typing.Tuple[str, typing.Union[requests.Response, OSError]]]:
+    """GETs every URL with at most `max_workers` requests in flight.
+
+    Yields `(url, response)` pairs in the order of `urls` as soon as each one
+    is done, so callers can assemble results incrementally. A request that
+    still fails after the session's retries yields its exception in place of
+    the response. `kwargs` are passed to `session.get`.
+    """
+    session = session or retrying_session(pool_size=max_workers)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(session.get, url, **kwargs) for url in urls]
+        for url, future in zip(urls, futures):
+            try:
+                yield url, future.result()
+            except OSError as e:
+                yield url, e
+
+
+def download_file(
+    url: str,
+    file_path: str,
+    session: typing.Optional[requests.Session] = None,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    attempts: int = 3,
+    timeout: float = 300,
+) -> None:
+    """Streams `url` into `file_path`.
+
+    A transfer cut off midway is resumed from where it stopped with a `Range`
+    request, up to `attempts` times, and so is a partial `file_path` left by
+    an earlier run. Servers that ignore ranges send the whole file again.
+    Raises `IOError` if the file still ends up shorter than the
+    `Content-Length` the server announced.
+    """
+    session = session or retrying_session()
+    for attempt in range(1, attempts + 1):
+        try:
+            _download_once(url, file_path, session, chunk_size, timeout)
+            return
+        except requests.exceptions.HTTPError:
+            raise
+        except IOError as e:
+            if attempt == attempts:
+                raise
+            logging.info(f"Resuming download of {url} after: {e}")
+
+
+def _download_once(
+    url: str,
+    file_path: str,
+    session: requests.Session,
+    chunk_size: int,
+    timeout: float,
+) -> None:
+    offset = os.path.getsize(file_path) if os.path.exists(file_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 416:
+            # The partial file is already complete
+            return
+        r.raise_for_status()
+        resumed = r.status_code == 206
+        expected = r.headers.get("Content-Length")
+        with open(file_path, "ab" if resumed else "wb") as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+    if expected is not None:
+        expected_size = int(expected) + (offset if resumed else 0)
+        size = os.path.getsize(file_path)
+        if size < expected_size:
+            raise IOError(
+                f"Incomplete download of {url}: got {size} of {expected_size} bytes"
+            )
@@ -0,0 +1,237 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import contextlib
+import ftplib
+import gzip
+import io
+import logging
+import os
+import pathlib
+import shutil
+import time
+import typing
+
+import pandas as pd
+import requests
+from pdp_transform import manifest
+
+OUTPUT_FORMATS = ("CSV", "PARQUET")
+READ_BUFFER_SIZE = 1 << 20
+
+
+def download_file(
+    source_url: str,
+    source_file: pathlib.Path,
+    source_manifest: typing.Optional[manifest.SourceManifest] = None,
+) -> bool:
+    """Downloads `source_url` and returns whether there is new data to load.
+
+    With a `source_manifest`, a source whose fingerprint matches the last
+    loaded copy is not downloaded at all.
+    """
+    fingerprint = {}
+    if source_manifest is not None:
+        fingerprint = manifest.http_fingerprint(source_url)
+        if source_manifest.unchanged(source_url, fingerprint):
+            logging.info(f"{source_url} is unchanged since the last load. Skipping.")
+            return False
+    logging.info(f"Downloading {source_url} to {source_file}")
+    r = requests.get(source_url, stream=True)
+    if r.status_code == 200:
+        with open(source_file, "wb") as f:
+            for chunk in r:
+                f.write(chunk)
+    else:
+        logging.error(f"Couldn't download {source_url}: {r.text}")
+        return False
+    if source_manifest is not None:
+        return source_manifest.stage(source_url, fingerprint, source_file)
+    return True
+
+
+def download_file_ftp(
+    ftp_host: str,
+    ftp_dir: str,
+    ftp_filename: str,
+    local_file: pathlib.Path,
+    source_url: str,
+    source_manifest: typing.Optional[manifest.SourceManifest] = None,
+) -> bool:
+    """Downloads a file over FTP and returns whether there is new data to load.
+
+    With a `source_manifest`, a file whose size and modification time match
+    the last loaded copy is not downloaded at all.
+    """
+    fingerprint = {}
+    if source_manifest is not None:
+        fingerprint = manifest.ftp_fingerprint(ftp_host, ftp_dir, ftp_filename)
+        if source_manifest.unchanged(source_url, fingerprint):
+            logging.info(f"{source_url} is unchanged since the last load. Skipping.")
+            return False
+    logging.info(f"Downloading {source_url} into {local_file}")
+    for retry in range(1, 3):
+        if not download_file_ftp_single_try(
+            ftp_host, ftp_dir, ftp_filename, local_file
+        ):
+            logging.info(f"FTP file download failed.  Retrying #{retry} in 60 seconds")
+            time.sleep(60)
+        else:
+            break
+    if source_manifest is not None:
+        return source_manifest.stage(source_url, fingerprint, local_file)
+    return True
+
+
+def download_file_ftp_single_try(
+    ftp_host: str, ftp_dir: str, ftp_filename: str, local_file: pathlib.Path
+) -> bool:
+    with ftplib.FTP(ftp_host, timeout=60) as ftp_conn:
+        ftp_conn.login("", "")
+        ftp_conn.cwd(ftp_dir)
+        ftp_conn.encoding = "utf-8"
+        with open(local_file, "wb") as dest_file:
+            ftp_conn.retrbinary("RETR %s" % ftp_filename, dest_file.write)
+        ftp_conn.quit()
+        return True
+
+
+def gz_decompress(infile: str, tofile: str, delete_zipfile: bool = False) -> None:
+    logging.info(f"Decompressing {infile}")
+    with gzip.open(infile, "rb") as inf, open(tofile, "wb") as tof:
+        shutil.copyfileobj(inf, tof, READ_BUFFER_SIZE)
+    if delete_zipfile:
+        os.remove(infile)
+
+
+class NulStrippingReader(io.RawIOBase):
+    """Binary stream that drops NUL bytes from the stream it wraps."""
+
+    def __init__(self, raw: typing.BinaryIO):
+        self._raw = raw
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while True:
+            data = self._raw.read(len(buffer))
+            if not data:
+                return 0
+            data = data.replace(b"\0", b"")
+            if data:
+                buffer[: len(data)] = data
+                return len(data)
+
+
+@contextlib.contextmanager
+def read_csv_chunks(
+    source_file: str,
+    names: typing.List[str],
+    dtype: typing.Optional[dict] = None,
+    chunksize: int = 100000,
+    sep: str = ",",
+    encoding: str = "utf-8",
+    quotechar: str = '"',
+) -> typing.Iterator[pd.io.parsers.TextFileReader]:
+    """Opens a headerless delimited file as typed DataFrame chunks.
+
+    A `.gz` file is decompressed as it is read, so no decompressed copy is
+    written to disk. NUL bytes are stripped from the stream before it reaches
+    the parser. Columns missing from `dtype` are read as strings, and empty
+    fields stay "" rather than becoming NaN, matching what `csv.reader`
+    produced.
+    """
+    logging.info(f"Opening source file {source_file}")
+    dtype = {**{name: "str" for name in names}, **(dtype or {})}
+    open_file = gzip.open if str(source_file).endswith(".gz") else open
+    with open_file(source_file, "rb") as raw, pd.read_csv(
+        io.BufferedReader(NulStrippingReader(raw), READ_BUFFER_SIZE),
+        sep=sep,
+        header=None,
+        names=names,
+        dtype=dtype,
+        chunksize=int(chunksize),
+        encoding=encoding,
+        quotechar=quotechar,
+        keep_default_na=False,
+        na_filter=False,
+    ) as reader:
+        yield reader
+
+
+class ChunkWriter:
+    """Streams DataFrame chunks into a single delimited file.
+
+    The file is created (or truncated) and the header written when the first
+    chunk arrives; every later chunk is appended through the same open handle.
+    No file is created if nothing is ever written.
+    """
+
+    def __init__(self, file_path: str, sep: str = "|", encoding: str = "utf-8"):
+        self.file_path = file_path
+        self.sep = sep
+        self.encoding = encoding
+        self.rows_written = 0
+        self._header_written = False
+        self._file = None
+
+    def __enter__(self) -> "ChunkWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, df: pd.DataFrame) -> None:
+        include_header = not self._header_written
+        if self._file is None:
+            logging.info(f"Saving data to target file.. {self.file_path} ...")
+            mode = "w" if include_header else "a"
+            self._file = open(self.file_path, mode, encoding=self.encoding, newline="")
+        df.to_csv(self._file, sep=self.sep, index=False, header=include_header)
+        self._header_written = True
+        self.rows_written += len(df)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            logging.info(f"Wrote {self.rows_written} rows to {self.file_path}")
+
+
+def output_file_path(file_path: str, output_format: str = "CSV") -> str:
+    """Swaps the `.csv` suffix of a target file or GCS path for the output format"""
+    if output_format == "PARQUET":
+        return str(pathlib.PurePosixPath(file_path).with_suffix(".parquet"))
+    return str(file_path)
+
+
+def chunk_writer(
+    file_path: str,
+    output_format: str = "CSV",
+    schema_fields: typing.Optional[typing.List[dict]] = None,
+    sep: str = "|",
+):
+    """Returns the chunk writer for `output_format` (`CSV` or `PARQUET`).
+
+    Parquet output needs the table's `schema_fields` to type its columns.
+    """
+    if output_format == "CSV":
+        return ChunkWriter(file_path, sep=sep)
+    if output_format == "PARQUET":
+        from pdp_transform import parquet
+
+        return parquet.ParquetChunkWriter(file_path, schema_fields)
+    raise ValueError(f"`output_format` must be one of {OUTPUT_FORMATS}")
@@ -0,0 +1,144 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import concurrent.futures
+import functools
+import json
+import logging
+import os
+import pathlib
+import typing
+
+from google.api_core.exceptions import PreconditionFailed
+from google.cloud import storage
+
+# Resumable uploads send the file in chunks of this size; it must be a
+# multiple of 256 KiB.
+UPLOAD_CHUNK_SIZE = 64 * 1024 * 1024
+
+
+@functools.lru_cache(maxsize=None)
+def storage_client() -> storage.Client:
+    """Returns the storage client shared by every helper in this process.
+
+    Like any `storage.Client`, it talks to a local fake GCS server instead
+    when `STORAGE_EMULATOR_HOST` is set.
+    """
+    return storage.Client()
+
+
+def upload_file_to_gcs(
+    file_path: pathlib.Path,
+    target_gcs_bucket: str,
+    target_gcs_path: str,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    client: typing.Optional[storage.Client] = None,
+) -> None:
+    """Uploads a file as a resumable, chunked upload verified with CRC32C"""
+    if os.path.exists(file_path):
+        logging.info(
+            f"Uploading output file to gs://{target_gcs_bucket}/{target_gcs_path}"
+        )
+        client = client or storage_client()
+        blob = client.bucket(target_gcs_bucket).blob(
+            target_gcs_path, chunk_size=chunk_size
+        )
+        blob.upload_from_filename(str(file_path), checksum="crc32c")
+    else:
+        logging.info(
+            f"Cannot upload file to gs://{target_gcs_bucket}/{target_gcs_path} as it does not exist."
+        )
+
+
+def upload_files_to_gcs(
+    uploads: typing.Iterable[typing.Tuple[pathlib.Path, str]],
+    target_gcs_bucket: str,
+    max_workers: int = 4,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    client: typing.Optional[storage.Client] = None,
+) -> None:
+    """Uploads `(file_path, target_gcs_path)` pairs concurrently.
+
+    Every upload shares one client. The first failed upload is raised once
+    the others have finished.
+    """
+    client = client or storage_client()
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(
+                upload_file_to_gcs,
+                file_path,
+                target_gcs_bucket,
+                target_gcs_path,
+                chunk_size=chunk_size,
+                client=client,
+            )
+            for file_path, target_gcs_path in uploads
+        ]
+    for future in futures:
+        future.result()
+
+
+def check_gcs_file_exists(file_path: str, bucket_name: str) -> bool:
+    client = storage_client()
+    bucket = client.bucket(bucket_name)
+    return storage.Blob(bucket=bucket, name=file_path).exists(client)
+
+
+def read_json_from_gcs(bucket_name: str, file_path: str) -> list:
+    bucket = storage_client().get_bucket(bucket_name)
+    blob = bucket.blob(file_path)
+    return json.loads(blob.download_as_bytes(client=None))
+
+
+def write_json_to_gcs(bucket_name: str, file_path: str, data: typing.Any) -> None:
+    blob = storage_client().bucket(bucket_name).blob(file_path)
+    blob.upload_from_string(
+        json.dumps(data, indent=2, sort_keys=True), content_type="application/json"
+    )
+
+
+def update_text_in_gcs(
+    bucket_name: str,
+    file_path: str,
+    update: typing.Callable[[str], str],
+    attempts: int = 10,
+    client: typing.Optional[storage.Client] = None,
+) -> str:
+    """Rewrites a text object in place as `update(current_text)`.
+
+    Each write is conditional on the object's generation being the one that
+    was read (or on the object not existing yet), so concurrent writers never
+    overwrite each other's changes: a writer that loses the race reads the
+    object again and reapplies `update`, up to `attempts` times. Returns the
+    text written.
+    """
+    client = client or storage_client()
+    bucket = client.bucket(bucket_name)
+    for attempt in range(1, attempts + 1):
+        blob = bucket.get_blob(file_path)
+        if blob is None:
+            generation, current = 0, ""
+        else:
+            generation, current = blob.generation, blob.download_as_text()
+        text = update(current)
+        try:
+            bucket.blob(file_path).upload_from_string(
+                text, content_type="text/plain", if_generation_match=generation
+            )
+            return text
+        except PreconditionFailed:
+            if attempt == attempts:
+                raise
+            logging.info(f"gs://{bucket_name}/{file_path} changed, retrying update")
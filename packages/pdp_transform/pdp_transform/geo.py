@@ -0,0 +1,108 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Point geometry columns, built and parsed as whole-column operations.
+
+Points are written as WKT (`POINT(lon lat)`) or GeoJSON, both of which
+BigQuery accepts when loading a GEOGRAPHY column from CSV.
+"""
+
+import logging
+import re
+import typing
+
+import numpy as np
+import pandas as pd
+
+# Matches `POINT(lon lat)` and the `POINT (lon lat)` spelling used by some
+# sources.
+POINT_PATTERN = r"^\s*POINT\s*\(\s*(\S+)\s+(\S+)\s*\)\s*$"
+
+_NULL_COORDINATES = ["", "nan", "none", "<na>"]
+
+
+def _number_text(col: pd.Series) -> pd.Series:
+    # Formatting Python scalars is several times faster than `astype(str)`
+    # and gives the same text.
+    return pd.Series(list(map(str, col.tolist())), index=col.index, dtype=object)
+
+
+def _coordinate(col: pd.Series) -> typing.Tuple[pd.Series, pd.Series, pd.Series]:
+    """Returns a coordinate column as numbers, as text and its null mask."""
+    if pd.api.types.is_numeric_dtype(col):
+        return col.astype(float), _number_text(col), col.isna()
+    text = col.astype(object).where(col.notna(), "").astype(str).str.strip()
+    is_null = text.str.lower().isin(_NULL_COORDINATES)
+    return pd.to_numeric(text.where(~is_null), errors="coerce"), text, is_null
+
+
+def _coordinates(
+    lon: pd.Series, lat: pd.Series, errors: str
+) -> typing.Tuple[pd.Series, pd.Series, pd.Series, pd.Series, np.ndarray]:
+    lon_num, lon_text, lon_null = _coordinate(lon)
+    lat_num, lat_text, lat_null = _coordinate(lat)
+    valid = lon_num.between(-180, 180) & lat_num.between(-90, 90)
+    invalid = ~(lon_null | lat_null) & ~valid
+    if invalid.any():
+        first = invalid.idxmax()
+        if errors == "raise":
+            raise ValueError(
+                f"Invalid point coordinates ({lon_text[first]!r}, {lat_text[first]!r})"
+            )
+        logging.warning(
+            f"Blanked {invalid.sum()} points with invalid coordinates, such as "
+            f"({lon_text[first]!r}, {lat_text[first]!r})"
+        )
+    return lon_num, lon_text, lat_num, lat_text, valid.to_numpy()
+
+
+def point_wkt(lon: pd.Series, lat: pd.Series, errors: str = "raise") -> pd.Series:
+    """Builds `POINT(lon lat)` strings from two coordinate columns.
+
+    Coordinates keep their text as read, so no precision is lost. Rows with a
+    missing coordinate give "". Coordinates that are not numbers, or fall
+    outside [-180, 180] x [-90, 90], raise ValueError, or give "" when
+    `errors` is "coerce".
+    """
+    _, lon_text, _, lat_text, keep = _coordinates(lon, lat, errors)
+    lon_text, lat_text = lon_text.to_numpy(), lat_text.to_numpy()
+    result = np.full(len(keep), "", dtype=object)
+    result[keep] = "POINT(" + lon_text[keep] + " " + lat_text[keep] + ")"
+    return pd.Series(result, index=lon.index, dtype=object)
+
+
+def point_geojson(lon: pd.Series, lat: pd.Series, errors: str = "raise") -> pd.Series:
+    """Builds GeoJSON Point strings from two coordinate columns.
+
+    Missing and invalid coordinates are handled as in `point_wkt`, and
+    coordinates are written as JSON numbers.
+    """
+    lon_num, _, lat_num, _, keep = _coordinates(lon, lat, errors)
+    lon_json = _number_text(lon_num[keep]).to_numpy()
+    lat_json = _number_text(lat_num[keep]).to_numpy()
+    result = np.full(len(keep), "", dtype=object)
+    result[keep] = (
+        '{"type": "Point", "coordinates": [' + lon_json + ", " + lat_json + "]}"
+    )
+    return pd.Series(result, index=lon.index, dtype=object)
+
+
+def parse_point(geom: pd.Series) -> typing.Tuple[pd.Series, pd.Series]:
+    """Splits WKT points into longitude and latitude text columns.
+
+    Values that are not a WKT point give "" for both.
+    """
+    parts = geom.astype(object).where(geom.notna(), "").astype(str)
+    parts = parts.str.extract(POINT_PATTERN, flags=re.IGNORECASE).fillna("")
+    return parts[0].astype(object), parts[1].astype(object)
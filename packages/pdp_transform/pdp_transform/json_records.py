@@ -0,0 +1,127 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Streaming reads of large JSON documents, such as the openFDA bulk files."""
+
+import itertools
+import math
+import typing
+
+import ijson
+import pandas as pd
+
+# The strings `pd.read_csv` reads as NaN by default, for callers that used
+# to round-trip JSON through a CSV file.
+CSV_NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+
+
+def iter_json_records(
+    file_path: str, prefix: str = "results.item"
+) -> typing.Iterator[typing.Any]:
+    """Yields the items at `prefix` without loading the whole document.
+
+    `prefix` uses ijson's notation, where `results.item` is each element of
+    the top-level `results` array.
+    """
+    with open(file_path, "rb") as json_file:
+        yield from ijson.items(json_file, prefix, use_float=True)
+
+
+def get_path(record: typing.Any, path: str, sep: str = ".") -> typing.Any:
+    """Returns the value at a `sep`-joined path of keys, or None if absent."""
+    value = record
+    for key in path.split(sep):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def _rows(
+    records: typing.Iterable[dict],
+    columns: typing.List[str],
+    record_path: typing.Optional[str],
+    stringify_nested: bool,
+    na_values: typing.Container[str],
+) -> typing.Iterator[list]:
+    for record in records:
+        items = [record] if not record_path else record.get(record_path) or []
+        for item in items:
+            row = []
+            for column in columns:
+                value = get_path(item, column)
+                if value is None and item is not record:
+                    value = get_path(record, column)
+                if value is None or (isinstance(value, str) and value in na_values):
+                    value = math.nan
+                elif stringify_nested and isinstance(value, (list, dict)):
+                    value = str(value)
+                row.append(value)
+            yield row
+
+
+def read_json_chunks(
+    file_path: str,
+    columns: typing.List[str],
+    chunksize: int,
+    prefix: str = "results.item",
+    record_path: typing.Optional[str] = None,
+    stringify_nested: bool = False,
+    na_values: typing.Iterable[str] = (),
+) -> typing.Iterator[pd.DataFrame]:
+    """Reads the records at `prefix` as DataFrame chunks of `chunksize` rows.
+
+    Each of `columns` is a dotted path into a record, such as
+    `consumer.age`, and names the column it fills. With `record_path`,
+    each element of that list in a record becomes a row, and columns not
+    found in the element are looked up in the enclosing record, as
+    `pd.json_normalize` does with `record_path` and `meta`. Lists and
+    objects are kept as they are, or written as their `str` when
+    `stringify_nested` is set. Missing values, and strings in `na_values`,
+    are NaN.
+    Only one chunk of rows is in memory at once.
+    """
+    rows = _rows(
+        iter_json_records(file_path, prefix),
+        columns,
+        record_path,
+        stringify_nested,
+        set(na_values),
+    )
+    while True:
+        chunk = list(itertools.islice(rows, chunksize))
+        if not chunk:
+            return
+        yield pd.DataFrame(chunk, columns=columns)
@@ -0,0 +1,147 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Records what was last loaded from each source so unchanged periods can be
+skipped.
+
+The manifest is a small JSON object in GCS that maps each source URL to the
+fingerprint of the copy that was last loaded: its ETag, Last-Modified time and
+size where the server reports them, plus an MD5 of the downloaded file.
+"""
+
+import ftplib
+import hashlib
+import json
+import logging
+import os
+import threading
+import typing
+
+import requests
+from pdp_transform import gcs
+
+HASH_BUFFER_SIZE = 1 << 20
+
+
+def http_fingerprint(source_url: str) -> dict:
+    try:
+        r = requests.head(source_url, allow_redirects=True, timeout=60)
+    except requests.exceptions.RequestException as e:
+        logging.info(f"Unable to fingerprint {source_url}: {e}")
+        return {}
+    if r.status_code != 200:
+        return {}
+    fingerprint = {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "size": r.headers.get("Content-Length"),
+    }
+    return {key: value for key, value in fingerprint.items() if value}
+
+
+def ftp_fingerprint(ftp_host: str, ftp_dir: str, ftp_filename: str) -> dict:
+    try:
+        with ftplib.FTP(ftp_host, timeout=60) as ftp_conn:
+            ftp_conn.login("", "")
+            ftp_conn.cwd(ftp_dir)
+            # Many servers only answer SIZE in binary mode
+            ftp_conn.voidcmd("TYPE I")
+            size = ftp_conn.size(ftp_filename)
+            last_modified = ftp_conn.sendcmd(f"MDTM {ftp_filename}").split()[-1]
+    except ftplib.all_errors as e:
+        logging.info(f"Unable to fingerprint {ftp_filename} on {ftp_host}: {e}")
+        return {}
+    return {"last_modified": last_modified, "size": str(size)}
+
+
+def file_md5(file_path: str) -> str:
+    md5 = hashlib.md5()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            md5.update(block)
+    return md5.hexdigest()
+
+
+class SourceManifest:
+    """Fingerprints of the source files last loaded by a pipeline.
+
+    `files.download_file` and `files.download_file_ftp` take a manifest and
+    skip sources whose fingerprint has not changed. A new fingerprint is only
+    staged by the download; call `commit` once the data is loaded so a failed
+    load is retried on the next run.
+    """
+
+    def __init__(
+        self,
+        bucket_name: str,
+        manifest_path: str,
+        entries: typing.Optional[dict] = None,
+    ):
+        self.bucket_name = bucket_name
+        self.manifest_path = manifest_path
+        self.entries = entries or {}
+        self.pending = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, bucket_name: str, manifest_path: str) -> "SourceManifest":
+        if gcs.check_gcs_file_exists(manifest_path, bucket_name):
+            entries = gcs.read_json_from_gcs(bucket_name, manifest_path)
+        else:
+            logging.info(f"No manifest at gs://{bucket_name}/{manifest_path} yet")
+            entries = {}
+        return cls(bucket_name, manifest_path, entries)
+
+    def unchanged(self, source_url: str, fingerprint: dict) -> bool:
+        """Whether every field of `fingerprint` matches the last loaded copy"""
+        entry = self.entries.get(source_url)
+        if not fingerprint or entry is None:
+            return False
+        return all(entry.get(key) == value for key, value in fingerprint.items())
+
+    def stage(self, source_url: str, fingerprint: dict, local_file: str) -> bool:
+        """Stages the fingerprint of a fresh download of `source_url`.
+
+        Returns False if the file is byte-for-byte the one last loaded, in
+        which case its new metadata is committed straight away and
+        `local_file` is removed, as there is nothing to load from it.
+        """
+        fingerprint = {**fingerprint, "md5": file_md5(local_file)}
+        with self._lock:
+            self.pending[source_url] = fingerprint
+        if self.unchanged(source_url, {"md5": fingerprint["md5"]}):
+            logging.info(f"{source_url} content is unchanged since the last load")
+            self.commit(source_url)
+            os.remove(local_file)
+            return False
+        return True
+
+    def commit(self, source_url: str) -> None:
+        """Records the staged fingerprint of `source_url` as loaded.
+
+        Only this URL's entry is merged into the manifest in GCS, with a
+        conditional read-modify-write, so tasks committing other URLs of the
+        same manifest never overwrite each other's entries.
+        """
+        with self._lock:
+            if source_url not in self.pending:
+                return
+            entry = self.entries[source_url] = self.pending.pop(source_url)
+
+        def merge_entry(text: str) -> str:
+            entries = json.loads(text) if text.strip() else {}
+            entries[source_url] = entry
+            return json.dumps(entries, indent=2, sort_keys=True)
+
+        gcs.update_text_in_gcs(self.bucket_name, self.manifest_path, merge_entry)
@@ -0,0 +1,145 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Helpers that overlap the stages of a load without changing its output order."""
+
+import collections
+import concurrent.futures
+import multiprocessing
+import typing
+
+
+def map_ordered(
+    func: typing.Callable,
+    items: typing.Iterable,
+    workers: int = 1,
+    max_in_flight: typing.Optional[int] = None,
+) -> typing.Iterator:
+    """Yields `func(item)` for every item, in the order of `items`.
+
+    With more than one worker the calls run on a `ProcessPoolExecutor`. At most
+    `max_in_flight` items (by default one more than `workers`) are read ahead
+    of the result being yielded, so memory stays bounded by a few chunks no
+    matter how large the source file is. `func` and the items must be
+    picklable, i.e. module-level functions (or partials of them) and plain
+    data or DataFrames.
+    """
+    if workers <= 1:
+        for item in items:
+            yield func(item)
+        return
+
+    max_in_flight = max_in_flight or workers + 1
+    # Workers come from a forkserver rather than a plain fork, which is unsafe
+    # while other threads (e.g. `run_pipelined` stages) hold locks.
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("forkserver")
+    ) as executor:
+        in_flight = collections.deque()
+        for item in items:
+            in_flight.append(executor.submit(func, item))
+            if len(in_flight) >= max_in_flight:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def run_pipelined(
+    periods: typing.Iterable,
+    stages: typing.Sequence[typing.Callable],
+    max_in_flight: int = 1,
+) -> typing.List:
+    """Runs every period through `stages`, overlapping consecutive periods.
+
+    Each stage gets its own single-thread executor and passes its return value
+    to the next stage, so period N+1 can download while period N transforms
+    and period N-1 loads, yet each stage still sees the periods in order. A
+    stage that returns `None` ends its period early, e.g. when the data is
+    already loaded or not published yet. At most `max_in_flight` periods are
+    started but not finished, which bounds the local disk they use;
+    `max_in_flight=1` runs the periods strictly one after another.
+
+    Returns the result of the last stage for every period.
+    """
+    executors = [concurrent.futures.ThreadPoolExecutor(max_workers=1) for _ in stages]
+    results = []
+    try:
+        in_flight = collections.deque()
+        for period in periods:
+            future = executors[0].submit(stages[0], period)
+            for executor, stage in zip(executors[1:], stages[1:]):
+                future = executor.submit(_run_after, future, stage)
+            in_flight.append(future)
+            if len(in_flight) >= max_in_flight:
+                results.append(in_flight.popleft().result())
+        while in_flight:
+            results.append(in_flight.popleft().result())
+    finally:
+        for executor in executors:
+            executor.shutdown(wait=True)
+    return results
+
+
+def run_in_batches(
+    func: typing.Callable,
+    items: typing.Iterable,
+    on_batch: typing.Callable[[typing.List], None],
+    batch_size: int,
+    workers: int = 1,
+) -> None:
+    """Runs `func(item)` for every item on a thread pool and passes the results
+    to `on_batch` in batches of `batch_size`, in the order they complete.
+
+    When a call fails, the items not started yet are cancelled and the running
+    ones are left to finish. Once the pool has drained, every result that did
+    complete goes to `on_batch` before the error is raised, so the caller can
+    record the work that succeeded, e.g. the files already copied.
+    """
+    futures = []
+    reported = set()
+    batch = []
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(func, item) for item in items]
+            try:
+                for future in concurrent.futures.as_completed(futures):
+                    batch.append(future.result())
+                    reported.add(future)
+                    if len(batch) >= batch_size:
+                        on_batch(batch)
+                        batch = []
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+    finally:
+        batch += [
+            future.result()
+            for future in futures
+            if future not in reported
+            and future.done()
+            and not future.cancelled()
+            and future.exception() is None
+        ]
+        if batch:
+            on_batch(batch)
+
+
+def _run_after(
+    previous: concurrent.futures.Future, stage: typing.Callable
+) -> typing.Any:
+    value = previous.result()
+    if value is None:
+        return None
+    return stage(value)
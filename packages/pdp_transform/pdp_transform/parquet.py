@@ -0,0 +1,186 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Parquet output for BigQuery loads, typed from a table's schema JSON."""
+
+import decimal
+import logging
+import typing
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+BOOLEAN_VALUES = {
+    "true": True,
+    "false": False,
+    "t": True,
+    "f": False,
+    "1": True,
+    "0": False,
+}
+
+
+def bigquery_field_to_arrow_type(field_type: str) -> pa.DataType:
+    return {
+        "STRING": pa.string(),
+        "INTEGER": pa.int64(),
+        "INT64": pa.int64(),
+        "FLOAT": pa.float64(),
+        "FLOAT64": pa.float64(),
+        "NUMERIC": pa.decimal128(38, 9),
+        "BIGNUMERIC": pa.decimal256(76, 38),
+        "BOOLEAN": pa.bool_(),
+        "BOOL": pa.bool_(),
+        "DATE": pa.date32(),
+        "DATETIME": pa.timestamp("us"),
+        "TIMESTAMP": pa.timestamp("us", tz="UTC"),
+        "TIME": pa.time64("us"),
+    }.get(field_type.upper(), pa.string())
+
+
+def bigquery_to_arrow_schema(schema_fields: typing.List[dict]) -> pa.Schema:
+    return pa.schema(
+        [
+            pa.field(
+                field["name"],
+                bigquery_field_to_arrow_type(field["type"]),
+                nullable=(field.get("mode", "NULLABLE").upper() != "REQUIRED"),
+            )
+            for field in schema_fields
+        ]
+    )
+
+
+# Wide enough for any BIGNUMERIC value, rounding like BigQuery does on load
+DECIMAL_CONTEXT = decimal.Context(prec=100, rounding=decimal.ROUND_HALF_UP)
+
+
+def to_decimal(value: typing.Any, scale: int) -> typing.Optional[decimal.Decimal]:
+    """Parses a CSV-style value exactly, rounded to `scale` fractional digits.
+
+    Empty, non-numeric and non-finite values give None.
+    """
+    if value is None or pd.isna(value):
+        return None
+    try:
+        parsed = decimal.Decimal(str(value).strip())
+    except decimal.InvalidOperation:
+        return None
+    if not parsed.is_finite():
+        return None
+    return DECIMAL_CONTEXT.quantize(parsed, decimal.Decimal(1).scaleb(-scale))
+
+
+def to_arrow_array(
+    col: pd.Series, arrow_type: pa.DataType, name: typing.Optional[str] = None
+) -> pa.Array:
+    """Converts a column of CSV-style values to `arrow_type`.
+
+    Empty values become nulls. Values that cannot be converted raise
+    ValueError naming the column and a few of them, as a CSV load would fail
+    on them rather than load them as nulls. Decimals are parsed from the text
+    itself, so they stay exact, and values too large for the column's
+    precision raise ArrowInvalid.
+    """
+    values = _convert(col.replace("", None), arrow_type)
+    is_blank = col.isna() | (col.astype(str).str.strip() == "")
+    unconverted = col[~is_blank.to_numpy() & values.is_null().to_numpy(False)]
+    if len(unconverted):
+        raise ValueError(
+            f"{len(unconverted)} values of column `{name or col.name}` are not "
+            f"valid {arrow_type}, such as {unconverted.head(5).tolist()}"
+        )
+    return values
+
+
+def _convert(col: pd.Series, arrow_type: pa.DataType) -> pa.Array:
+    """Converts a column, giving nulls for values that cannot be converted"""
+    if pa.types.is_integer(arrow_type):
+        return pa.array(pd.to_numeric(col, errors="coerce").astype("Int64"))
+    if pa.types.is_floating(arrow_type):
+        return pa.array(pd.to_numeric(col, errors="coerce"), type=arrow_type)
+    if pa.types.is_decimal(arrow_type):
+        values = [to_decimal(value, arrow_type.scale) for value in col]
+        return pa.array(values, type=arrow_type)
+    if pa.types.is_boolean(arrow_type):
+        values = col.astype("string").str.strip().str.lower().map(BOOLEAN_VALUES)
+        return pa.array(values.astype("boolean"))
+    if pa.types.is_date(arrow_type):
+        values = pd.to_datetime(col, errors="coerce")
+        return pa.array(values.dt.date, type=arrow_type, from_pandas=True)
+    if pa.types.is_timestamp(arrow_type):
+        values = pd.to_datetime(col, errors="coerce", utc=arrow_type.tz is not None)
+        return pa.array(values, type=arrow_type, from_pandas=True)
+    if pa.types.is_time(arrow_type):
+        values = pd.to_datetime(
+            col.astype("string"), format="%H:%M:%S", errors="coerce"
+        )
+        return pa.array(values.dt.time, type=arrow_type, from_pandas=True)
+    return pa.array(col.astype("string"), type=arrow_type)
+
+
+def dataframe_to_table(df: pd.DataFrame, schema: pa.Schema) -> pa.Table:
+    """Builds a table matching `schema` from `df`.
+
+    Columns are matched by position, the same way a CSV load matches them, so
+    `df` must already be in the order of the table's schema.
+    """
+    if len(df.columns) != len(schema):
+        raise ValueError(
+            f"Expected {len(schema)} columns to match the table schema, got {len(df.columns)}"
+        )
+    arrays = [
+        to_arrow_array(df.iloc[:, i], field.type, field.name)
+        for i, field in enumerate(schema)
+    ]
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+class ParquetChunkWriter:
+    """Streams DataFrame chunks into a single Parquet file, one row group each."""
+
+    def __init__(
+        self,
+        file_path: str,
+        schema_fields: typing.List[dict],
+        compression: str = "snappy",
+    ):
+        self.file_path = file_path
+        self.schema = bigquery_to_arrow_schema(schema_fields)
+        self.compression = compression
+        self.rows_written = 0
+        self._writer = None
+
+    def __enter__(self) -> "ParquetChunkWriter":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self._writer is None:
+            logging.info(f"Saving data to target file.. {self.file_path} ...")
+            self._writer = pq.ParquetWriter(
+                str(self.file_path), self.schema, compression=self.compression
+            )
+        self._writer.write_table(dataframe_to_table(df, self.schema))
+        self.rows_written += len(df)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            logging.info(f"Wrote {self.rows_written} rows to {self.file_path}")
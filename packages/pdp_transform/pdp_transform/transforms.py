@@ -0,0 +1,286 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Column transforms shared by the `run_csv_transform_kub` images.
+
+Every transform takes a DataFrame plus the value of one of the JSON env vars
+that pipelines already declare in `pipeline.yaml` (`RENAME_HEADERS_LIST`,
+`SLICE_COLUMN_LIST`, ...) and runs as a whole-column pandas operation.
+"""
+
+import datetime
+import logging
+import typing
+import warnings
+
+import pandas as pd
+from pdp_transform import geo
+
+
+def rename_headers(df: pd.DataFrame, rename_headers_list: dict) -> pd.DataFrame:
+    logging.info("Renaming headers..")
+    return df.rename(columns=rename_headers_list)
+
+
+def lowercase_headers(df: pd.DataFrame, _: typing.Any = None) -> pd.DataFrame:
+    df.columns = df.columns.str.lower()
+    return df
+
+
+def reorder_headers(
+    df: pd.DataFrame, reorder_headers_list: typing.List[str]
+) -> pd.DataFrame:
+    logging.info("Reordering headers..")
+    return df[reorder_headers_list]
+
+
+def set_df_datatypes(df: pd.DataFrame, data_dtypes: dict) -> pd.DataFrame:
+    logging.info("Setting data types")
+    return df.astype(data_dtypes)
+
+
+def filter_null_rows(
+    df: pd.DataFrame, null_rows_list: typing.List[str]
+) -> pd.DataFrame:
+    logging.info("Removing rows with blank id's..")
+    mask = pd.Series(True, index=df.index)
+    for fld in null_rows_list:
+        mask &= df[fld].notna() & (df[fld] != "")
+    return df[mask]
+
+
+def strip_whitespace(df: pd.DataFrame, strip_list: typing.List[str]) -> pd.DataFrame:
+    logging.info("Stripping whitespace..")
+    for fld in strip_list:
+        df[fld] = df[fld].astype("string").str.strip()
+    return df
+
+
+def slice_column(df: pd.DataFrame, slice_column_list: dict) -> pd.DataFrame:
+    """Extracts fixed-width fields.
+
+    `slice_column_list` maps each destination column to `[source_column,
+    start_pos, end_pos]`, where an empty `end_pos` slices to the end of the
+    value. Sliced values are stripped of surrounding whitespace.
+    """
+    logging.info("Extracting column data..")
+    for dest_col, (src_col, start_pos, end_pos) in slice_column_list.items():
+        df[dest_col] = (
+            df[src_col]
+            .astype(str)
+            .str.slice(int(start_pos), int(end_pos) if end_pos != "" else None)
+            .str.strip()
+        )
+    return df
+
+
+# Values treated as missing by the datetime helpers, compared case-insensitively.
+NULL_DATETIME_VALUES = ["", "nan", "nat"]
+
+
+def _datetime_text(
+    col: pd.Series, null_values: typing.Iterable[str] = ()
+) -> typing.Tuple[pd.Series, pd.Series]:
+    text = col.where(col.notna(), "").astype(str)
+    nulls = NULL_DATETIME_VALUES + [value.lower() for value in null_values]
+    return text, text.str.lower().isin(nulls)
+
+
+def _parse_each(text: pd.Series) -> pd.Series:
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", UserWarning)
+        return pd.to_datetime(text.map(lambda x: pd.to_datetime(x, errors="coerce")))
+
+
+def parse_datetime(
+    col: pd.Series,
+    input_formats: typing.Union[str, typing.List[typing.Optional[str]]],
+    null_values: typing.Iterable[str] = (),
+    errors: str = "raise",
+) -> pd.Series:
+    """Parses a column that may mix several datetime layouts.
+
+    Each of `input_formats` is tried in turn with one `pd.to_datetime` pass
+    over the rows no earlier format matched. A `None` format parses whatever
+    is left with pandas' format inference, for sources whose layout is not
+    known up front: in one pass in the layout inferred from the first value,
+    then value by value for the rows in other layouts. Blank values ("", "nan", "nat" and any of
+    `null_values`) give NaT. Values matching no format raise ValueError, or
+    give NaT when `errors` is "coerce".
+    """
+    if isinstance(input_formats, str):
+        input_formats = [input_formats]
+    text, is_null = _datetime_text(col, null_values)
+    parsed = pd.Series(pd.NaT, index=col.index, dtype="datetime64[ns]")
+    pending = ~is_null
+    for input_format in input_formats:
+        if not pending.any():
+            break
+        if input_format is None:
+            # One vectorized pass in the layout pandas infers from the first
+            # value, then value by value for whatever is in another layout
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", UserWarning)
+                parsed[pending] = pd.to_datetime(text[pending], errors="coerce")
+            pending &= parsed.isna()
+            if pending.any():
+                parsed[pending] = _parse_each(text[pending])
+        else:
+            values = pd.to_datetime(text[pending], format=input_format, errors="coerce")
+            parsed[pending] = values
+        pending &= parsed.isna()
+    if pending.any() and errors == "raise":
+        raise ValueError(
+            f"time data {text[pending].iloc[0]!r} does not match any of {input_formats}"
+        )
+    return parsed
+
+
+def normalize_datetime(
+    col: pd.Series,
+    input_formats: typing.Union[str, typing.List[typing.Optional[str]]],
+    output_format: str = "%Y-%m-%d %H:%M:%S",
+    null_values: typing.Iterable[str] = (),
+    errors: str = "raise",
+) -> pd.Series:
+    """Rewrites a column as datetime strings in `output_format`.
+
+    Parsing follows `parse_datetime`. Blank and, with `errors="coerce"`,
+    unparseable values come out as empty strings.
+    """
+    parsed = parse_datetime(col, input_formats, null_values, errors)
+    return parsed.dt.strftime(output_format).fillna("").astype(object)
+
+
+def normalize_datetimes(df: pd.DataFrame, datetime_format_list: dict) -> pd.DataFrame:
+    """Normalizes datetime columns.
+
+    `datetime_format_list` maps each column to `[input_formats,
+    output_format]`, where `input_formats` is one format or a list of
+    candidates tried in order.
+    """
+    logging.info("Normalizing datetimes..")
+    for fld, (input_formats, output_format) in datetime_format_list.items():
+        df[fld] = normalize_datetime(df[fld], input_formats, output_format)
+    return df
+
+
+def convert_date_format(df: pd.DataFrame, date_format_list: dict) -> pd.DataFrame:
+    """Reformats date strings.
+
+    `date_format_list` maps each column to `[input_format, output_format]`.
+    Empty and "nan" values are passed through unchanged.
+    """
+    logging.info("Converting Date Format..")
+    for fld, (input_format, output_format) in date_format_list.items():
+        col = df[fld]
+        has_value = ~_datetime_text(col)[1]
+        if not has_value.any():
+            continue
+        converted = parse_datetime(col[has_value], input_format).dt.strftime(
+            output_format
+        )
+        df[fld] = col.astype(object)
+        df.loc[has_value, fld] = converted
+    return df
+
+
+def convert_date_from_int(df: pd.DataFrame, int_date_list: dict) -> pd.DataFrame:
+    logging.info("Converting dates from integers")
+    for dt_col, dt_int_col in int_date_list.items():
+        df[dt_col] = (
+            pd.to_datetime(df[dt_int_col].astype("string"), format="%Y%m%d")
+            .dt.strftime("%Y-%m-%d")
+            .astype("string")
+            + " 00:00:00"
+        )
+    return df
+
+
+def apply_regex(df: pd.DataFrame, regex_list: dict) -> pd.DataFrame:
+    """Replaces values matching a pattern.
+
+    `regex_list` maps each column to `[expression, replacement, is_regex]`,
+    where `is_regex` is the string "True" or "False".
+    """
+    logging.info("Applying RegEx")
+    for fld, (regex_expr, replace_expr, is_regex) in regex_list.items():
+        df[fld] = df[fld].replace(regex_expr, replace_expr, regex=(is_regex == "True"))
+    return df
+
+
+def generate_location(
+    df: pd.DataFrame, gen_location_list: dict, errors: str = "raise"
+) -> pd.DataFrame:
+    """Builds point geometry columns.
+
+    `gen_location_list` maps each destination column to `[longitude_column,
+    latitude_column]`, optionally followed by "GEOJSON" to write GeoJSON
+    instead of WKT. Invalid coordinates raise ValueError, or give "" when
+    `errors` is "coerce".
+    """
+    logging.info("Generating location data")
+    for dest_col, (lon_col, lat_col, *geo_format) in gen_location_list.items():
+        build = geo.point_geojson if geo_format == ["GEOJSON"] else geo.point_wkt
+        df[dest_col] = build(df[lon_col], df[lat_col], errors=errors)
+    return df
+
+
+def add_metadata_cols(df: pd.DataFrame, source_url: str) -> pd.DataFrame:
+    logging.info("Adding metadata columns")
+    df["source_url"] = source_url
+    df["etl_timestamp"] = pd.Timestamp(datetime.datetime.now())
+    return df
+
+
+# Maps each transform name usable in a pipeline's `TRANSFORM_LIST` to the
+# function and the keyword argument of `apply_transforms` it is called with.
+TRANSFORMS = {
+    "rename_headers": (rename_headers, "rename_headers_list"),
+    "lowercase_headers": (lowercase_headers, None),
+    "reorder_headers": (reorder_headers, "reorder_headers_list"),
+    "set_df_datatypes": (set_df_datatypes, "data_dtypes"),
+    "filter_null_rows": (filter_null_rows, "null_rows_list"),
+    "strip_whitespace": (strip_whitespace, "strip_list"),
+    "slice_column": (slice_column, "slice_column_list"),
+    "convert_date_format": (convert_date_format, "date_format_list"),
+    "normalize_datetimes": (normalize_datetimes, "datetime_format_list"),
+    "convert_date_from_int": (convert_date_from_int, "int_date_list"),
+    "apply_regex": (apply_regex, "regex_list"),
+    "generate_location": (generate_location, "gen_location_list"),
+    "add_metadata_cols": (add_metadata_cols, "source_url"),
+}
+
+
+def apply_transforms(
+    df: pd.DataFrame,
+    transform_list: typing.List[str],
+    transforms: typing.Optional[dict] = None,
+    **params: typing.Any,
+) -> pd.DataFrame:
+    """Runs the named transforms over `df` in the order given.
+
+    `params` holds the argument of each transform, keyed as in `TRANSFORMS`.
+    Images may pass their own `transforms` mapping to add dataset-specific
+    steps on top of the shared ones.
+    """
+    transforms = transforms or TRANSFORMS
+    for name in transform_list:
+        if name not in transforms:
+            raise ValueError(
+                f"Unknown transform `{name}`. Must be one of {list(transforms.keys())}"
+            )
+        func, param = transforms[name]
+        df = func(df, params[param]) if param else func(df)
+    return df
@@ -0,0 +1,31 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import setuptools
+
+setuptools.setup(
+    name="pdp-transform",
+    version="0.1.0",
+    description="Shared transform and load helpers for public datasets pipeline images.",
+    packages=setuptools.find_packages(),
+    python_requires=">=3.8",
+    install_requires=[
+        "google-cloud-bigquery",
+        "google-cloud-storage",
+        "pandas",
+        "requests",
+    ],
+    extras_require={"json": ["ijson"], "parquet": ["pyarrow"]},
+)
@@ -14,12 +14,17 @@
 
 
 import argparse
+import base64
+import concurrent.futures
+import functools
+import hashlib
 import json
 import pathlib
 import subprocess
 import typing
 
 import click
+from google.cloud import storage
 from google.cloud.orchestration.airflow import service_v1beta1
 from ruamel import yaml
 
@@ -30,6 +35,13 @@ PROJECT_ROOT = CURRENT_PATH.parent
 DATASETS_PATH = PROJECT_ROOT / "datasets"
 DEFAULT_AIRFLOW_VERSION = 2
 
+# Uploads share one storage client, whose HTTP session keeps up to 10
+# connections alive, so more workers than that would not help
+DEFAULT_UPLOAD_WORKERS = 8
+
+# A file to upload and the name of its object in the Composer bucket
+Upload = typing.Tuple[pathlib.Path, str]
+
 
 class IncompatibilityError(Exception):
     pass
@@ -42,6 +54,7 @@ def main(
     composer_bucket: typing.Union[str, None],
     composer_region: str,
     pipeline: typing.Union[str, None],
+    max_workers: int = DEFAULT_UPLOAD_WORKERS,
 ):
     if composer_bucket is None:
         composer_bucket = get_composer_bucket(composer_env, composer_region)
@@ -59,6 +72,9 @@ def main(
 
     runtime_airflow_version = composer_airflow_version(composer_env, composer_region)
 
+    # Every pipeline is checked before anything is uploaded, and the files of
+    # all of them go up in a single batch
+    uploads: typing.List[Upload] = []
     for pipeline_path in pipelines:
         check_airflow_version_compatibility(pipeline_path, runtime_airflow_version)
 
@@ -67,38 +83,49 @@ def main(
         )
 
         if data_folder.exists() and data_folder.is_dir() and any(data_folder.iterdir()):
-            copy_data_folder_to_composer_bucket(
+            uploads.extend(
+                copy_data_folder_to_composer_bucket(
+                    dataset_id,
+                    data_folder,
+                    pipeline_path.name,
+                    composer_bucket,
+                )
+            )
+
+        uploads.extend(
+            copy_custom_callables_to_airflow_dags_folder(
+                env_path,
                 dataset_id,
-                data_folder,
                 pipeline_path.name,
                 composer_bucket,
             )
-
-        copy_custom_callables_to_airflow_dags_folder(
-            env_path,
-            dataset_id,
-            pipeline_path.name,
-            composer_bucket,
         )
 
-        copy_generated_dag_to_airflow_dags_folder(
-            env_path,
-            dataset_id,
-            pipeline_path.name,
-            composer_bucket,
+        uploads.extend(
+            copy_generated_dag_to_airflow_dags_folder(
+                env_path,
+                dataset_id,
+                pipeline_path.name,
+                composer_bucket,
+            )
         )
 
+    upload_to_composer_bucket(uploads, composer_bucket, max_workers)
+
 
+@functools.lru_cache(maxsize=None)
 def get_gcp_project() -> str:
     return subprocess.run(
         ["gcloud", "config", "get-value", "project"], text=True, capture_output=True
     ).stdout.strip()
 
 
-def get_composer_bucket(
-    composer_env: str,
-    composer_region: str,
-) -> str:
+@functools.lru_cache(maxsize=None)
+def get_composer_environment(
+    composer_env: str, composer_region: str
+) -> service_v1beta1.Environment:
+    """Fetches the Composer environment once per run, for both its bucket and
+    its Airflow version"""
     project_id = get_gcp_project()
 
     # Create a client
@@ -110,7 +137,14 @@ def get_composer_bucket(
     )
 
     # Make the request
-    response = client.get_environment(request=request)
+    return client.get_environment(request=request)
+
+
+def get_composer_bucket(
+    composer_env: str,
+    composer_region: str,
+) -> str:
+    response = get_composer_environment(composer_env, composer_region)
 
     # Handle the response
     composer_bucket = response.config.dag_gcs_prefix.replace("/dags", "").replace(
@@ -119,8 +153,71 @@ def get_composer_bucket(
     return composer_bucket
 
 
-def run_gsutil_cmd(args: typing.List[str], cwd: pathlib.Path):
-    subprocess.check_call(["gsutil"] + args, cwd=cwd)
+@functools.lru_cache(maxsize=None)
+def storage_client() -> storage.Client:
+    """Returns the storage client shared by every upload of the run.
+
+    Like any `storage.Client`, it talks to a local fake GCS server instead
+    when `STORAGE_EMULATOR_HOST` is set.
+    """
+    return storage.Client()
+
+
+def file_md5(file_path: pathlib.Path) -> str:
+    """Returns the MD5 of a file encoded like a blob's `md5_hash`"""
+    return base64.b64encode(hashlib.md5(file_path.read_bytes()).digest()).decode()
+
+
+def remote_md5_hashes(
+    bucket: storage.Bucket, blob_names: typing.Iterable[str]
+) -> typing.Dict[str, str]:
+    """Lists the MD5 of existing blobs, one listing per folder rather than one
+    request per blob. Composite objects have no MD5 and are left out."""
+    folders = {blob_name.rpartition("/")[0] + "/" for blob_name in blob_names}
+    md5_hashes = {}
+    for folder in sorted(folders):
+        for blob in bucket.list_blobs(prefix=folder, delimiter="/"):
+            if blob.md5_hash:
+                md5_hashes[blob.name] = blob.md5_hash
+    return md5_hashes
+
+
+def upload_to_composer_bucket(
+    uploads: typing.List[Upload],
+    composer_bucket: str,
+    max_workers: int = DEFAULT_UPLOAD_WORKERS,
+    client: typing.Optional[storage.Client] = None,
+) -> typing.List[str]:
+    """Uploads files to the Composer bucket concurrently, skipping those whose
+    MD5 matches the blob already there. Returns the names of the uploaded
+    blobs. The first failed upload is raised once the others have finished.
+    """
+    if not uploads:
+        return []
+
+    bucket = (client or storage_client()).bucket(composer_bucket)
+    remote_md5 = remote_md5_hashes(bucket, [blob_name for _, blob_name in uploads])
+    changed = [
+        (file_path, blob_name)
+        for file_path, blob_name in uploads
+        if remote_md5.get(blob_name) != file_md5(file_path)
+    ]
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [
+            executor.submit(bucket.blob(blob_name).upload_from_filename, str(file_path))
+            for file_path, blob_name in changed
+        ]
+    for future in futures:
+        future.result()
+
+    print(
+        f"\nUploaded {len(changed)} files to gs://{composer_bucket}, "
+        f"skipped {len(uploads) - len(changed)} unchanged ones:"
+    )
+    for _, blob_name in changed:
+        print(f"  - gs://{composer_bucket}/{blob_name}")
+    return [blob_name for _, blob_name in changed]
 
 
 def check_and_configure_airflow_variables(
@@ -301,16 +398,26 @@ def copy_data_folder_to_composer_bucket(
     data_folder: pathlib.Path,
     pipeline: str,
     composer_bucket: str,
-):
+) -> typing.List[Upload]:
+    """Returns the uploads copying the contents of the data folder to
+
+    gs://{COMPOSER_BUCKET}/data/{DATASET_ID}/{PIPELINE}
+    """
     print(
         f"Data folder exists: {data_folder}.\nCopying contents into Composer bucket.."
     )
-    gcs_uri = f"gs://{composer_bucket}/data/{dataset_id}/{pipeline}"
-    run_gsutil_cmd(["-q", "cp", "-r", f"{data_folder}/*", gcs_uri], data_folder)
+    prefix = f"data/{dataset_id}/{pipeline}"
+    return folder_uploads(data_folder, prefix)
 
-    print("Done. Files uploaded to GCS:")
-    for file in data_folder.iterdir():
-        print(f"  - {gcs_uri}/{file.name}")
+
+def folder_uploads(folder: pathlib.Path, prefix: str) -> typing.List[Upload]:
+    """Returns the uploads copying every file under `folder` to `prefix`,
+    like `gsutil cp -r`, but without Python bytecode caches"""
+    return [
+        (file, f"{prefix}/{file.relative_to(folder).as_posix()}")
+        for file in sorted(folder.rglob("*"))
+        if file.is_file() and "__pycache__" not in file.parts
+    ]
 
 
 def run_cloud_composer_vars_import(
@@ -358,7 +465,9 @@ def import_variables_to_cloud_composer(
         f"  Source:\n  {cwd / filename}\n\n"
         f"  Destination:\n  {gcs_uri}\n"
     )
-    run_gsutil_cmd(["cp", filename, gcs_uri], cwd=cwd)
+    upload_to_composer_bucket(
+        [(cwd / filename, f"data/variables/{filename}")], composer_bucket
+    )
 
     print(f"\nImporting Airflow variables from {gcs_uri} ({airflow_path})...\n")
     run_cloud_composer_vars_import(composer_env, composer_region, airflow_path, cwd=cwd)
@@ -369,9 +478,9 @@ def copy_generated_dag_to_airflow_dags_folder(
     dataset_id: str,
     pipeline_id: str,
     composer_bucket: str,
-):
+) -> typing.List[Upload]:
     """
-    Runs the command
+    Returns the upload equivalent to the command
 
         gsutil cp {PIPELINE_ID}_dag.py gs://{COMPOSER_BUCKET}/dags/{DATASET_ID}__{PIPELINE_ID}_dag.py
 
@@ -386,7 +495,7 @@ def copy_generated_dag_to_airflow_dags_folder(
         f"  Source:\n  {cwd / filename}\n\n"
         f"  Destination:\n  {target}\n"
     )
-    run_gsutil_cmd(["cp", filename, target], cwd=cwd)
+    return [(cwd / filename, f"dags/{dataset_id}__{pipeline_id}_dag.py")]
 
 
 def copy_custom_callables_to_airflow_dags_folder(
@@ -394,9 +503,9 @@ def copy_custom_callables_to_airflow_dags_folder(
     dataset_id: str,
     pipeline_id: str,
     composer_bucket: str,
-):
+) -> typing.List[Upload]:
     """
-    Runs the command
+    Returns the uploads equivalent to the command
 
         gsutil cp -r custom gs://$COMPOSER_BUCKET/dags/$DATASET/$PIPELINE_ID/
 
@@ -405,7 +514,7 @@ def copy_custom_callables_to_airflow_dags_folder(
     cwd = env_path / "datasets" / dataset_id / "pipelines" / pipeline_id
 
     if not (cwd / "custom").exists():
-        return
+        return []
 
     target = f"gs://{composer_bucket}/dags/{dataset_id}/{pipeline_id}/"
     print(
@@ -413,7 +522,7 @@ def copy_custom_callables_to_airflow_dags_folder(
         f"  Source:\n  {cwd / 'custom'}\n\n"
         f"  Destination:\n  {target}\n"
     )
-    run_gsutil_cmd(["-m", "cp", "-r", "custom", target], cwd=cwd)
+    return folder_uploads(cwd / "custom", f"dags/{dataset_id}/{pipeline_id}/custom")
 
 
 def check_existence_of_variables_file(file_path: pathlib.Path):
@@ -430,25 +539,10 @@ def list_subdirs(path: pathlib.Path) -> typing.List[pathlib.Path]:
 def composer_airflow_version(
     composer_env: str, composer_region: str
 ) -> typing.Literal[1, 2]:
-    config = json.loads(
-        subprocess.run(
-            [
-                "gcloud",
-                "composer",
-                "environments",
-                "describe",
-                composer_env,
-                "--location",
-                composer_region,
-                "--format",
-                "json",
-            ],
-            stdout=subprocess.PIPE,
-        ).stdout.decode("utf-8")
-    )
+    environment = get_composer_environment(composer_env, composer_region)
 
     # Example image version: composer-1.17.0-preview.8-airflow-2.1.1
-    image_version = config["config"]["softwareConfig"]["imageVersion"]
+    image_version = environment.config.software_config.image_version
 
     airflow_version = image_version.split("-airflow-")[-1]
     return 2 if airflow_version.startswith("2") else 1
@@ -528,6 +622,14 @@ if __name__ == "__main__":
         dest="pipeline",
         help="The directory name of the pipeline",
     )
+    parser.add_argument(
+        "--max-workers",
+        required=False,
+        type=int,
+        default=DEFAULT_UPLOAD_WORKERS,
+        dest="max_workers",
+        help="Number of files uploaded to the Composer bucket at the same time",
+    )
 
     args = parser.parse_args()
     if not args.composer_env:
@@ -547,4 +649,5 @@ if __name__ == "__main__":
         composer_env=args.composer_env,
         composer_bucket=args.composer_bucket,
         composer_region=args.composer_region,
+        max_workers=args.max_workers,
     )
@@ -14,13 +14,20 @@
 
 
 import argparse
+import concurrent.futures
+import functools
+import hashlib
 import json
+import os
 import pathlib
 import re
 import subprocess
+import tempfile
 import typing
 
+import black
 import google.auth
+import isort
 import jinja2
 from ruamel import yaml
 
@@ -28,6 +35,7 @@ CURRENT_PATH = pathlib.Path(__file__).resolve().parent
 PROJECT_ROOT = CURRENT_PATH.parent
 DATASETS_PATH = PROJECT_ROOT / "datasets"
 AIRFLOW_TEMPLATES_PATH = PROJECT_ROOT / "templates" / "airflow"
+PACKAGES_PATH = PROJECT_ROOT / "packages"
 
 TEMPLATE_PATHS = {
     "dag": AIRFLOW_TEMPLATES_PATH / "dag.py.jinja2",
@@ -38,9 +46,31 @@ TEMPLATE_PATHS = {
 }
 
 DEFAULT_AIRFLOW_VERSION = 2
-AIRFLOW_IMPORTS = json.load(open(CURRENT_PATH / "dag_imports.json"))
+DAG_IMPORTS_PATH = CURRENT_PATH / "dag_imports.json"
+AIRFLOW_IMPORTS = json.load(open(DAG_IMPORTS_PATH))
 AIRFLOW_VERSIONS = list(AIRFLOW_IMPORTS.keys())
 
+# GCS to BigQuery load args that only apply when `source_format` is CSV
+CSV_ONLY_LOAD_ARGS = (
+    "skip_leading_rows",
+    "field_delimiter",
+    "quote_character",
+    "allow_quoted_newlines",
+    "allow_jagged_rows",
+)
+
+# Records, per `.{env}` dir, the content hash of the inputs each pipeline DAG
+# and image was last generated or built from
+GENERATE_CACHE_FILE = ".generate_cache.json"
+
+# Tools images can be built and pushed with: Cloud Build, or a local Docker
+# daemon pushing to any registry, e.g. a `registry:2` container for testing
+IMAGE_BUILDERS = ("gcloud", "docker")
+DEFAULT_MAX_BUILDS = 4
+
+# Length of the content hash prefix images are tagged with
+CONTENT_TAG_LENGTH = 16
+
 
 def main(
     dataset_id: str,
@@ -50,20 +80,135 @@ def main(
     skip_builds: bool = False,
     async_builds: bool = False,
     format_code: bool = True,
+    all_datasets: bool = False,
+    max_workers: typing.Optional[int] = None,
+    use_cache: bool = True,
+    registry: typing.Optional[str] = None,
+    image_builder: str = "gcloud",
+    max_builds: int = DEFAULT_MAX_BUILDS,
 ):
-    if not skip_builds:
-        build_images(dataset_id, env, async_builds)
-
-    if all_pipelines:
-        for pipeline_dir in list_subdirs(DATASETS_PATH / dataset_id / "pipelines"):
-            generate_pipeline_dag(dataset_id, pipeline_dir.name, env, format_code)
+    if all_datasets:
+        dataset_ids = [path.name for path in list_subdirs(DATASETS_PATH)]
     else:
-        generate_pipeline_dag(dataset_id, pipeline_id, env, format_code)
+        dataset_ids = [dataset_id]
+
+    env_dir = PROJECT_ROOT / f".{env}"
+    # Without the cache everything is regenerated, and the cache is rewritten
+    cache = load_generate_cache(env_dir) if use_cache else empty_generate_cache()
+
+    try:
+        if not skip_builds:
+            for _dataset_id in dataset_ids:
+                build_images(
+                    _dataset_id,
+                    env,
+                    async_builds,
+                    cache,
+                    registry=registry,
+                    image_builder=image_builder,
+                    max_builds=max_builds,
+                )
+
+        if all_datasets:
+            generate_all_pipeline_dags(
+                dataset_ids, env, format_code, max_workers, cache
+            )
+        elif all_pipelines:
+            for pipeline_dir in list_subdirs(DATASETS_PATH / dataset_id / "pipelines"):
+                generate_pipeline_dag_if_stale(
+                    dataset_id, pipeline_dir.name, env, format_code, cache
+                )
+        else:
+            generate_pipeline_dag_if_stale(
+                dataset_id, pipeline_id, env, format_code, cache
+            )
+    finally:
+        # Keep what did succeed, so a rerun after a failure resumes from there
+        save_generate_cache(cache, env_dir)
+
+
+def generate_all_pipeline_dags(
+    dataset_ids: typing.List[str],
+    env: str,
+    format_code: bool,
+    max_workers: typing.Optional[int] = None,
+    cache: typing.Optional[dict] = None,
+):
+    """Generates the DAG of every pipeline of the given datasets on a process pool.
+
+    Pipelines whose inputs are unchanged since they were recorded in `cache`
+    are skipped. The cache is only read and updated here, in the parent
+    process.
+    """
+    cache = cache if cache is not None else empty_generate_cache()
+    env_dir = PROJECT_ROOT / f".{env}"
+    pipelines, skipped = {}, 0
+    for dataset_id in dataset_ids:
+        for pipeline_dir in list_subdirs(DATASETS_PATH / dataset_id / "pipelines"):
+            if not (pipeline_dir / "pipeline.yaml").exists():
+                continue
+            inputs_hash = pipeline_inputs_hash(
+                dataset_id, pipeline_dir.name, format_code
+            )
+            if pipeline_is_current(
+                dataset_id, pipeline_dir.name, inputs_hash, env_dir, cache
+            ):
+                skipped += 1
+            else:
+                pipelines[(dataset_id, pipeline_dir.name)] = inputs_hash
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(
+                generate_pipeline_dag, dataset_id, pipeline_id, env, format_code
+            ): (dataset_id, pipeline_id)
+            for dataset_id, pipeline_id in pipelines
+        }
+        changed, failed = [], []
+        for future in concurrent.futures.as_completed(futures):
+            dataset_id, pipeline_id = futures[future]
+            try:
+                if future.result():
+                    changed.append(f"{dataset_id}/{pipeline_id}")
+            except Exception as e:
+                failed.append(f"{dataset_id}/{pipeline_id}: {e!r}")
+            else:
+                cache["pipelines"][f"{dataset_id}/{pipeline_id}"] = pipelines[
+                    futures[future]
+                ]
+    print(
+        f"Generated {len(pipelines)} pipelines, skipped {skipped} unchanged ones, "
+        f"{len(changed)} DAG files changed:"
+    )
+    for pipeline in sorted(changed):
+        print(f"  - {pipeline}")
+    if failed:
+        raise RuntimeError(
+            f"Failed to generate {len(failed)} pipelines:\n" + "\n".join(sorted(failed))
+        )
+
+
+def generate_pipeline_dag_if_stale(
+    dataset_id: str, pipeline_id: str, env: str, format_code: bool, cache: dict
+) -> bool:
+    """Generates the DAG of a pipeline unless its inputs are unchanged since
+    they were recorded in `cache`, and returns whether the DAG file changed"""
+    inputs_hash = pipeline_inputs_hash(dataset_id, pipeline_id, format_code)
+    if pipeline_is_current(
+        dataset_id, pipeline_id, inputs_hash, PROJECT_ROOT / f".{env}", cache
+    ):
+        print(f"Skipping {dataset_id}/{pipeline_id}: unchanged since last generated")
+        return False
+
+    changed = generate_pipeline_dag(dataset_id, pipeline_id, env, format_code)
+    cache["pipelines"][f"{dataset_id}/{pipeline_id}"] = inputs_hash
+    return changed
 
 
 def generate_pipeline_dag(
     dataset_id: str, pipeline_id: str, env: str, format_code: bool
-):
+) -> bool:
+    """Generates the DAG of a pipeline and returns whether the DAG file changed"""
     CustomYAMLTags(dataset_id)
     pipeline_dir = DATASETS_PATH / dataset_id / "pipelines" / pipeline_id
     config = yaml.load((pipeline_dir / "pipeline.yaml").read_text(), Loader=yaml.Loader)
@@ -72,11 +217,10 @@ def generate_pipeline_dag(
     dag_contents = generate_dag(config, dataset_id)
 
     dag_path = pipeline_dir / f"{pipeline_id}_dag.py"
-    dag_path.touch()
-    write_to_file(dag_contents, dag_path)
-
+    dag_file_contents = with_license_header(dag_contents)
     if format_code:
-        format_python_code(dag_path)
+        dag_file_contents = format_python_code(dag_file_contents)
+    changed = write_if_changed(dag_file_contents, dag_path)
 
     copy_files_to_dot_dir(
         dataset_id,
@@ -85,10 +229,26 @@ def generate_pipeline_dag(
     )
 
     print_airflow_variables(dataset_id, dag_contents, env)
+    return changed
+
+
+@functools.lru_cache(maxsize=None)
+def template_env() -> jinja2.Environment:
+    """Returns the Jinja environment shared by every render in this process.
+
+    Each template is read and compiled once, on first use.
+    """
+    return jinja2.Environment(
+        loader=jinja2.FileSystemLoader(str(AIRFLOW_TEMPLATES_PATH))
+    )
+
+
+def get_template(name: str) -> jinja2.Template:
+    return template_env().get_template(TEMPLATE_PATHS[name].name)
 
 
 def generate_dag(config: dict, dataset_id: str) -> str:
-    return jinja2.Template(TEMPLATE_PATHS["dag"].read_text()).render(
+    return get_template("dag").render(
         package_imports=generate_package_imports(config),
         default_args=generate_default_args(config),
         dag_context=generate_dag_context(config, dataset_id),
@@ -114,14 +274,14 @@ def generate_tasks(config: dict) -> list:
 
 
 def generate_default_args(config: dict) -> str:
-    return jinja2.Template(TEMPLATE_PATHS["default_args"].read_text()).render(
+    return get_template("default_args").render(
         default_args=dag_init(config)["default_args"]
     )
 
 
 def generate_dag_context(config: dict, dataset_id: str) -> str:
     dag_params = dag_init(config)
-    return jinja2.Template(TEMPLATE_PATHS["dag_context"].read_text()).render(
+    return get_template("dag_context").render(
         dag_init=dag_params,
         namespaced_dag_id=namespaced_dag_id(dag_params["dag_id"], dataset_id),
     )
@@ -129,7 +289,7 @@ def generate_dag_context(config: dict, dataset_id: str) -> str:
 
 def generate_task_contents(task: dict, airflow_version: str) -> str:
     validate_task(task, airflow_version)
-    return jinja2.Template(TEMPLATE_PATHS["task"].read_text()).render(
+    return get_template("task").render(
         **task,
         namespaced_operator=AIRFLOW_IMPORTS[airflow_version][task["operator"]]["class"],
     )
@@ -179,6 +339,22 @@ def validate_task(task: dict, airflow_version: str):
     if not task["args"].get("task_id"):
         raise KeyError(f"`args.task_id` key must exist in {task}")
 
+    if task["operator"] == "GoogleCloudStorageToBigQueryOperator":
+        validate_gcs_to_bq_source_format(task)
+
+
+def validate_gcs_to_bq_source_format(task: dict):
+    source_format = str(task["args"].get("source_format", "CSV")).upper()
+    if source_format == "CSV":
+        return
+
+    csv_args = [arg for arg in CSV_ONLY_LOAD_ARGS if arg in task["args"]]
+    if csv_args:
+        raise ValueError(
+            f"{csv_args} only apply to CSV loads and must be removed from "
+            f"`{task['args']['task_id']}` when `source_format` is {source_format}"
+        )
+
 
 def list_subdirs(path: pathlib.Path) -> typing.List[pathlib.Path]:
     """Returns a list of subdirectories"""
@@ -186,27 +362,43 @@ def list_subdirs(path: pathlib.Path) -> typing.List[pathlib.Path]:
     return subdirs
 
 
+@functools.lru_cache(maxsize=None)
+def license_header() -> str:
+    return pathlib.Path(TEMPLATE_PATHS["license"]).read_text() + "\n"
+
+
+def with_license_header(contents: str) -> str:
+    return license_header() + contents.replace(license_header(), "")
+
+
 def write_to_file(contents: str, filepath: pathlib.Path):
-    license_header = pathlib.Path(TEMPLATE_PATHS["license"]).read_text() + "\n"
     with open(filepath, "w") as file_:
-        file_.write(license_header + contents.replace(license_header, ""))
+        file_.write(with_license_header(contents))
+
 
+def write_if_changed(contents: str, filepath: pathlib.Path) -> bool:
+    """Writes `contents` unless the file already holds exactly that, so
+    unchanged files keep their modification times"""
+    if filepath.exists() and filepath.read_text() == contents:
+        return False
+    filepath.write_text(contents)
+    return True
 
-def format_python_code(target_file: pathlib.Path):
-    subprocess.Popen(
-        f"black -q {target_file}", stdout=subprocess.PIPE, shell=True
-    ).wait()
-    subprocess.check_call(["isort", "--profile", "black", "."], cwd=PROJECT_ROOT)
+
+def format_python_code(contents: str) -> str:
+    """Formats generated code with black and isort, in-process"""
+    contents = black.format_str(contents, mode=black.Mode())
+    return isort.code(contents, profile="black")
 
 
 def print_airflow_variables(dataset_id: str, dag_contents: str, env: str):
     var_regex = r"\{{2}\s*var.json.([a-zA-Z0-9_\.]*)?\s*\}{2}"
-    print(
+    lines = [
         f"\nThe following Airflow variables must be set in"
         f"\n\n  .{env}/datasets/{dataset_id}/pipelines/{dataset_id}_variables.json"
         "\n\nusing JSON dot notation:"
         "\n"
-    )
+    ]
     for var in sorted(
         list(set(re.findall(var_regex, dag_contents))), key=lambda v: v.count(".")
     ):
@@ -214,8 +406,116 @@ def print_airflow_variables(dataset_id: str, dag_contents: str, env: str):
             var = var.replace("json.", "", 1)
         elif var.startswith("value."):
             var = var.replace("value.", "", 1)
-        print(f"  - {var}")
-    print()
+        lines.append(f"  - {var}")
+    # One print per pipeline, so output from parallel generation stays grouped
+    print("\n".join(lines) + "\n")
+
+
+def empty_generate_cache() -> dict:
+    return {"pipelines": {}, "images": {}}
+
+
+def load_generate_cache(env_dir: pathlib.Path) -> dict:
+    cache = empty_generate_cache()
+    cache_path = env_dir / GENERATE_CACHE_FILE
+    if cache_path.exists():
+        try:
+            stored = json.loads(cache_path.read_text())
+        except ValueError:
+            print(f"Ignoring unreadable {cache_path}, regenerating everything")
+        else:
+            for kind in cache:
+                cache[kind].update(stored.get(kind, {}))
+    return cache
+
+
+def save_generate_cache(cache: dict, env_dir: pathlib.Path):
+    """Writes the cache atomically, dropping entries of deleted pipelines
+    and images"""
+    cache = {
+        kind: {
+            key: inputs_hash
+            for key, inputs_hash in entries.items()
+            if cache_entry_source_dir(kind, key).exists()
+        }
+        for kind, entries in cache.items()
+    }
+    env_dir.mkdir(parents=True, exist_ok=True)
+    cache_path = env_dir / GENERATE_CACHE_FILE
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+    tmp_path.write_text(json.dumps(cache, indent=2, sort_keys=True) + "\n")
+    os.replace(tmp_path, cache_path)
+
+
+def cache_entry_source_dir(kind: str, key: str) -> pathlib.Path:
+    dataset_id, name = key.split("/", 1)
+    if kind == "images":
+        return DATASETS_PATH / dataset_id / "pipelines" / "_images" / name
+    return DATASETS_PATH / dataset_id / "pipelines" / name
+
+
+def hash_files(
+    paths: typing.Iterable[pathlib.Path],
+    root: pathlib.Path,
+    digest: typing.Any = None,
+) -> typing.Any:
+    """Feeds the relative path and contents of every file under `paths` into
+    `digest`, in a stable order. Python bytecode caches are left out."""
+    digest = digest or hashlib.sha256()
+    files = []
+    for path in paths:
+        files.extend(path.rglob("*") if path.is_dir() else [path])
+    for file in sorted(files):
+        if not file.is_file() or "__pycache__" in file.parts:
+            continue
+        digest.update(str(file.relative_to(root)).encode() + b"\0")
+        digest.update(file.read_bytes() + b"\0")
+    return digest
+
+
+@functools.lru_cache(maxsize=None)
+def generator_inputs_hash() -> str:
+    """Hashes what every DAG depends on: the templates, the operator imports
+    and this script itself"""
+    return hash_files(
+        [AIRFLOW_TEMPLATES_PATH, DAG_IMPORTS_PATH, pathlib.Path(__file__).resolve()],
+        PROJECT_ROOT,
+    ).hexdigest()
+
+
+def pipeline_inputs_hash(dataset_id: str, pipeline_id: str, format_code: bool) -> str:
+    """Hashes everything a pipeline's generated DAG and its `.{env}` copy
+    depend on: the pipeline dir (minus the DAG itself) and the generator"""
+    pipeline_dir = DATASETS_PATH / dataset_id / "pipelines" / pipeline_id
+    dag_path = pipeline_dir / f"{pipeline_id}_dag.py"
+    digest = hashlib.sha256(
+        f"{generator_inputs_hash()}:format_code={format_code}".encode()
+    )
+    inputs = [path for path in pipeline_dir.iterdir() if path != dag_path]
+    return hash_files(inputs, pipeline_dir, digest).hexdigest()
+
+
+def pipeline_is_current(
+    dataset_id: str,
+    pipeline_id: str,
+    inputs_hash: str,
+    env_dir: pathlib.Path,
+    cache: dict,
+) -> bool:
+    """Returns whether the pipeline was generated from the same inputs and its
+    DAG file is still in place, unedited, in both the repo and `env_dir`"""
+    if cache["pipelines"].get(f"{dataset_id}/{pipeline_id}") != inputs_hash:
+        return False
+
+    dag_file = f"{pipeline_id}_dag.py"
+    dag_path = DATASETS_PATH / dataset_id / "pipelines" / pipeline_id / dag_file
+    copied_dag_path = env_dir / "datasets" / dataset_id / "pipelines" / pipeline_id
+    copied_dag_path = copied_dag_path / dag_file
+    return (
+        dag_path.exists()
+        and copied_dag_path.exists()
+        and dag_path.read_bytes() == copied_dag_path.read_bytes()
+    )
 
 
 def copy_files_to_dot_dir(dataset_id: str, pipeline_id: str, env_dir: pathlib.Path):
@@ -227,16 +527,78 @@ def copy_files_to_dot_dir(dataset_id: str, pipeline_id: str, env_dir: pathlib.Pa
     )
 
 
-def build_images(dataset_id: str, env: str, async_builds: bool):
+def build_images(
+    dataset_id: str,
+    env: str,
+    async_builds: bool,
+    cache: typing.Optional[dict] = None,
+    registry: typing.Optional[str] = None,
+    image_builder: str = "gcloud",
+    max_builds: int = DEFAULT_MAX_BUILDS,
+):
+    """Builds and pushes the images of a dataset, up to `max_builds` at a time.
+
+    Each image is tagged with a hash of its build context as uploaded, so
+    changes to the shared packages copied into it count as well. Images whose
+    hash was recorded in `cache` by a build with the same builder to the same
+    registry are skipped outright. The others go to
+    `build_and_push_image`, which also skips the build when the registry
+    already holds that tag. Async builds are not recorded, since their
+    success is only known later.
+    """
     parent_dir = DATASETS_PATH / dataset_id / "pipelines" / "_images"
     if not parent_dir.exists():
         return
 
+    cache = cache if cache is not None else empty_generate_cache()
     image_dirs = copy_image_files_to_dot_dir(
         dataset_id, parent_dir, PROJECT_ROOT / f".{env}"
     )
+    registry = registry or default_registry()
+    statuses, pending = {}, {}
     for image_dir in image_dirs:
-        build_and_push_image(dataset_id, image_dir, async_builds)
+        key = f"{dataset_id}/{image_dir.name}"
+        inputs_hash = hash_files([image_dir], image_dir).hexdigest()
+        if cache["images"].get(key) == f"{image_builder}:{registry}:{inputs_hash}":
+            statuses[key] = "unchanged"
+        else:
+            pending[key] = (image_dir, inputs_hash)
+
+    failed = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_builds) as executor:
+        futures = {
+            executor.submit(
+                build_and_push_image,
+                dataset_id,
+                image_dir,
+                async_builds,
+                content_tag=inputs_hash[:CONTENT_TAG_LENGTH],
+                registry=registry,
+                image_builder=image_builder,
+            ): key
+            for key, (image_dir, inputs_hash) in pending.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            key = futures[future]
+            try:
+                statuses[key] = future.result()
+            except Exception as e:
+                statuses[key] = "failed"
+                failed[key] = getattr(e, "output", None) or repr(e)
+            else:
+                if not async_builds:
+                    inputs_hash = pending[key][1]
+                    cache["images"][key] = f"{image_builder}:{registry}:{inputs_hash}"
+
+    print(f"\nImages of {dataset_id}:")
+    for key in sorted(statuses):
+        print(f"  - {key}: {statuses[key]}")
+    for key in sorted(failed):
+        print(f"\nOutput of the failed build of {key}:\n{failed[key]}")
+    if failed:
+        raise RuntimeError(
+            f"Failed to build {len(failed)} images: {', '.join(sorted(failed))}"
+        )
 
 
 def copy_image_files_to_dot_dir(
@@ -248,27 +610,125 @@ def copy_image_files_to_dot_dir(
         ["cp", "-rf", str(parent_dir), str(target_dir)], cwd=PROJECT_ROOT
     )
 
-    return list_subdirs(target_dir / "_images")
+    image_dirs = list_subdirs(target_dir / "_images")
+    for image_dir in image_dirs:
+        copy_shared_packages_to_image_dir(image_dir)
+    return image_dirs
+
+
+def copy_shared_packages_to_image_dir(image_dir: pathlib.Path):
+    """Copies the shared packages an image's Dockerfile references into its build context"""
+    dockerfile = image_dir / "Dockerfile"
+    if not dockerfile.exists():
+        return
+
+    dockerfile_contents = dockerfile.read_text()
+    for package_dir in list_subdirs(PACKAGES_PATH):
+        if f"./{package_dir.name}" in dockerfile_contents:
+            subprocess.check_call(
+                ["cp", "-rf", str(package_dir), str(image_dir)], cwd=PROJECT_ROOT
+            )
 
 
 def build_and_push_image(
-    dataset_id: str, image_dir: pathlib.Path, async_builds: bool = False
-):
+    dataset_id: str,
+    image_dir: pathlib.Path,
+    async_builds: bool = False,
+    content_tag: typing.Optional[str] = None,
+    registry: typing.Optional[str] = None,
+    image_builder: str = "gcloud",
+) -> str:
+    """Pushes an image tagged with both `content_tag` and `latest`, the tag
+    DAGs pull. When the registry already holds `content_tag`, `latest` is
+    pointed at it instead of building again.
+
+    Returns what was done: "built", "submitted" for async Cloud Builds, or
+    "retagged".
+    """
     image_name = f"{dataset_id}__{image_dir.name}"
-    command = [
-        "gcloud",
-        "builds",
-        "submit",
-        "--async",
-        "--tag",
-        f"gcr.io/{gcp_project_id()}/{image_name}",
-    ]
+    image_uri = f"{registry or default_registry()}/{image_name}"
+    content_tag = content_tag or image_content_tag(image_dir)
+    tagged_uri, latest_uri = f"{image_uri}:{content_tag}", f"{image_uri}:latest"
+
+    if image_exists(tagged_uri, image_builder, image_dir):
+        tag_image(tagged_uri, latest_uri, image_builder, image_dir)
+        return "retagged"
+
+    if image_builder == "docker":
+        run_build_command(
+            ["docker", "build", "--tag", tagged_uri, "--tag", latest_uri, "."],
+            image_dir,
+        )
+        for uri in (tagged_uri, latest_uri):
+            run_build_command(["docker", "push", uri], image_dir)
+        return "built"
+
+    # `gcloud builds submit --tag` takes a single tag, so both are pushed by
+    # a build config kept outside the build context
+    with tempfile.TemporaryDirectory() as config_dir:
+        config_path = pathlib.Path(config_dir) / "cloudbuild.json"
+        config_path.write_text(json.dumps(cloudbuild_config(tagged_uri, latest_uri)))
+        command = ["gcloud", "builds", "submit", "--config", str(config_path)]
+        if async_builds:
+            command.append("--async")
+        run_build_command(command + ["."], image_dir)
+    return "submitted" if async_builds else "built"
+
+
+def image_content_tag(image_dir: pathlib.Path) -> str:
+    return hash_files([image_dir], image_dir).hexdigest()[:CONTENT_TAG_LENGTH]
+
+
+def cloudbuild_config(*image_uris: str) -> dict:
+    tag_args = [arg for uri in image_uris for arg in ("--tag", uri)]
+    return {
+        "steps": [
+            {"name": "gcr.io/cloud-builders/docker", "args": ["build", *tag_args, "."]}
+        ],
+        "images": list(image_uris),
+    }
+
+
+def image_exists(image_uri: str, image_builder: str, cwd: pathlib.Path) -> bool:
+    if image_builder == "docker":
+        command = ["docker", "manifest", "inspect", image_uri]
+    else:
+        command = ["gcloud", "container", "images", "describe", image_uri]
+    return run_build_command(command, cwd, check=False).returncode == 0
+
+
+def tag_image(source_uri: str, target_uri: str, image_builder: str, cwd: pathlib.Path):
+    if image_builder == "docker":
+        commands = [
+            ["docker", "pull", source_uri],
+            ["docker", "tag", source_uri, target_uri],
+            ["docker", "push", target_uri],
+        ]
+    else:
+        add_tag = ["gcloud", "container", "images", "add-tag", "--quiet"]
+        commands = [add_tag + [source_uri, target_uri]]
+    for command in commands:
+        run_build_command(command, cwd)
+
+
+def run_build_command(
+    command: typing.List[str], cwd: pathlib.Path, check: bool = True
+) -> subprocess.CompletedProcess:
+    """Runs a build tool, capturing its output so concurrent builds do not
+    interleave. A failed command raises CalledProcessError carrying it."""
+    return subprocess.run(
+        command,
+        cwd=cwd,
+        check=check,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
 
-    if not async_builds:
-        command.remove("--async")
 
-    # gcloud builds submit --tag gcr.io/PROJECT_ID/IMAGE_NAME
-    subprocess.check_call(command, cwd=image_dir)
+@functools.lru_cache(maxsize=None)
+def default_registry() -> str:
+    return f"gcr.io/{gcp_project_id()}"
 
 
 def gcp_project_id() -> str:
@@ -294,7 +754,6 @@ if __name__ == "__main__":
     parser.add_argument(
         "-d",
         "--dataset",
-        required=True,
         type=str,
         dest="dataset",
         help="The directory name of the dataset.",
@@ -317,14 +776,57 @@ if __name__ == "__main__":
     parser.add_argument(
         "--all-pipelines", required=False, dest="all_pipelines", action="store_true"
     )
+    parser.add_argument(
+        "--all-datasets",
+        required=False,
+        dest="all_datasets",
+        action="store_true",
+        help="Generate the DAGs of every pipeline of every dataset, in parallel",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        dest="max_workers",
+        help="Number of processes used with --all-datasets. Defaults to the CPU count",
+    )
     parser.add_argument(
         "--skip-builds", required=False, dest="skip_builds", action="store_true"
     )
     parser.add_argument(
-        "--async-builds", required=False, dest="async_builds", action="store_false"
+        "--async-builds", required=False, dest="async_builds", action="store_true"
+    )
+    parser.add_argument(
+        "--registry",
+        type=str,
+        dest="registry",
+        help="Registry to push images to. Defaults to gcr.io/<GCP project>",
+    )
+    parser.add_argument(
+        "--image-builder",
+        type=str,
+        default="gcloud",
+        choices=IMAGE_BUILDERS,
+        dest="image_builder",
+        help="Build images with Cloud Build, or with the local Docker daemon",
+    )
+    parser.add_argument(
+        "--max-builds",
+        type=int,
+        default=DEFAULT_MAX_BUILDS,
+        dest="max_builds",
+        help="Number of images built at the same time",
+    )
+    parser.add_argument(
+        "--no-cache",
+        required=False,
+        dest="use_cache",
+        action="store_false",
+        help=f"Regenerate and rebuild everything, ignoring .{{env}}/{GENERATE_CACHE_FILE}",
     )
 
     args = parser.parse_args()
+    if not args.dataset and not args.all_datasets:
+        parser.error("one of -d/--dataset or --all-datasets is required")
 
     main(
         args.dataset,
@@ -333,4 +835,10 @@ if __name__ == "__main__":
         args.all_pipelines,
         args.skip_builds,
         args.async_builds,
+        all_datasets=args.all_datasets,
+        max_workers=args.max_workers,
+        use_cache=args.use_cache,
+        registry=args.registry,
+        image_builder=args.image_builder,
+        max_builds=args.max_builds,
     )
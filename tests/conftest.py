@@ -15,10 +15,15 @@
 
 import pathlib
 import shutil
+import sys
 
 CURRENT_PATH = pathlib.Path(__file__).resolve().parent
 PROJECT_ROOT = CURRENT_PATH.parent
 
+# Make the shared packages under `packages/` importable without installing them
+for package_dir in (PROJECT_ROOT / "packages").iterdir():
+    sys.path.insert(0, str(package_dir))
+
 
 def pytest_sessionfinish(session, exitstatus):
     test_folder = PROJECT_ROOT / ".test"
@@ -0,0 +1,109 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import types
+
+import pytest
+from google.cloud import bigquery
+from pdp_transform import bq
+
+
+class FakeRow(dict):
+    __getattr__ = dict.__getitem__
+
+
+class FakeClient:
+    def __init__(self, tables=None, rows=()):
+        self.tables = tables or {}
+        self.rows = rows
+        self.calls = []
+
+    def list_tables(self, dataset_id):
+        self.calls.append(("list_tables", dataset_id))
+        return [types.SimpleNamespace(table_id=name) for name in self.tables]
+
+    def get_table(self, table_ref):
+        self.calls.append(("get_table", table_ref))
+        fields = self.tables[table_ref.split(".")[-1]]
+        return types.SimpleNamespace(
+            schema=[bigquery.SchemaField(name, "INTEGER") for name in fields]
+        )
+
+    def query(self, query):
+        self.calls.append(("query", query))
+        return types.SimpleNamespace(result=lambda: self.rows)
+
+
+def test_table_metadata_lists_dataset_and_fetches_schema_once():
+    client = FakeClient(tables={"trips_2021": ["year", "month"]})
+    metadata = bq.TableMetadata(client)
+
+    for _ in range(3):
+        assert metadata.field_exists("taxi", "trips_2021", "month")
+        assert not metadata.field_exists("taxi", "trips_2021", "day")
+        assert not metadata.field_exists("taxi", "trips_2020", "month")
+
+    assert client.calls == [
+        ("list_tables", "taxi"),
+        ("get_table", "taxi.trips_2021"),
+    ]
+
+
+def test_table_metadata_invalidate_relists_dataset():
+    client = FakeClient(tables={})
+    metadata = bq.TableMetadata(client)
+    assert not metadata.table_exists("taxi", "trips_2021")
+
+    client.tables["trips_2021"] = ["year", "month"]
+    metadata.invalidate("taxi", "trips_2021")
+
+    assert metadata.table_exists("taxi", "trips_2021")
+    assert [call[0] for call in client.calls] == ["list_tables", "list_tables"]
+
+
+@pytest.fixture
+def fake_client(monkeypatch: pytest.MonkeyPatch) -> FakeClient:
+    client = FakeClient(
+        rows=[
+            FakeRow(
+                table_name="trips_2021", period_0=2021, period_1=1, number_of_rows=7
+            ),
+            FakeRow(
+                table_name="trips_2021", period_0=2021, period_1=None, number_of_rows=2
+            ),
+            FakeRow(
+                table_name="trips_2022", period_0=2022, period_1=3, number_of_rows=5
+            ),
+        ]
+    )
+    monkeypatch.setattr(bq, "bigquery_client", lambda project_id=None: client)
+    return client
+
+
+def test_count_rows_by_period_issues_one_grouped_query(fake_client: FakeClient):
+    counts = bq.count_rows_by_period(
+        "project", "taxi", ["trips_2021", "trips_2022"], ["year", "month"]
+    )
+
+    assert counts == {("trips_2021", "2021", "1"): 7, ("trips_2022", "2022", "3"): 5}
+    [(kind, query)] = fake_client.calls
+    assert kind == "query"
+    assert query.count("GROUP BY 2, 3") == 2
+    assert "UNION ALL" in query
+
+
+def test_count_rows_by_period_skips_query_without_tables(fake_client: FakeClient):
+    assert bq.count_rows_by_period("project", "taxi", [], ["year"]) == {}
+    assert fake_client.calls == []
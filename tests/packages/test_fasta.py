@@ -0,0 +1,59 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+
+import pytest
+from pdp_transform import fasta
+
+RECORDS = [
+    ("UniRef50_A0A1 Protein A n=2 Tax=Homo sapiens TaxID=9606 RepID=A0A1", "MKVLLA"),
+    ("UniRef50_B0B2 Protein B n=1 Tax=Mus musculus TaxID=10090 RepID=B0B2", "AAAC"),
+    ("UniRef50_C0C3 Protein C n=5 Tax=root TaxID=1 RepID=C0C3", "GG"),
+]
+
+
+@pytest.fixture
+def fasta_file(tmp_path: pathlib.Path) -> str:
+    file_path = tmp_path / "uniref50.fasta"
+    file_path.write_text(
+        ">UniRef50_A0A1 Protein A n=2 Tax=Homo sapiens TaxID=9606 RepID=A0A1\n"
+        "MKV\n"
+        "LLA\n"
+        ">UniRef50_B0B2 Protein B n=1 Tax=Mus musculus TaxID=10090 RepID=B0B2\n"
+        "AA AC\n"
+        "\n"
+        ">UniRef50_C0C3 Protein C n=5 Tax=root TaxID=1 RepID=C0C3  \n"
+        "GG\n"
+    )
+    return str(file_path)
+
+
+def test_read_records_joins_sequence_lines(fasta_file: str):
+    assert list(fasta.read_records(fasta_file)) == RECORDS
+
+
+@pytest.mark.parametrize("parts", [1, 2, 3, 10])
+def test_record_ranges_split_on_record_boundaries(fasta_file: str, parts: int):
+    ranges = fasta.record_ranges(fasta_file, parts)
+
+    assert len(ranges) == min(parts, len(RECORDS))
+    assert ranges[0][0] == 0
+    assert all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:]))
+    records = [
+        record
+        for start, end in ranges
+        for record in fasta.read_records(fasta_file, start, end)
+    ]
+    assert records == RECORDS
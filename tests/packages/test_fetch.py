@@ -0,0 +1,124 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+
+import pytest
+import requests
+from pdp_transform import fetch
+
+
+def response(status_code: int, url: str) -> requests.Response:
+    r = requests.Response()
+    r.status_code = status_code
+    r.url = url
+    return r
+
+
+class FakeSession:
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+
+    def get(self, url, **kwargs):
+        if url in self.failing:
+            raise requests.exceptions.ConnectionError(url)
+        return response(200, url)
+
+
+def test_get_many_yields_responses_in_url_order():
+    urls = [f"https://api.example.com/data?page={n}" for n in range(20)]
+
+    results = list(fetch.get_many(urls, max_workers=4, session=FakeSession()))
+
+    assert [url for url, _ in results] == urls
+    assert all(r.status_code == 200 and r.url == url for url, r in results)
+
+
+def test_get_many_yields_exception_for_failed_request():
+    urls = ["https://api.example.com/ok", "https://api.example.com/down"]
+
+    results = dict(fetch.get_many(urls, session=FakeSession(failing=urls[1:])))
+
+    assert results[urls[0]].status_code == 200
+    assert isinstance(results[urls[1]], requests.exceptions.ConnectionError)
+
+
+def test_retrying_session_retries_throttled_and_server_errors():
+    session = fetch.retrying_session(pool_size=4, retries=3, backoff_factor=0.5)
+
+    retry = session.get_adapter("https://api.census.gov").max_retries
+    assert retry.total == 3
+    assert 429 in retry.status_forcelist and 503 in retry.status_forcelist
+
+
+class FakeStream:
+    def __init__(self, status_code, chunks, content_length, fail_after=None):
+        self.status_code = status_code
+        self.chunks = chunks
+        self.headers = {"Content-Length": str(content_length)}
+        self.fail_after = fail_after
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(str(self.status_code))
+
+    def iter_content(self, chunk_size):
+        for n, chunk in enumerate(self.chunks):
+            if n == self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection reset")
+            yield chunk
+
+
+class FakeRangeSession:
+    """Serves `data`, dropping the connection halfway through the first GET."""
+
+    def __init__(self, data, status_code=200):
+        self.data = data
+        self.status_code = status_code
+        self.ranges = []
+
+    def get(self, url, headers=None, **kwargs):
+        if self.status_code != 200:
+            return FakeStream(self.status_code, [], 0)
+        byte_range = (headers or {}).get("Range")
+        self.ranges.append(byte_range)
+        if byte_range is None:
+            half = len(self.data) // 2
+            chunks = [self.data[:half], self.data[half:]]
+            return FakeStream(200, chunks, len(self.data), fail_after=1)
+        offset = int(byte_range[len("bytes=") : -1])
+        return FakeStream(206, [self.data[offset:]], len(self.data) - offset)
+
+
+def test_download_file_resumes_interrupted_transfer(tmp_path: pathlib.Path):
+    session = FakeRangeSession(b"0123456789")
+    file_path = tmp_path / "GEOS.fp.asm.nc4"
+
+    fetch.download_file("https://example.com/f.nc4", str(file_path), session)
+
+    assert file_path.read_bytes() == b"0123456789"
+    assert session.ranges == [None, "bytes=5-"]
+
+
+def test_download_file_does_not_retry_http_errors(tmp_path: pathlib.Path):
+    session = FakeRangeSession(b"", status_code=404)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        fetch.download_file("https://example.com/f.nc4", str(tmp_path / "f"), session)
@@ -0,0 +1,88 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import gzip
+import pathlib
+
+import pandas as pd
+from pdp_transform import files
+
+
+def test_chunk_writer_writes_header_once(tmp_path: pathlib.Path):
+    target_file = tmp_path / "output.csv"
+
+    with files.ChunkWriter(target_file) as writer:
+        writer.write(pd.DataFrame({"a": [1, 2], "b": ["x", "y"]}))
+        writer.write(pd.DataFrame({"a": [3], "b": ["z"]}))
+
+    assert target_file.read_text() == "a|b\n1|x\n2|y\n3|z\n"
+    assert writer.rows_written == 3
+
+
+def test_chunk_writer_truncates_existing_file(tmp_path: pathlib.Path):
+    target_file = tmp_path / "output.csv"
+    target_file.write_text("stale contents\n")
+
+    with files.ChunkWriter(target_file, sep=",") as writer:
+        writer.write(pd.DataFrame({"a": [1]}))
+
+    assert target_file.read_text() == "a\n1\n"
+
+
+def test_chunk_writer_does_not_create_file_without_chunks(tmp_path: pathlib.Path):
+    target_file = tmp_path / "output.csv"
+
+    with files.ChunkWriter(target_file):
+        pass
+
+    assert not target_file.exists()
+
+
+def test_read_csv_chunks_strips_nul_bytes_and_keeps_strings(tmp_path: pathlib.Path):
+    source_file = tmp_path / "source.csv"
+    source_file.write_bytes(b'A,0\x0012,\nB,"x,y",\x00\nC,007,z\n')
+
+    with files.read_csv_chunks(
+        source_file, names=["id", "value", "flag"], chunksize=2
+    ) as reader:
+        chunks = list(reader)
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    df = pd.concat(chunks, ignore_index=True)
+    assert df["value"].tolist() == ["012", "x,y", "007"]
+    assert df["flag"].tolist() == ["", "", "z"]
+
+
+def test_read_csv_chunks_reads_gzip_stream(tmp_path: pathlib.Path):
+    source_file = tmp_path / "source.csv.gz"
+    with gzip.open(source_file, "wb") as f:
+        f.write(b"A,1\nB,2\n")
+
+    with files.read_csv_chunks(source_file, names=["id", "value"]) as reader:
+        df = pd.concat(reader)
+
+    assert df["value"].tolist() == ["1", "2"]
+
+
+def test_gz_decompress_streams_to_file(tmp_path: pathlib.Path):
+    source_zipfile = tmp_path / "source.csv.gz"
+    data = "id,name\n" + "1,café\n" * 100000
+    with gzip.open(source_zipfile, "wt", encoding="utf-8") as f:
+        f.write(data)
+
+    files.gz_decompress(source_zipfile, tmp_path / "source.csv", delete_zipfile=True)
+
+    assert (tmp_path / "source.csv").read_text(encoding="utf-8") == data
+    assert not source_zipfile.exists()
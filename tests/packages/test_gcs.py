@@ -0,0 +1,140 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import pathlib
+
+import pytest
+from google.api_core.exceptions import PreconditionFailed
+from pdp_transform import gcs
+
+
+class FakeBlob:
+    def __init__(self, client, bucket_name, name, chunk_size=None):
+        self.client = client
+        self.bucket_name = bucket_name
+        self.name = name
+        self.chunk_size = chunk_size
+        self.generation = client.objects.get(name, (0, ""))[0]
+
+    def download_as_text(self):
+        return self.client.objects[self.name][1]
+
+    def upload_from_string(self, data, content_type=None, if_generation_match=None):
+        if self.client.objects.get(self.name, (0, ""))[0] != if_generation_match:
+            raise PreconditionFailed(self.name)
+        self.client.objects[self.name] = (self.generation + 1, data)
+
+    def upload_from_filename(self, filename, checksum=None):
+        if self.name in self.client.failing:
+            raise IOError(f"upload of {self.name} failed")
+        self.client.uploads[(self.bucket_name, self.name)] = {
+            "data": pathlib.Path(filename).read_bytes(),
+            "chunk_size": self.chunk_size,
+            "checksum": checksum,
+        }
+
+
+class FakeBucket:
+    def __init__(self, client, name):
+        self.client = client
+        self.name = name
+
+    def blob(self, name, chunk_size=None):
+        return FakeBlob(self.client, self.name, name, chunk_size)
+
+    def get_blob(self, name):
+        return self.blob(name) if name in self.client.objects else None
+
+
+class FakeClient:
+    def __init__(self, failing=()):
+        self.uploads = {}
+        self.failing = set(failing)
+        self.objects = {}
+
+    def bucket(self, name):
+        return FakeBucket(self, name)
+
+
+def test_upload_files_to_gcs_uploads_each_file_with_crc32c(tmp_path: pathlib.Path):
+    uploads = []
+    for year in range(2019, 2023):
+        file_path = tmp_path / f"data_{year}.csv"
+        file_path.write_text(f"year\n{year}\n")
+        uploads.append((file_path, f"data/noaa/data_{year}.csv"))
+    client = FakeClient()
+
+    gcs.upload_files_to_gcs(
+        uploads, "bucket", max_workers=2, chunk_size=256 * 1024, client=client
+    )
+
+    assert sorted(client.uploads) == [
+        ("bucket", f"data/noaa/data_{year}.csv") for year in range(2019, 2023)
+    ]
+    upload = client.uploads[("bucket", "data/noaa/data_2020.csv")]
+    assert upload["data"] == b"year\n2020\n"
+    assert upload["chunk_size"] == 256 * 1024
+    assert upload["checksum"] == "crc32c"
+
+
+def test_upload_files_to_gcs_skips_missing_files(tmp_path: pathlib.Path):
+    client = FakeClient()
+
+    gcs.upload_files_to_gcs(
+        [(tmp_path / "missing.csv", "data/missing.csv")], "bucket", client=client
+    )
+
+    assert client.uploads == {}
+
+
+def test_upload_files_to_gcs_raises_failed_upload(tmp_path: pathlib.Path):
+    ok_file = tmp_path / "ok.csv"
+    bad_file = tmp_path / "bad.csv"
+    ok_file.write_text("a\n")
+    bad_file.write_text("b\n")
+    client = FakeClient(failing=["data/bad.csv"])
+
+    with pytest.raises(IOError):
+        gcs.upload_files_to_gcs(
+            [(bad_file, "data/bad.csv"), (ok_file, "data/ok.csv")],
+            "bucket",
+            client=client,
+        )
+    assert ("bucket", "data/ok.csv") in client.uploads
+
+
+def test_update_text_in_gcs_creates_missing_object():
+    client = FakeClient()
+
+    gcs.update_text_in_gcs("bucket", "manifest.txt", lambda t: t + "a\n", client=client)
+
+    assert client.objects["manifest.txt"] == (1, "a\n")
+
+
+def test_update_text_in_gcs_reapplies_update_after_concurrent_write():
+    client = FakeClient()
+    client.objects["manifest.txt"] = (1, "a\n")
+    calls = []
+
+    def append_b(text):
+        if not calls:
+            # Another writer appends between our read and our write
+            client.objects["manifest.txt"] = (2, text + "c\n")
+        calls.append(text)
+        return text + "b\n"
+
+    gcs.update_text_in_gcs("bucket", "manifest.txt", append_b, client=client)
+
+    assert calls == ["a\n", "a\nc\n"]
+    assert client.objects["manifest.txt"] == (3, "a\nc\nb\n")
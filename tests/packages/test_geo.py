@@ -0,0 +1,59 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import numpy as np
+import pandas as pd
+import pytest
+from pdp_transform import geo
+
+
+def test_point_wkt_matches_row_by_row_formatting():
+    lon = pd.Series([-97.5, 12.123456789, np.nan])
+    lat = pd.Series([35.25, -1.0, 3.0])
+
+    result = geo.point_wkt(lon, lat)
+
+    assert result.tolist() == ["POINT(-97.5 35.25)", "POINT(12.123456789 -1.0)", ""]
+
+
+def test_point_wkt_keeps_coordinate_text():
+    result = geo.point_wkt(pd.Series(["-122.40 ", "nan"]), pd.Series(["37.700", "1"]))
+
+    assert result.tolist() == ["POINT(-122.40 37.700)", ""]
+
+
+def test_point_wkt_validates_coordinate_ranges():
+    lon, lat = pd.Series(["-97.5", "200", "x"]), pd.Series(["35.25", "1", "1"])
+
+    with pytest.raises(ValueError, match="200"):
+        geo.point_wkt(lon, lat)
+
+    result = geo.point_wkt(lon, lat, errors="coerce")
+    assert result.tolist() == ["POINT(-97.5 35.25)", "", ""]
+
+
+def test_point_geojson_writes_json_numbers():
+    result = geo.point_geojson(pd.Series(["-97.50", ""]), pd.Series(["+35", "1"]))
+
+    assert result.tolist() == ['{"type": "Point", "coordinates": [-97.5, 35]}', ""]
+
+
+def test_parse_point_splits_both_wkt_spellings():
+    geom = pd.Series(["POINT (-122.4 37.7)", "POINT(1 2)", "", None])
+
+    lon, lat = geo.parse_point(geom)
+
+    assert lon.tolist() == ["-122.4", "1", "", ""]
+    assert lat.tolist() == ["37.7", "2", "", ""]
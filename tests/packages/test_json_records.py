@@ -0,0 +1,82 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import json
+import pathlib
+
+import pandas as pd
+import pytest
+from pdp_transform import json_records
+
+RESULTS = [
+    {
+        "report_number": "100",
+        "outcomes": ["Hospitalization"],
+        "consumer": {"age": "42", "gender": "F"},
+        "products": [{"role": "SUSPECT", "name_brand": "A"}, {"role": "CONCOMITANT"}],
+    },
+    {"report_number": "101", "products": [{"role": "SUSPECT", "name_brand": "B"}]},
+    {"report_number": "102"},
+]
+
+
+@pytest.fixture
+def json_file(tmp_path: pathlib.Path) -> str:
+    file_path = tmp_path / "food-event.json"
+    file_path.write_text(json.dumps({"meta": {}, "results": RESULTS}))
+    return str(file_path)
+
+
+def test_read_json_chunks_flattens_nested_paths_into_fixed_chunks(json_file: str):
+    chunks = list(
+        json_records.read_json_chunks(
+            json_file, ["report_number", "consumer.age", "outcomes"], chunksize=2
+        )
+    )
+
+    assert [len(chunk) for chunk in chunks] == [2, 1]
+    df = pd.concat(chunks, ignore_index=True)
+    assert df.columns.tolist() == ["report_number", "consumer.age", "outcomes"]
+    assert df["report_number"].tolist() == ["100", "101", "102"]
+    assert df["consumer.age"][0] == "42"
+    assert df["outcomes"][0] == ["Hospitalization"]
+    assert df[["consumer.age", "outcomes"]][1:].isna().all(axis=None)
+
+
+def test_read_json_chunks_expands_record_path_like_json_normalize(json_file: str):
+    columns = ["role", "name_brand", "report_number", "consumer.gender"]
+
+    df = pd.concat(
+        json_records.read_json_chunks(
+            json_file, columns, chunksize=10, record_path="products"
+        )
+    )
+
+    expected = pd.json_normalize(
+        RESULTS[:2],
+        record_path=["products"],
+        meta=["report_number", ["consumer", "gender"]],
+        errors="ignore",
+    )
+    assert df.fillna("").values.tolist() == expected[columns].fillna("").values.tolist()
+
+
+def test_read_json_chunks_stringifies_nested_values(json_file: str):
+    [df] = json_records.read_json_chunks(
+        json_file, ["outcomes", "consumer"], chunksize=10, stringify_nested=True
+    )
+
+    assert df["outcomes"][0] == "['Hospitalization']"
+    assert df["consumer"][0] == "{'age': '42', 'gender': 'F'}"
@@ -0,0 +1,152 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ftplib
+import json
+import pathlib
+
+from pdp_transform import files, manifest
+
+SOURCE_URL = "https://example.com/data/2022.csv.gz"
+
+
+def test_download_file_skips_source_with_unchanged_fingerprint(
+    tmp_path: pathlib.Path, mocker
+):
+    head = mocker.patch("requests.head")
+    head.return_value.status_code = 200
+    head.return_value.headers = {"ETag": '"abc"', "Content-Length": "3"}
+    get = mocker.patch("requests.get")
+    source_manifest = manifest.SourceManifest(
+        "bucket", "manifest.json", {SOURCE_URL: {"etag": '"abc"', "size": "3"}}
+    )
+
+    downloaded = files.download_file(
+        SOURCE_URL, tmp_path / "source.csv.gz", source_manifest
+    )
+
+    assert downloaded is False
+    get.assert_not_called()
+
+
+def test_download_file_stages_changed_source_until_commit(
+    tmp_path: pathlib.Path, mocker
+):
+    head = mocker.patch("requests.head")
+    head.return_value.status_code = 200
+    head.return_value.headers = {"ETag": '"new"'}
+    get = mocker.patch("requests.get")
+    get.return_value.status_code = 200
+    get.return_value.__iter__.return_value = [b"abc"]
+    update_text = mocker.patch("pdp_transform.gcs.update_text_in_gcs")
+    source_manifest = manifest.SourceManifest(
+        "bucket", "manifest.json", {SOURCE_URL: {"etag": '"old"'}}
+    )
+
+    downloaded = files.download_file(
+        SOURCE_URL, tmp_path / "source.csv.gz", source_manifest
+    )
+
+    assert downloaded is True
+    assert source_manifest.entries[SOURCE_URL] == {"etag": '"old"'}
+    update_text.assert_not_called()
+
+    source_manifest.commit(SOURCE_URL)
+
+    assert source_manifest.entries[SOURCE_URL]["etag"] == '"new"'
+    update_text.assert_called_once()
+    assert update_text.call_args[0][:2] == ("bucket", "manifest.json")
+
+
+def test_stage_treats_identical_content_as_unchanged(tmp_path: pathlib.Path, mocker):
+    update_text = mocker.patch("pdp_transform.gcs.update_text_in_gcs")
+    local_file = tmp_path / "source.csv"
+    local_file.write_bytes(b"abc")
+    source_manifest = manifest.SourceManifest(
+        "bucket",
+        "manifest.json",
+        {SOURCE_URL: {"last_modified": "1", "md5": manifest.file_md5(local_file)}},
+    )
+
+    assert not source_manifest.stage(SOURCE_URL, {"last_modified": "2"}, local_file)
+    assert source_manifest.entries[SOURCE_URL]["last_modified"] == "2"
+    update_text.assert_called_once()
+    assert not local_file.exists()
+
+
+def test_unchanged_needs_a_fingerprint():
+    source_manifest = manifest.SourceManifest(
+        "bucket", "manifest.json", {SOURCE_URL: {"etag": '"abc"'}}
+    )
+
+    assert not source_manifest.unchanged(SOURCE_URL, {})
+    assert not source_manifest.unchanged("https://example.com/other", {"etag": "x"})
+    assert source_manifest.unchanged(SOURCE_URL, {"etag": '"abc"'})
+
+
+def test_commit_merges_only_its_entry_into_the_manifest(mocker):
+    stored = {"text": json.dumps({"https://example.com/other": {"etag": "x"}})}
+
+    def update_text_in_gcs(bucket_name, file_path, update):
+        stored["text"] = update(stored["text"])
+        return stored["text"]
+
+    mocker.patch("pdp_transform.gcs.update_text_in_gcs", update_text_in_gcs)
+    source_manifest = manifest.SourceManifest("bucket", "manifest.json", {})
+    source_manifest.pending[SOURCE_URL] = {"etag": '"new"'}
+
+    source_manifest.commit(SOURCE_URL)
+
+    assert json.loads(stored["text"]) == {
+        "https://example.com/other": {"etag": "x"},
+        SOURCE_URL: {"etag": '"new"'},
+    }
+
+
+class FakeFTP:
+    """Answers like vsftpd, which refuses SIZE outside binary mode"""
+
+    def __init__(self, host, timeout=None):
+        self.binary = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def login(self, user, passwd):
+        pass
+
+    def cwd(self, path):
+        pass
+
+    def voidcmd(self, cmd):
+        self.binary = cmd == "TYPE I"
+
+    def size(self, filename):
+        if not self.binary:
+            raise ftplib.error_perm("550 SIZE not allowed in ASCII mode.")
+        return 1024
+
+    def sendcmd(self, cmd):
+        return "213 20220131120000"
+
+
+def test_ftp_fingerprint_asks_for_size_in_binary_mode(mocker):
+    mocker.patch("ftplib.FTP", FakeFTP)
+
+    fingerprint = manifest.ftp_fingerprint("ftp.example.com", "/pub", "2022.csv.gz")
+
+    assert fingerprint == {"last_modified": "20220131120000", "size": "1024"}
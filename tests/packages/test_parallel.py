@@ -0,0 +1,138 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import threading
+import time
+
+import pandas as pd
+import pytest
+from pdp_transform import parallel
+
+
+def add_pid(df: pd.DataFrame) -> pd.DataFrame:
+    df["pid"] = os.getpid()
+    return df
+
+
+def test_map_ordered_keeps_input_order_across_workers():
+    chunks = [pd.DataFrame({"n": range(i * 10, i * 10 + 10)}) for i in range(8)]
+
+    results = list(parallel.map_ordered(add_pid, chunks, workers=2))
+
+    assert [df["n"].iloc[0] for df in results] == [i * 10 for i in range(8)]
+    assert all(df["pid"].iloc[0] != os.getpid() for df in results)
+
+
+def test_map_ordered_runs_in_process_with_a_single_worker():
+    results = list(parallel.map_ordered(add_pid, [pd.DataFrame({"n": [1]})]))
+
+    assert results[0]["pid"].iloc[0] == os.getpid()
+
+
+def test_map_ordered_reads_ahead_at_most_max_in_flight_items():
+    read = []
+
+    def items():
+        for i in range(10):
+            read.append(i)
+            yield pd.DataFrame({"n": [i]})
+
+    results = parallel.map_ordered(add_pid, items(), workers=2, max_in_flight=3)
+    first = next(results)
+
+    assert first["n"].iloc[0] == 0
+    assert len(read) == 3
+    assert len(list(results)) == 9
+
+
+def test_run_pipelined_overlaps_periods_but_keeps_stage_order():
+    events = []
+    lock = threading.Lock()
+
+    def stage(name):
+        def run(period):
+            with lock:
+                events.append((name, period, "start"))
+            time.sleep(0.05)
+            with lock:
+                events.append((name, period, "end"))
+            return period
+
+        return run
+
+    results = parallel.run_pipelined(
+        [1, 2, 3], [stage("download"), stage("load")], max_in_flight=2
+    )
+
+    assert results == [1, 2, 3]
+    downloads = [p for name, p, step in events if name == "download" and step == "end"]
+    loads = [p for name, p, step in events if name == "load" and step == "end"]
+    assert downloads == loads == [1, 2, 3]
+    assert events.index(("download", 2, "start")) < events.index(("load", 1, "end"))
+
+
+def test_run_pipelined_skips_later_stages_when_a_stage_returns_none():
+    loaded = []
+
+    results = parallel.run_pipelined(
+        [1, 2, 3],
+        [lambda period: None if period == 2 else period, loaded.append],
+        max_in_flight=3,
+    )
+
+    assert loaded == [1, 3]
+    assert results == [None, None, None]
+
+
+def test_run_pipelined_raises_stage_errors():
+    def fail(period):
+        raise ValueError(period)
+
+    with pytest.raises(ValueError):
+        parallel.run_pipelined([1], [lambda period: period, fail])
+
+
+def test_run_in_batches_passes_results_in_batches():
+    batches = []
+
+    parallel.run_in_batches(
+        lambda item: item * 2, range(5), batches.append, batch_size=2, workers=2
+    )
+
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert sorted(sum(batches, [])) == [0, 2, 4, 6, 8]
+
+
+def test_run_in_batches_reports_finished_work_after_a_failure_partway_through():
+    slow_started = threading.Event()
+    batches = []
+
+    def transfer(item):
+        if item == "slow":
+            slow_started.set()
+            time.sleep(0.2)
+            return item
+        if item == "bad":
+            slow_started.wait()
+            raise ValueError(item)
+        return item
+
+    with pytest.raises(ValueError):
+        parallel.run_in_batches(
+            transfer, ["fast", "slow", "bad"], batches.append, batch_size=2, workers=3
+        )
+
+    # "slow" was still running when "bad" failed, and is recorded all the same
+    assert sorted(sum(batches, [])) == ["fast", "slow"]
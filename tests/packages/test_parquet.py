@@ -0,0 +1,133 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import datetime
+import decimal
+import pathlib
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from pdp_transform import files, parquet
+
+SCHEMA_FIELDS = [
+    {"name": "id", "type": "STRING", "mode": "REQUIRED"},
+    {"name": "count", "type": "INTEGER", "mode": "NULLABLE"},
+    {"name": "amount", "type": "NUMERIC", "mode": "NULLABLE"},
+    {"name": "active", "type": "BOOLEAN", "mode": "NULLABLE"},
+    {"name": "date", "type": "DATE", "mode": "NULLABLE"},
+    {"name": "updated", "type": "DATETIME", "mode": "NULLABLE"},
+]
+
+
+def test_parquet_chunk_writer_types_columns_from_schema(tmp_path: pathlib.Path):
+    target_file = tmp_path / "output.parquet"
+    df = pd.DataFrame(
+        {
+            "station": ["A", "B"],
+            "n": ["1", ""],
+            "amt": ["1.25", ""],
+            "flag": ["True", "false"],
+            "dt": ["2022-01-31", ""],
+            "ts": ["2022-01-31 10:00:00", "2022-02-01 00:00:00"],
+        }
+    )
+
+    with files.chunk_writer(target_file, "PARQUET", SCHEMA_FIELDS) as writer:
+        writer.write(df)
+        writer.write(df)
+
+    table = pq.read_table(target_file)
+    assert table.schema.names == [field["name"] for field in SCHEMA_FIELDS]
+    assert table.num_rows == 4
+    assert table.column("count").to_pylist()[:2] == [1, None]
+    assert table.column("amount").to_pylist()[:2] == [decimal.Decimal("1.25"), None]
+    assert table.column("active").to_pylist()[:2] == [True, False]
+    assert table.column("date").to_pylist()[:2] == [datetime.date(2022, 1, 31), None]
+    assert table.column("updated").to_pylist()[0] == datetime.datetime(2022, 1, 31, 10)
+
+
+def test_dataframe_to_table_raises_on_malformed_values():
+    schema = parquet.bigquery_to_arrow_schema(SCHEMA_FIELDS)
+    df = pd.DataFrame(
+        {
+            "id": ["A", "B", "C"],
+            "count": ["1", "", "two"],
+            "amount": ["1.5", "", ""],
+            "active": ["true", "", ""],
+            "date": ["", "", ""],
+            "updated": ["", "", ""],
+        }
+    )
+
+    with pytest.raises(ValueError, match=r"1 values of column `count`.*\['two'\]"):
+        parquet.dataframe_to_table(df, schema)
+
+
+@pytest.mark.parametrize(
+    "arrow_type, value",
+    [
+        (pa.float64(), "1.2.3"),
+        (pa.bool_(), "maybe"),
+        (pa.date32(), "2022-13-45"),
+        (pa.timestamp("us"), "yesterday"),
+        (pa.time64("us"), "25:00:00"),
+    ],
+)
+def test_to_arrow_array_does_not_turn_malformed_values_into_nulls(arrow_type, value):
+    with pytest.raises(ValueError, match=value):
+        parquet.to_arrow_array(pd.Series(["", value], name="col"), arrow_type)
+
+
+def test_dataframe_to_table_raises_on_column_count_mismatch():
+    schema = parquet.bigquery_to_arrow_schema(SCHEMA_FIELDS)
+
+    with pytest.raises(ValueError):
+        parquet.dataframe_to_table(pd.DataFrame({"id": ["A"]}), schema)
+
+
+def test_to_arrow_array_keeps_decimals_exact():
+    col = pd.Series(["123456789012345678.123456789", " 1e3 ", "1.0000000005", ""])
+
+    numeric = parquet.to_arrow_array(col, pa.decimal128(38, 9)).to_pylist()
+    bignumeric = parquet.to_arrow_array(col, pa.decimal256(76, 38)).to_pylist()
+
+    assert numeric == [
+        decimal.Decimal("123456789012345678.123456789"),
+        decimal.Decimal("1000"),
+        decimal.Decimal("1.000000001"),
+        None,
+    ]
+    assert bignumeric[0] == decimal.Decimal("123456789012345678.123456789")
+
+
+def test_to_arrow_array_raises_on_decimals_out_of_range():
+    with pytest.raises(pa.ArrowInvalid):
+        parquet.to_arrow_array(pd.Series(["1", "1e30"]), pa.decimal128(38, 9))
+
+
+def test_output_file_path_swaps_suffix_for_parquet():
+    assert files.output_file_path("files/data_output.csv", "CSV") == (
+        "files/data_output.csv"
+    )
+    assert files.output_file_path("data/noaa/data_output.csv", "PARQUET") == (
+        "data/noaa/data_output.parquet"
+    )
+
+
+def test_chunk_writer_raises_on_unknown_output_format(tmp_path: pathlib.Path):
+    with pytest.raises(ValueError):
+        files.chunk_writer(tmp_path / "output.avro", "AVRO")
@@ -0,0 +1,178 @@
+# Copyright 2022 Google LLC
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+import pandas as pd
+import pytest
+from pdp_transform import transforms
+
+
+@pytest.fixture
+def df() -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "id": ["A1", "", "B2"],
+            "date": ["20220131", "", "nan"],
+            "textdata": ["US United States  ", "AL Albania", "FR France"],
+        }
+    )
+
+
+def test_slice_column_extracts_and_strips_fixed_width_fields(df: pd.DataFrame):
+    df = transforms.slice_column(
+        df, {"code": ["textdata", "0", "2"], "name": ["textdata", "3", ""]}
+    )
+
+    assert df["code"].tolist() == ["US", "AL", "FR"]
+    assert df["name"].tolist() == ["United States", "Albania", "France"]
+
+
+def test_filter_null_rows_drops_blank_values(df: pd.DataFrame):
+    df = transforms.filter_null_rows(df, ["id"])
+
+    assert df["id"].tolist() == ["A1", "B2"]
+
+
+def test_convert_date_format_passes_through_empty_values(df: pd.DataFrame):
+    df = transforms.convert_date_format(df, {"date": ["%Y%m%d", "%Y-%m-%d"]})
+
+    assert df["date"].tolist() == ["2022-01-31", "", "nan"]
+
+
+def test_convert_date_format_raises_on_invalid_dates():
+    df = pd.DataFrame({"date": ["2022-13-45"]})
+
+    with pytest.raises(ValueError):
+        transforms.convert_date_format(df, {"date": ["%Y%m%d", "%Y-%m-%d"]})
+
+
+def test_normalize_datetime_tries_formats_in_order():
+    col = pd.Series(
+        ["01/31/2022 9:05", "01/31/2022 09:05:00", "2022-01-31 09:05", "NaT", None]
+    )
+
+    result = transforms.normalize_datetime(
+        col, ["%m/%d/%Y %H:%M", "%m/%d/%Y %H:%M:%S", "%Y-%m-%d %H:%M"]
+    )
+
+    assert result.tolist() == ["2022-01-31 09:05:00"] * 3 + ["", ""]
+
+
+def test_normalize_datetime_infers_leftovers_with_none_format():
+    col = pd.Series(["2022-01-31", "January 31, 2022"])
+
+    result = transforms.normalize_datetime(col, ["%Y-%m-%d", None], "%Y-%m-%d")
+
+    assert result.tolist() == ["2022-01-31", "2022-01-31"]
+
+
+def test_normalize_datetime_infers_formats_in_one_pass_before_each_value(mocker):
+    col = pd.Series(
+        ["2022-01-31 10:00", "2022-02-01 11:30", "31.01.2022", "Feb 2, 2022", ""]
+    )
+    parse_each = mocker.spy(transforms, "_parse_each")
+
+    result = transforms.normalize_datetime(col, ["%d.%m.%Y", None], "%Y-%m-%d %H:%M")
+
+    assert result.tolist() == [
+        "2022-01-31 10:00",
+        "2022-02-01 11:30",
+        "2022-01-31 00:00",
+        "2022-02-02 00:00",
+        "",
+    ]
+    assert parse_each.call_args[0][0].tolist() == ["Feb 2, 2022"]
+
+
+def test_normalize_datetime_treats_null_values_as_blank():
+    col = pd.Series(["01312022", "-"])
+
+    result = transforms.normalize_datetime(col, "%m%d%Y", "%Y-%m-%d", null_values=["-"])
+
+    assert result.tolist() == ["2022-01-31", ""]
+
+
+def test_normalize_datetime_raises_on_unmatched_values():
+    col = pd.Series(["2022-01-31", "31.01.2022"])
+
+    with pytest.raises(ValueError, match="31.01.2022"):
+        transforms.normalize_datetime(col, ["%Y-%m-%d"])
+
+    result = transforms.normalize_datetime(
+        col, ["%Y-%m-%d"], "%Y-%m-%d", errors="coerce"
+    )
+    assert result.tolist() == ["2022-01-31", ""]
+
+
+def test_apply_regex_replaces_matches():
+    df = pd.DataFrame({"lat": ["+12.500  ", "   ", "-0.1"]})
+
+    df = transforms.apply_regex(df, {"lat": [r"^(\+\d+\.\d+[0-9])\s+", r"\1", "True"]})
+
+    assert df["lat"].tolist() == ["+12.500", "   ", "-0.1"]
+
+
+def test_generate_location_builds_wkt_or_geojson():
+    df = pd.DataFrame({"lon": [-97.5], "lat": [35.25]})
+
+    df = transforms.generate_location(
+        df, {"wkt": ["lon", "lat"], "geojson": ["lon", "lat", "GEOJSON"]}
+    )
+
+    assert df["wkt"].tolist() == ["POINT(-97.5 35.25)"]
+    assert df["geojson"].tolist() == [
+        '{"type": "Point", "coordinates": [-97.5, 35.25]}'
+    ]
+
+
+def test_generate_location_blanks_invalid_coordinates_when_coercing(caplog):
+    df = pd.DataFrame({"lon": [-97.5, 35.25], "lat": [35.25, -197.5]})
+
+    with pytest.raises(ValueError):
+        transforms.generate_location(df.copy(), {"wkt": ["lon", "lat"]})
+    df = transforms.generate_location(df, {"wkt": ["lon", "lat"]}, errors="coerce")
+
+    assert df["wkt"].tolist() == ["POINT(-97.5 35.25)", ""]
+    assert "Blanked 1 points" in caplog.text
+
+
+def test_apply_transforms_runs_steps_in_order(df: pd.DataFrame):
+    df = transforms.apply_transforms(
+        df,
+        ["filter_null_rows", "rename_headers", "add_metadata_cols", "reorder_headers"],
+        null_rows_list=["id"],
+        rename_headers_list={"id": "station_id"},
+        reorder_headers_list=["station_id", "source_url"],
+        source_url="https://example.com/data.csv",
+    )
+
+    assert df.columns.tolist() == ["station_id", "source_url"]
+    assert df["station_id"].tolist() == ["A1", "B2"]
+    assert (df["source_url"] == "https://example.com/data.csv").all()
+
+
+def test_apply_transforms_accepts_image_specific_transforms(df: pd.DataFrame):
+    custom = {
+        **transforms.TRANSFORMS,
+        "upper_id": (lambda df, _: df.assign(id=df["id"].str.upper()), "unused"),
+    }
+
+    df = transforms.apply_transforms(df, ["upper_id"], transforms=custom, unused=None)
+
+    assert df["id"].tolist() == ["A1", "", "B2"]
+
+
+def test_apply_transforms_raises_on_unknown_transform(df: pd.DataFrame):
+    with pytest.raises(ValueError):
+        transforms.apply_transforms(df, ["does_not_exist"])
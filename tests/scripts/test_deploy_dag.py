@@ -115,7 +115,9 @@ def setup_dag_and_variables(
     copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
 
     # Optimize test runtimes by skipping code formatting
-    mocker.patch("scripts.generate_dag.format_python_code")
+    mocker.patch(
+        "scripts.generate_dag.format_python_code", side_effect=lambda code: code
+    )
 
     generate_dag.main(
         dataset_id=dataset_path.name, pipeline_id=pipeline_path.name, env=env
@@ -183,7 +185,7 @@ def test_script_can_deploy_without_variables_files(
         / f"{dataset_path.name}_variables.json"
     ).exists()
 
-    mocker.patch("scripts.deploy_dag.run_gsutil_cmd")
+    mocker.patch("scripts.deploy_dag.upload_to_composer_bucket")
     mocker.patch("scripts.deploy_dag.run_cloud_composer_vars_import")
     mocker.patch("scripts.deploy_dag.composer_airflow_version", return_value=2)
 
@@ -235,7 +237,7 @@ def test_vars_yaml_generates_pipeline_vars_json_file(
 
     # Patch remote calls
     mocker.patch("scripts.deploy_dag.run_cloud_composer_vars_import")
-    mocker.patch("scripts.deploy_dag.run_gsutil_cmd")
+    mocker.patch("scripts.deploy_dag.upload_to_composer_bucket")
     mocker.patch("scripts.deploy_dag.composer_airflow_version", return_value=2)
 
     deploy_dag.main(
@@ -292,7 +294,7 @@ def test_vars_not_imported_to_composer_when_local_and_remote_vars_are_equal(
 
     # Patch remote calls
     mocker.patch("scripts.deploy_dag.run_cloud_composer_vars_import")
-    mocker.patch("scripts.deploy_dag.run_gsutil_cmd")
+    mocker.patch("scripts.deploy_dag.upload_to_composer_bucket")
     mocker.patch("scripts.deploy_dag.composer_airflow_version", return_value=2)
 
     deploy_dag.main(
@@ -336,7 +338,7 @@ def test_vars_not_imported_to_composer_when_local_and_remote_vars_are_null(
 
     # Patch remote calls
     mocker.patch("scripts.deploy_dag.run_cloud_composer_vars_import")
-    mocker.patch("scripts.deploy_dag.run_gsutil_cmd")
+    mocker.patch("scripts.deploy_dag.upload_to_composer_bucket")
     mocker.patch("scripts.deploy_dag.composer_airflow_version", return_value=2)
 
     deploy_dag.main(
@@ -381,7 +383,7 @@ def test_vars_not_imported_to_composer_when_local_vars_are_null_but_remote_vars_
 
     # Patch remote calls
     mocker.patch("scripts.deploy_dag.run_cloud_composer_vars_import")
-    mocker.patch("scripts.deploy_dag.run_gsutil_cmd")
+    mocker.patch("scripts.deploy_dag.upload_to_composer_bucket")
     mocker.patch("scripts.deploy_dag.composer_airflow_version", return_value=2)
 
     deploy_dag.main(
@@ -426,7 +428,7 @@ def test_resulting_vars_when_user_gets_prompted_and_chooses_remote_vars(
 
     # Patch remote calls
     mocker.patch("scripts.deploy_dag.run_cloud_composer_vars_import")
-    mocker.patch("scripts.deploy_dag.run_gsutil_cmd")
+    mocker.patch("scripts.deploy_dag.upload_to_composer_bucket")
     mocker.patch("scripts.deploy_dag.composer_airflow_version", return_value=2)
 
     # User chooses to use remote variable
@@ -475,7 +477,7 @@ def test_resulting_vars_when_user_gets_prompted_and_chooses_local_vars(
 
     # Patch remote calls
     mocker.patch("scripts.deploy_dag.run_cloud_composer_vars_import")
-    mocker.patch("scripts.deploy_dag.run_gsutil_cmd")
+    mocker.patch("scripts.deploy_dag.upload_to_composer_bucket")
     mocker.patch("scripts.deploy_dag.composer_airflow_version", return_value=2)
 
     # User chooses to use local variable
@@ -524,7 +526,7 @@ def test_resulting_vars_when_user_gets_prompted_and_chooses_to_merge_local_and_r
 
     # Patch remote calls
     mocker.patch("scripts.deploy_dag.run_cloud_composer_vars_import")
-    mocker.patch("scripts.deploy_dag.run_gsutil_cmd")
+    mocker.patch("scripts.deploy_dag.upload_to_composer_bucket")
     mocker.patch("scripts.deploy_dag.composer_airflow_version", return_value=2)
 
     # User chooses to merge local and remote variables
@@ -817,3 +819,130 @@ def test_script_without_composer_env_or_region_fails(env: str):
             ],
             cwd=deploy_dag.PROJECT_ROOT,
         )
+
+
+class FakeBlob:
+    def __init__(self, bucket, name, md5_hash=None):
+        self.bucket = bucket
+        self.name = name
+        self.md5_hash = md5_hash
+
+    def upload_from_filename(self, filename):
+        self.bucket.uploads.append(self.name)
+        self.bucket.objects[self.name] = deploy_dag.file_md5(pathlib.Path(filename))
+
+
+class FakeBucket:
+    """Stands in for a GCS bucket, keeping the MD5 of each object"""
+
+    def __init__(self, objects=None):
+        self.objects = dict(objects or {})
+        self.uploads, self.listed_prefixes = [], []
+
+    def blob(self, name):
+        return FakeBlob(self, name)
+
+    def list_blobs(self, prefix, delimiter):
+        self.listed_prefixes.append(prefix)
+        return [
+            FakeBlob(self, name, md5_hash)
+            for name, md5_hash in self.objects.items()
+            if name.startswith(prefix) and delimiter not in name[len(prefix) :]
+        ]
+
+
+class FakeStorageClient:
+    def __init__(self, bucket: FakeBucket):
+        self._bucket = bucket
+
+    def bucket(self, name):
+        return self._bucket
+
+
+def test_upload_to_composer_bucket_skips_files_whose_md5_matches(
+    tmp_path: pathlib.Path,
+):
+    uploads = []
+    for name in ("a_dag.py", "b_dag.py", "c_dag.py"):
+        (tmp_path / name).write_text(f"# {name}\n")
+        uploads.append((tmp_path / name, f"dags/ds__{name}"))
+    bucket = FakeBucket(
+        {
+            "dags/ds__a_dag.py": deploy_dag.file_md5(tmp_path / "a_dag.py"),
+            "dags/ds__b_dag.py": "outdated",
+        }
+    )
+
+    uploaded = deploy_dag.upload_to_composer_bucket(
+        uploads, "bucket", max_workers=2, client=FakeStorageClient(bucket)
+    )
+
+    assert sorted(uploaded) == ["dags/ds__b_dag.py", "dags/ds__c_dag.py"]
+    assert sorted(bucket.uploads) == sorted(uploaded)
+    assert bucket.listed_prefixes == ["dags/"]
+
+
+def test_script_uploads_files_of_all_pipelines_in_one_batch(
+    dataset_path: pathlib.Path,
+    pipeline_path: pathlib.Path,
+    pipeline_path_2: pathlib.Path,
+    env: str,
+    mocker,
+):
+    for _pipeline_path in (pipeline_path, pipeline_path_2):
+        setup_dag_and_variables(
+            dataset_path,
+            _pipeline_path,
+            env,
+            f"{dataset_path.name}_variables.json",
+            mocker,
+        )
+    custom_dir = ENV_DATASETS_PATH / dataset_path.name / "pipelines"
+    custom_dir = custom_dir / pipeline_path.name / "custom"
+    custom_dir.mkdir(parents=True, exist_ok=True)
+    (custom_dir / "callables.py").write_text("def run():\n    pass\n")
+    (custom_dir / "__pycache__").mkdir(exist_ok=True)
+    (custom_dir / "__pycache__" / "callables.cpython-38.pyc").write_bytes(b"")
+
+    bucket = FakeBucket()
+    mocker.patch("scripts.deploy_dag.check_and_configure_airflow_variables")
+    mocker.patch("scripts.deploy_dag.composer_airflow_version", return_value=2)
+    mocker.patch(
+        "scripts.deploy_dag.storage_client", return_value=FakeStorageClient(bucket)
+    )
+    mocker.spy(deploy_dag, "upload_to_composer_bucket")
+
+    deploy_dag.main(
+        env_path=ENV_PATH,
+        dataset_id=dataset_path.name,
+        composer_env="test-env",
+        composer_bucket="test-bucket",
+        composer_region="test-region",
+        pipeline=None,
+    )
+
+    deploy_dag.upload_to_composer_bucket.assert_called_once()
+    assert sorted(bucket.uploads) == sorted(
+        [
+            f"dags/{dataset_path.name}__{pipeline_path.name}_dag.py",
+            f"dags/{dataset_path.name}__{pipeline_path_2.name}_dag.py",
+            f"dags/{dataset_path.name}/{pipeline_path.name}/custom/callables.py",
+        ]
+    )
+
+
+def test_composer_environment_is_fetched_once_per_run(mocker):
+    environment = mocker.MagicMock()
+    environment.config.dag_gcs_prefix = "gs://us-composer-bucket/dags"
+    environment.config.software_config.image_version = (
+        "composer-1.17.0-preview.8-airflow-2.1.1"
+    )
+    mocker.patch("scripts.deploy_dag.get_gcp_project", return_value="project")
+    client = mocker.patch("scripts.deploy_dag.service_v1beta1.EnvironmentsClient")
+    client.return_value.get_environment.return_value = environment
+    deploy_dag.get_composer_environment.cache_clear()
+
+    assert deploy_dag.get_composer_bucket("env", "region") == "us-composer-bucket"
+    assert deploy_dag.composer_airflow_version("env", "region") == 2
+    client.return_value.get_environment.assert_called_once()
+    deploy_dag.get_composer_environment.cache_clear()
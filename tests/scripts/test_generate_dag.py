@@ -14,11 +14,14 @@
 
 
 import json
+import os
 import pathlib
 import random
 import shutil
 import subprocess
 import tempfile
+import threading
+import time
 import typing
 
 import pytest
@@ -101,6 +104,62 @@ def env() -> str:
     return "test"
 
 
+@pytest.fixture(autouse=True)
+def default_registry(mocker) -> str:
+    # Resolving the default registry needs GCP credentials
+    registry = "gcr.io/test-project"
+    mocker.patch("scripts.generate_dag.default_registry", return_value=registry)
+    return registry
+
+
+class FakeRegistry:
+    """Stands in for Docker and a registry, answering the commands
+    `generate_dag.run_build_command` is given"""
+
+    def __init__(self, build_seconds: float = 0, failing_images: tuple = ()):
+        self.images, self.local_images = set(), set()
+        self.commands, self.configs = [], []
+        self.build_seconds, self.failing_images = build_seconds, failing_images
+        self.active_builds = self.max_active_builds = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, command, cwd, check=True):
+        self.commands.append(command)
+        returncode = 0
+        if command[:2] == ["docker", "build"]:
+            returncode = self.build(cwd, command[3::2])
+        elif command[:3] == ["gcloud", "builds", "submit"]:
+            config = json.loads(pathlib.Path(command[4]).read_text())
+            self.configs.append(config)
+            returncode = self.build(cwd, config["images"])
+            self.images.update(config["images"])
+        elif command[:2] == ["docker", "push"]:
+            returncode = 0 if command[2] in self.local_images else 1
+            self.images.add(command[2])
+        elif command[:2] in (["docker", "manifest"], ["gcloud", "container"]):
+            if command[3] == "add-tag":
+                self.images.add(command[-1])
+            else:
+                returncode = 0 if command[-1] in self.images else 1
+        elif command[:2] == ["docker", "tag"]:
+            self.local_images.add(command[3])
+        if check and returncode:
+            raise subprocess.CalledProcessError(returncode, command, "build failed")
+        return subprocess.CompletedProcess(command, returncode, "")
+
+    def build(self, image_dir: pathlib.Path, image_uris: typing.List[str]) -> int:
+        with self.lock:
+            self.active_builds += 1
+            self.max_active_builds = max(self.max_active_builds, self.active_builds)
+        time.sleep(self.build_seconds)
+        with self.lock:
+            self.active_builds -= 1
+        if image_dir.name in self.failing_images:
+            return 1
+        self.local_images.update(image_uris)
+        return 0
+
+
 def test_tf_templates_exist():
     for _, filepath in generate_dag.TEMPLATE_PATHS.items():
         assert filepath.exists()
@@ -151,6 +210,46 @@ def test_main_copies_custom_dir_if_it_exists(
         assert (path_prefix / "custom").is_dir()
 
 
+def test_main_formats_dag_files(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+
+    generate_dag.main(dataset_path.name, pipeline_path.name, env)
+
+    dag_contents = (pipeline_path / f"{pipeline_path.name}_dag.py").read_text()
+    assert generate_dag.format_python_code(dag_contents) == dag_contents
+
+
+def test_main_does_not_rewrite_unchanged_dag_files(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+    dag_path = pipeline_path / f"{pipeline_path.name}_dag.py"
+    os.utime(dag_path, (0, 0))
+
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+
+    assert dag_path.stat().st_mtime == 0
+
+
+def test_generate_all_pipeline_dags_generates_dag_files_in_parallel(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+
+    generate_dag.generate_all_pipeline_dags(
+        [dataset_path.name], env, format_code=False, max_workers=2
+    )
+
+    for path_prefix in (
+        pipeline_path,
+        ENV_DATASETS_PATH / dataset_path.name / "pipelines" / pipeline_path.name,
+    ):
+        assert (path_prefix / f"{pipeline_path.name}_dag.py").exists()
+
+
 def test_main_raises_an_error_when_airflow_version_is_not_specified(
     dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str
 ):
@@ -272,6 +371,36 @@ def test_checks_for_task_operator_and_id():
             generate_dag.validate_task(non_existing_task_id, airflow_version)
 
 
+def test_checks_for_csv_only_args_on_non_csv_gcs_to_bq_loads():
+    for airflow_version in AIRFLOW_VERSIONS:
+        parquet_task = {
+            "operator": "GoogleCloudStorageToBigQueryOperator",
+            "args": {"task_id": "load_gcs_to_bq", "source_format": "PARQUET"},
+        }
+        generate_dag.validate_task(parquet_task, airflow_version)
+
+        csv_task = {
+            "operator": "GoogleCloudStorageToBigQueryOperator",
+            "args": {
+                "task_id": "load_gcs_to_bq",
+                "source_format": "CSV",
+                "skip_leading_rows": 1,
+            },
+        }
+        generate_dag.validate_task(csv_task, airflow_version)
+
+        parquet_task_with_csv_args = {
+            "operator": "GoogleCloudStorageToBigQueryOperator",
+            "args": {
+                "task_id": "load_gcs_to_bq",
+                "source_format": "PARQUET",
+                "skip_leading_rows": 1,
+            },
+        }
+        with pytest.raises(ValueError):
+            generate_dag.validate_task(parquet_task_with_csv_args, airflow_version)
+
+
 def test_check_custom_yaml_loader(
     dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str
 ):
@@ -414,8 +543,11 @@ def test_build_images_called_when_dataset_has_images_dir(
     generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
 
     async_builds_default = False
-    generate_dag.build_images.assert_called_once_with(
-        dataset_path.name, env, async_builds_default
+    generate_dag.build_images.assert_called_once()
+    assert generate_dag.build_images.call_args[0][:3] == (
+        dataset_path.name,
+        env,
+        async_builds_default,
     )
 
 
@@ -429,8 +561,11 @@ def test_build_images_called_with_async_false_by_default(
     generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
 
     async_builds_default = False
-    generate_dag.build_images.assert_called_once_with(
-        dataset_path.name, env, async_builds_default
+    generate_dag.build_images.assert_called_once()
+    assert generate_dag.build_images.call_args[0][:3] == (
+        dataset_path.name,
+        env,
+        async_builds_default,
     )
 
 
@@ -450,8 +585,11 @@ def test_build_images_called_with_async_builds(
         format_code=False,
     )
 
-    generate_dag.build_images.assert_called_once_with(
-        dataset_path.name, env, async_builds
+    generate_dag.build_images.assert_called_once()
+    assert generate_dag.build_images.call_args[0][:3] == (
+        dataset_path.name,
+        env,
+        async_builds,
     )
 
 
@@ -488,3 +626,199 @@ def test_build_and_push_image_not_called_when_no_image_dirs_exist(
     mocker.patch("scripts.generate_dag.build_and_push_image")
     generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
     assert not generate_dag.build_and_push_image.called
+
+
+def test_build_images_copies_shared_packages_referenced_by_dockerfile(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str, mocker
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+    generate_image_files(dataset_path, num_containers=2)
+    (dataset_path / "pipelines" / "_images" / "test_image_1" / "Dockerfile").write_text(
+        "COPY ./pdp_transform ./pdp_transform\n"
+    )
+
+    mocker.patch("scripts.generate_dag.build_and_push_image")
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+
+    images_dir = ENV_DATASETS_PATH / dataset_path.name / "pipelines" / "_images"
+    assert (images_dir / "test_image_1" / "pdp_transform" / "setup.py").exists()
+    assert not (images_dir / "test_image_2" / "pdp_transform").exists()
+
+
+def test_main_skips_pipelines_unchanged_since_last_generated(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str, mocker
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+
+    mocker.spy(generate_dag, "generate_pipeline_dag")
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+    assert not generate_dag.generate_pipeline_dag.called
+
+    generate_dag.main(
+        dataset_path.name, pipeline_path.name, env, format_code=False, use_cache=False
+    )
+    assert generate_dag.generate_pipeline_dag.call_count == 1
+
+
+def test_main_regenerates_pipelines_when_their_inputs_change(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str, mocker
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+    mocker.spy(generate_dag, "generate_pipeline_dag")
+
+    pipeline_yaml = pipeline_path / "pipeline.yaml"
+    pipeline_yaml.write_text(pipeline_yaml.read_text() + "\n# changed\n")
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+    assert generate_dag.generate_pipeline_dag.call_count == 1
+
+    (ENV_DATASETS_PATH / dataset_path.name / "pipelines" / pipeline_path.name).joinpath(
+        f"{pipeline_path.name}_dag.py"
+    ).unlink()
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+    assert generate_dag.generate_pipeline_dag.call_count == 2
+
+
+def test_build_images_rebuilds_only_images_whose_build_context_changed(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str, mocker
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+    generate_image_files(dataset_path, num_containers=2)
+    mocker.patch("scripts.generate_dag.build_and_push_image")
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+    assert generate_dag.build_and_push_image.call_count == 2
+
+    (dataset_path / "pipelines" / "_images" / "test_image_1" / "Dockerfile").write_text(
+        "FROM python:3.8\n"
+    )
+    generate_dag.main(dataset_path.name, pipeline_path.name, env, format_code=False)
+
+    assert generate_dag.build_and_push_image.call_count == 3
+    assert generate_dag.build_and_push_image.call_args[0][1].name == "test_image_1"
+    cache = json.loads((ENV_PATH / generate_dag.GENERATE_CACHE_FILE).read_text())
+    assert f"{dataset_path.name}/test_image_1" in cache["images"]
+    assert f"{dataset_path.name}/{pipeline_path.name}" in cache["pipelines"]
+
+
+def test_build_and_push_image_pushes_content_and_latest_tags(
+    dataset_path: pathlib.Path, mocker
+):
+    generate_image_files(dataset_path)
+    image_dir = dataset_path / "pipelines" / "_images" / "test_image_1"
+    registry = FakeRegistry()
+    mocker.patch("scripts.generate_dag.run_build_command", registry)
+
+    status = generate_dag.build_and_push_image(
+        "ds", image_dir, registry="localhost:5000", image_builder="docker"
+    )
+
+    content_tag = generate_dag.image_content_tag(image_dir)
+    assert status == "built"
+    assert registry.images == {
+        f"localhost:5000/ds__test_image_1:{content_tag}",
+        "localhost:5000/ds__test_image_1:latest",
+    }
+
+
+def test_build_and_push_image_retags_images_already_in_the_registry(
+    dataset_path: pathlib.Path, mocker
+):
+    generate_image_files(dataset_path)
+    image_dir = dataset_path / "pipelines" / "_images" / "test_image_1"
+    registry = FakeRegistry()
+    registry.images.add("localhost:5000/ds__test_image_1:abc")
+    mocker.patch("scripts.generate_dag.run_build_command", registry)
+
+    status = generate_dag.build_and_push_image(
+        "ds", image_dir, content_tag="abc", registry="localhost:5000"
+    )
+
+    assert status == "retagged"
+    assert "localhost:5000/ds__test_image_1:latest" in registry.images
+    assert not any(command[:2] == ["gcloud", "builds"] for command in registry.commands)
+
+
+def test_build_and_push_image_submits_async_cloud_builds_of_both_tags(
+    dataset_path: pathlib.Path, mocker
+):
+    generate_image_files(dataset_path)
+    image_dir = dataset_path / "pipelines" / "_images" / "test_image_1"
+    registry = FakeRegistry()
+    mocker.patch("scripts.generate_dag.run_build_command", registry)
+
+    status = generate_dag.build_and_push_image(
+        "ds", image_dir, async_builds=True, content_tag="abc", registry="gcr.io/p"
+    )
+
+    assert status == "submitted"
+    assert "--async" in registry.commands[-1]
+    assert registry.configs[0]["images"] == [
+        "gcr.io/p/ds__test_image_1:abc",
+        "gcr.io/p/ds__test_image_1:latest",
+    ]
+
+
+def test_build_images_runs_up_to_max_builds_at_a_time(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str, mocker
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+    generate_image_files(dataset_path, num_containers=3)
+    registry = FakeRegistry(build_seconds=0.2)
+    mocker.patch("scripts.generate_dag.run_build_command", registry)
+
+    generate_dag.build_images(
+        dataset_path.name,
+        env,
+        False,
+        registry="localhost:5000",
+        image_builder="docker",
+        max_builds=2,
+    )
+
+    assert registry.max_active_builds == 2
+    assert len(registry.images) == 6
+
+
+def test_build_images_reports_failed_builds_after_the_others_finish(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str, mocker
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+    generate_image_files(dataset_path, num_containers=2)
+    registry = FakeRegistry(failing_images=("test_image_1",))
+    mocker.patch("scripts.generate_dag.run_build_command", registry)
+    cache = generate_dag.empty_generate_cache()
+
+    with pytest.raises(RuntimeError, match="test_image_1"):
+        generate_dag.build_images(
+            dataset_path.name, env, False, cache, registry="localhost:5000"
+        )
+
+    assert list(cache["images"]) == [f"{dataset_path.name}/test_image_2"]
+
+
+def test_build_images_rebuilds_images_for_another_registry_or_builder(
+    dataset_path: pathlib.Path, pipeline_path: pathlib.Path, env: str, mocker
+):
+    copy_config_files_and_set_tmp_folder_names_as_ids(dataset_path, pipeline_path)
+    generate_image_files(dataset_path, num_containers=1)
+    mocker.patch("scripts.generate_dag.build_and_push_image")
+    cache = generate_dag.empty_generate_cache()
+
+    for registry, image_builder in [
+        (None, "gcloud"),
+        (None, "gcloud"),
+        ("localhost:5000", "gcloud"),
+        ("localhost:5000", "docker"),
+        ("localhost:5000", "docker"),
+    ]:
+        generate_dag.build_images(
+            dataset_path.name,
+            env,
+            False,
+            cache,
+            registry=registry,
+            image_builder=image_builder,
+        )
+
+    assert generate_dag.build_and_push_image.call_count == 3